@@ -10,28 +10,43 @@ sys.path.append(
 	os.path.join(this_dir, '..', 'config'))
 sys.path.append(
 	os.path.join(this_dir, 'src'))
+sys.path.append(
+	os.path.join(this_dir, '..', 'housekeeping'))
 
 import pb2b_config as cg
 import aux2_ups_controller
+import hk_store as hs
+import spool as sp
+import poll_scheduler as ps
+import acq_clock as ac
 
 # Import Slowdaq
 sys.path.append(cg.slowdaq_folder)
 from slowdaq.pb2 import Publisher
 
 # Instantiates publisher instance for the ups
-pub = Publisher('PB2B_AUX2_UPS', cg.slowdaq_ip, cg.slowdaq_port)
+# Packets are spooled to disk and published from a background
+# thread, so polling never waits on the slowdaq server
+pub = sp.Spool('PB2B_AUX2_UPS', lambda: Publisher('PB2B_AUX2_UPS', cg.slowdaq_ip, cg.slowdaq_port),
+               max_bytes=cg.slowdaq_spool_max_bytes)
 ups = aux2_ups_controller.UPS(cg.aux2_ups_ip)
+store = hs.Store()
+# Monotonic UTC clock for acquisition stamps
+clock = ac.Clock()
+# Poll rates follow the CHWP state within the device budgets
+sched = ps.Scheduler(['aux2_ups'], cg.poll_intervals, cg.poll_devices,
+                     cg.poll_budgets)
 
 index = 0
 
 while True:
+    sched.next_due()
     try:
-        ups.update()
+        ups.update(clock)
     except:
         print('Connection Error! Trying again...')
         time.sleep(2)
     else:
-        pub.serve()
         data_dict = {'input_voltage': ups.input_voltage,
                      'input_freq': ups.input_freq,
                      'batt_capacity': ups.batt_capacity,
@@ -39,15 +54,19 @@ while True:
                      'output_voltage': ups.output_voltage,
                      'output_freq': ups.output_freq,
                      'output_load': ups.output_load}
-        data_dict['time'] = time.time()
+        # Each group of readings has its own midpoint time and latency
+        for name, (t_mid, latency) in ups.stamps.items():
+            data_dict[name + '_time'] = t_mid
+            data_dict[name + '_latency'] = latency
+        data_dict['time'] = min(t for t, l in ups.stamps.values())
         data_dict['index'] = index
+        store.append('aux2_ups', data_dict, data_dict['time'])
 
         print('PB2b AUX2 UPS: Status')
         for key in data_dict.keys():
             print(f'{key}: {data_dict[key]}')
         print('')
 
-        data = pub.pack(data_dict)
-        pub.queue(data)
+        pub.put(data_dict)
         index += 1
-        time.sleep(10)
+        sched.done('aux2_ups')
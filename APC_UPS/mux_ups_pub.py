@@ -10,35 +10,57 @@ sys.path.append(
     os.path.join(this_dir, '..', 'config'))
 sys.path.append(
     os.path.join(this_dir, 'src'))
+sys.path.append(
+    os.path.join(this_dir, '..', 'housekeeping'))
 
 import pb2b_config as cg
 import mux_ups_controller
+import hk_store as hs
+import spool as sp
+import poll_scheduler as ps
+import acq_clock as ac
 
 # Import Slowdaq
 sys.path.append(cg.slowdaq_folder)
 from slowdaq.pb2 import Publisher
 
 # Instantiates publisher instance for the ups
-pub = Publisher('mux_ups_info', cg.slowdaq_ip, cg.slowdaq_port)
+# Packets are spooled to disk and published from a background
+# thread, so polling never waits on the slowdaq server
+pub = sp.Spool('mux_ups_info', lambda: Publisher('mux_ups_info', cg.slowdaq_ip, cg.slowdaq_port),
+               max_bytes=cg.slowdaq_spool_max_bytes)
 ups = mux_ups_controller.UPS(cg.mux_ups_ip)
+store = hs.Store()
+# Monotonic UTC clock for acquisition stamps
+clock = ac.Clock()
+# Poll rates follow the CHWP state within the device budgets
+sched = ps.Scheduler(['mux_ups'], cg.poll_intervals, cg.poll_devices,
+                     cg.poll_budgets)
 
 index = 0
 
 while True:
+    sched.next_due()
     try:
         ups.connect()
-        ups.update()
+        ups.update(clock)
         ups.disconnect()
     except BlockingIOError:
         print('Busy port! Trying again...')
         time.sleep(2)
     else:
-        pub.serve()
-        data = pub.pack({'output_info': ups.output_info, 'input_info': ups.input_info,
-                         'battery_percent': ups.battery_percent, 'battery_temp': ups.battery_temperature,
-                         'battery_life': ups.battery_life, 'time': time.time(), 'index': index})
+        sample = {'output_info': ups.output_info, 'input_info': ups.input_info,
+                  'battery_percent': ups.battery_percent, 'battery_temp': ups.battery_temperature,
+                  'battery_life': ups.battery_life}
+        # Each group of readings has its own midpoint time and latency
+        for name, (t_mid, latency) in ups.stamps.items():
+            sample[name + '_time'] = t_mid
+            sample[name + '_latency'] = latency
+        sample['time'] = min(t for t, l in ups.stamps.values())
+        sample['index'] = index
+        store.append('mux_ups', sample, sample['time'])
+        pub.put(sample)
         print('Sending data')
-        pub.queue(data)
         index += 1
-        time.sleep(10)
+        sched.done('mux_ups')
 
@@ -27,7 +27,9 @@ class UPS:
         self.output_freq_oid = 'iso.3.6.1.4.1.318.1.1.1.4.2.2.0'
         self.output_load_oid = 'iso.3.6.1.4.1.318.1.1.1.4.2.3.0'
 
-    def update(self):
+    def update(self, clock=None):
+        # With a clock (acq_clock.Clock), each group of readings is
+        # stamped in self.stamps as (midpoint time, latency)
         while True:
             try:
                 self.lock_file = open(self.lock_file_name)
@@ -36,9 +38,14 @@ class UPS:
             except BlockingIOError:
                 time.sleep(0.1)
 
-        self.input_cable()
-        self.battery_charge()
-        self.output_cable()
+        self.stamps = {}
+        for name, func in [('input', self.input_cable),
+                           ('battery', self.battery_charge),
+                           ('output', self.output_cable)]:
+            if clock is None:
+                func()
+            else:
+                self.stamps[name] = clock.call(func)[1:]
 
     def input_cable(self):
         self.input_voltage = self.session.get(self.input_voltage_oid).value
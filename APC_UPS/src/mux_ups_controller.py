@@ -56,12 +56,19 @@ class UPS:
         self.lock_file.close()
 
     # Updates all UPS information
-    def update(self):
-        self.input_cable()
-        self.battery_charge()
-        self.battery_temp()
-        self.runtime()
-        self.output_cable()
+    # With a clock (acq_clock.Clock), each group of readings is
+    # stamped in self.stamps as (midpoint time, latency)
+    def update(self, clock=None):
+        self.stamps = {}
+        for name, func in [('input', self.input_cable),
+                           ('battery_charge', self.battery_charge),
+                           ('battery_temp', self.battery_temp),
+                           ('runtime', self.runtime),
+                           ('output', self.output_cable)]:
+            if clock is None:
+                func()
+            else:
+                self.stamps[name] = clock.call(func)[1:]
 
     # Updates power input information
     def input_cable(self):
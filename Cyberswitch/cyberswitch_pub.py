@@ -6,22 +6,41 @@ this_dir = os.path.dirname(__file__)
 sys.path.append(
     os.path.join(this_dir, 'src'))
 sys.path.append(
-    os.path.join(this_dir, '..', '..', 'config'))
+    os.path.join(this_dir, '..', 'config'))
+sys.path.append(
+    os.path.join(this_dir, '..', 'housekeeping'))
 
 import cyberswitch_open_command_close as occ
 import pb2b_config as cg
+import delta as dl
+import hk_store as hs
+import spool as sp
+import poll_scheduler as ps
+import acq_clock as ac
 
 sys.path.append(cg.slowdaq_folder)
 
 from slowdaq.pb2 import Publisher
 
-pub = Publisher('CHWP_Cyberswitch',cg.slowdaq_ip,cg.slowdaq_port)
- 
-index = 0
+# Packets are spooled to disk and published from a background
+# thread, so polling never waits on the slowdaq server
+pub = sp.Spool('CHWP_Cyberswitch', lambda: Publisher('CHWP_Cyberswitch',cg.slowdaq_ip,cg.slowdaq_port),
+               max_bytes=cg.slowdaq_spool_max_bytes)
+store = hs.Store()
+# Monotonic UTC clock for acquisition stamps
+clock = ac.Clock()
+# Poll rates follow the CHWP state within the device budgets
+sched = ps.Scheduler(['cyberswitch'], cg.poll_intervals, cg.poll_devices,
+                     cg.poll_budgets)
+
+# Send a keyframe every status_keyframe_interval and only
+# the changed ports in between
+delta = dl.Delta(cg.status_keyframe_interval)
 
-while True:    
+while True:
+    sched.next_due()
     try:
-        status = occ.open_command_close('status')
+        status, now, latency = occ.open_command_close('status', clock=clock)
     except BlockingIOError:
         print('Busy port! Trying again...')
         time.sleep(2)
@@ -30,18 +49,20 @@ while True:
         if status == True:
             continue
         elif len(status) == 5:
-            pub.serve()
-            data = pub.pack({'Port 1 status: ':status[0],
-                             'Port 2 status: ':status[1],
-                             'Port 3 status: ':status[2],
-                             'Port 4 status: ':status[3],
-                             'Port 5 Status: ':status[4],
-                             'time': time.time(),
-                             'index': index})
-            pub.queue(data)
-            print('Sending data...')
-            index += 1
-            time.sleep(10)  
+            sample = {'Port 1 status: ':status[0],
+                      'Port 2 status: ':status[1],
+                      'Port 3 status: ':status[2],
+                      'Port 4 status: ':status[3],
+                      'Port 5 Status: ':status[4]}
+            # Every sample is kept locally, only changes are published.
+            # The sample is stamped with the query midpoint
+            store.append('cyberswitch', dict(sample, latency=latency), now)
+            packet = delta.encode(sample, now)
+            if packet is not None:
+                packet['latency'] = latency
+                pub.put(packet)
+                print('Sending data...')
+            sched.done('cyberswitch')
         else:
             print('Bad output, trying again...')
             time.sleep(2)
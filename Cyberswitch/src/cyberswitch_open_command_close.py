@@ -1,4 +1,5 @@
 import sys
+import time
 import os
 
 this_dir = os.path.dirname(__file__)
@@ -11,12 +12,20 @@ import pb2b_config as cg
 import command_NP05B as cm
 import fcntl as f
 
-def open_command_close(cmd):
+def open_command_close(cmd, clock=None):
+    # With an acq_clock.Clock, returns (result, midpoint, latency) of
+    # the request/response alone
     lockfile = open(os.path.join(this_dir, '.cyberswitch_port_busy'))
     f.flock(lockfile, f.LOCK_EX | f.LOCK_NB)
     NP05B = np.NP05B(tcp_ip=cg.cyberswitch_tcp_ip, tcp_port=cg.cyberswitch_tcp_port)
     CMD = cm.Command(NP05B)
-    result = CMD.CMD(cmd)
+    start = time.monotonic()
+    if clock is None:
+        result = CMD.CMD(cmd)
+    else:
+        result = clock.call(CMD.CMD, cmd)
+    NP05B.log.log("Command '%s' -> %s" % (cmd, str(result)), command=cmd,
+                  duration=time.monotonic() - start)
     del(NP05B,CMD)
     f.flock(lockfile, f.LOCK_UN)
     return result
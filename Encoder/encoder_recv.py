@@ -0,0 +1,72 @@
+"""
+Receive the encoder packets of both Beaglebones and print the
+per-board packet rates, sequence gaps and HWP frequency every few
+seconds, and optionally archive the edges.
+Use --local to receive from encoder_sim.py instead of the boards
+"""
+
+# Built-in python modules
+import argparse
+import time as tm
+import sys
+import os
+import numpy as np
+
+this_dir = os.path.dirname(__file__)
+sys.path.append(
+    os.path.join(this_dir, '..', 'config'))
+sys.path.append(
+    os.path.join(this_dir, 'src'))
+
+import pb2b_config as cg  # noqa: E402
+import encoder_receiver as er  # noqa: E402
+import encoder_angle as ea  # noqa: E402
+import encoder_archive as eA  # noqa: E402
+
+parser = argparse.ArgumentParser(
+    description="Receive encoder packets and print their statistics")
+parser.add_argument('--port', type=int, default=cg.encoder_port)
+parser.add_argument('--local', action='store_true',
+                    help="take packets from encoder_sim.py")
+parser.add_argument('--archive', action='store_true',
+                    help="archive the edges to the ENC folder")
+parser.add_argument('--interval', type=float, default=5.,
+                    help="seconds between reports (default 5)")
+args = parser.parse_args()
+
+if args.local:
+    receiver = er.Receiver(
+        boards={'127.0.0.2': 'encoder1', '127.0.0.3': 'encoder2'},
+        ip='127.0.0.1', port=args.port)
+else:
+    receiver = er.Receiver(port=args.port)
+tracker = ea.Tracker(receiver.names)
+archive = None
+if args.archive:
+    archive = eA.Archive()
+    tracker.subscribe(archive.write)
+receiver.subscribe(tracker.process)
+receiver.start()
+
+try:
+    while True:
+        tm.sleep(args.interval)
+        stats = receiver.stats()
+        for name in receiver.names:
+            st = stats[name]
+            print("%s: %7.1f packets/s %8.1f edges/s  %d gaps (%d edges) "
+                  "%d out of order  %d IRIG  %d timeouts"
+                  % (name, st['packet_rate'], st['edge_rate'], st['gaps'],
+                     st['missed_edges'], st['out_of_order'], st['irig'],
+                     st['timeouts']))
+            latest = tracker.boards[name].latest
+            if latest is not None:
+                print("%s: %.4f Hz  angle %.2f deg  %s" % (
+                    name, latest['freq'], np.degrees(latest['angle']),
+                    'IRIG' if latest['synced'] else 'no IRIG'))
+        if stats['unknown'] > 0:
+            print("%d packets from unknown sources" % (stats['unknown']))
+except KeyboardInterrupt:
+    receiver.stop()
+    if archive is not None:
+        archive.close()
@@ -0,0 +1,150 @@
+"""
+Local stand-in for Beaglebone_Encoder_DAQ: sends counter, IRIG and
+timeout packets for both boards over UDP, from a simulated rotor
+spinning at a fixed frequency. Each board sends from its own loopback
+address, so a Receiver can be tested with
+
+    Receiver(boards={'127.0.0.2': 'encoder1', '127.0.0.3': 'encoder2'},
+             ip='127.0.0.1')
+
+python3 encoder_sim.py --freq 2.0 --drop 0.01 --duration 60
+"""
+
+# Built-in python modules
+import argparse
+import socket
+import time as tm
+import sys
+import os
+import numpy as np
+
+this_dir = os.path.dirname(__file__)
+sys.path.append(
+    os.path.join(this_dir, '..', 'config'))
+sys.path.append(
+    os.path.join(this_dir, 'src'))
+
+import pb2b_config as cg  # noqa: E402
+import encoder_packets as ep  # noqa: E402
+
+
+class Board:
+    """
+    The Board object generates the packets of one simulated Beaglebone.
+    Encoder edges come from slot positions spaced evenly around the
+    disk, with the first ref_slots positions left out to mark the
+    reference.
+
+    Args:
+    freq (float): rotation frequency [Hz]
+    phase (float): disk angle at t0 [rotations] (default 0)
+    t0 (float): UTC start time (default now)
+    slots (int): slot positions per rotation (default cg.encoder_slots)
+    ref_slots (int): positions left out (default cg.encoder_ref_slots)
+    clock_rate (float): PRU clock [Hz] (default cg.bb_clock_rate)
+    jitter (float): rms edge timing noise [sec] (default 0)
+    """
+    def __init__(self, freq, phase=0., t0=None, slots=cg.encoder_slots,
+                 ref_slots=cg.encoder_ref_slots, clock_rate=cg.bb_clock_rate,
+                 jitter=0.):
+        self.freq = freq
+        self.t0 = tm.time() if t0 is None else t0
+        self.slots = slots
+        self.ref_slots = ref_slots
+        self.clock_rate = clock_rate
+        self.jitter = jitter
+        # Each board's PRU clock starts at an arbitrary value
+        self.clock0 = int(np.random.randint(0, 2**32))
+        self._pos = int(np.ceil(phase * slots))
+        self._phase = phase
+        self._count = 0
+        self._next_irig = np.floor(self.t0) + 1.
+
+    # ***** Public Methods *****
+    def edges(self, n=ep.counter_length):
+        """ Return the (time, quad, clock, count) of the next n edges """
+        # Enough positions to hold n edges after the reference gap
+        span = n + (n // (self.slots - self.ref_slots) + 2) * self.ref_slots
+        pos = self._pos + np.arange(span)
+        pos = pos[(pos % self.slots) >= self.ref_slots][:n]
+        self._pos = int(pos[-1]) + 1
+        t = self.t0 + (pos / float(self.slots) - self._phase) / self.freq
+        if self.jitter > 0:
+            t = t + np.random.normal(0., self.jitter, len(t))
+        count = (self._count + np.arange(n)) % 2**32
+        self._count += n
+        return t, np.ones(n, dtype=np.uint32), self.clock(t), count
+
+    def clock(self, t):
+        """ PRU clock ticks at UTC times t """
+        ticks = np.round((np.asarray(t) - self.t0) * self.clock_rate)
+        return ((ticks.astype(np.int64) + self.clock0) % 2**32).astype(
+            np.uint32)
+
+    def counter_packet(self):
+        """ Return (time of the last edge, packet) """
+        t, quad, clock, count = self.edges()
+        return t[-1], ep.pack_counter(quad, clock, count)
+
+    def irig_packet(self):
+        """ Return (time of the second marker, packet) """
+        t = self._next_irig
+        self._next_irig += 1.
+        return t, ep.pack_irig(int(self.clock(t)), t)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Send simulated encoder packets for both Beaglebones")
+    parser.add_argument('--ip', default='127.0.0.1',
+                        help="receiver address (default 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=cg.encoder_port)
+    parser.add_argument('--sources', default='127.0.0.2,127.0.0.3',
+                        help="source address of each board")
+    parser.add_argument('--freq', type=float, default=2.0,
+                        help="rotation frequency [Hz] (default 2)")
+    parser.add_argument('--drop', type=float, default=0.,
+                        help="fraction of counter packets to drop")
+    parser.add_argument('--jitter', type=float, default=0.,
+                        help="rms edge timing noise [sec]")
+    parser.add_argument('--duration', type=float, default=0.,
+                        help="seconds to run (default forever)")
+    args = parser.parse_args()
+
+    t0 = tm.time()
+    boards = []
+    for i, src in enumerate(args.sources.split(',')):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind((src, 0))
+        # Read heads half a turn apart
+        board = Board(args.freq, phase=0.5 * i, t0=t0, jitter=args.jitter)
+        boards.append([sock, board, board.counter_packet(),
+                       board.irig_packet()])
+
+    sent = dropped = 0
+    while args.duration <= 0 or tm.time() - t0 < args.duration:
+        # Send whatever packets are due, in time order
+        now = tm.time()
+        for entry in boards:
+            sock, board, counter, irig = entry
+            while counter[0] <= now:
+                if np.random.random() < args.drop:
+                    dropped += 1
+                else:
+                    sock.sendto(counter[1], (args.ip, args.port))
+                    sent += 1
+                counter = entry[2] = board.counter_packet()
+            while irig[0] <= now:
+                sock.sendto(irig[1], (args.ip, args.port))
+                irig = entry[3] = board.irig_packet()
+        wake = min(min(e[2][0], e[3][0]) for e in boards)
+        tm.sleep(max(0., min(wake - tm.time(), 0.1)))
+
+    for entry in boards:
+        entry[0].sendto(ep.pack_timeout(1), (args.ip, args.port))
+        entry[0].close()
+    print("Sent %d counter packets, dropped %d" % (sent, dropped))
+
+
+if __name__ == '__main__':
+    main()
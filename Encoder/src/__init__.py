@@ -0,0 +1 @@
+#Init file for the src directory for the CHWP encoder DAQ
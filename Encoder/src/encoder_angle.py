@@ -0,0 +1,349 @@
+# Built-in python modules
+import threading
+import time as tm
+import sys as sy
+import os
+import numpy as np
+
+this_dir = os.path.dirname(__file__)
+sy.path.append(
+    os.path.join(this_dir, '..', '..', "config"))
+
+import pb2b_config as cg  # noqa: E402
+import encoder_packets as ep  # noqa: E402
+
+
+class Reconstructor:
+    """
+    The Reconstructor object turns the counter and IRIG blocks of one
+    Beaglebone into HWP angle and frequency, a whole block at a time.
+
+    The disk has 'slots' evenly spaced slot positions, 'ref_slots' of
+    which are left out to mark the reference. Each edge is assigned a
+    slot position: the time since the previous edge, over a running
+    median of the slot period, gives the number of positions advanced.
+    Edges missing from the stream, whether in lost packets or missed by
+    the PRU, are skipped over this way rather than shifting the angle.
+    The reference is the one place where the advance is ref_slots + 1
+    with no gap in the edge count, and angle zero is its first missing
+    position. After the first reference every edge has an angle, and
+    later references are checked against it.
+
+    Clock ticks are unwrapped and mapped to UTC through the IRIG
+    second markers, or through packet arrival times until the first
+    IRIG packet comes in. The frequency of each edge is the rotation
+    rate over the preceding rotation, which averages out slot spacing
+    errors. The latest record also has a fast frequency over the last
+    fast_slots positions, for feedback that has to follow the rotor
+    quickly.
+
+    Args:
+    board (str): board name
+    slots (int): slot positions per rotation (default cg.encoder_slots)
+    ref_slots (int): positions left out (default cg.encoder_ref_slots)
+    clock_rate (float): PRU clock [Hz] (default cg.bb_clock_rate)
+    window (int): edges in the running median (default 9)
+    fill (bool): add interpolated edges at skipped positions (default False)
+    fast_slots (int): positions in the fast frequency (default slots / 8)
+    """
+    def __init__(self, board, slots=cg.encoder_slots,
+                 ref_slots=cg.encoder_ref_slots, clock_rate=cg.bb_clock_rate,
+                 window=9, fill=False, fast_slots=None):
+        self.board = board
+        self.slots = slots
+        self.ref_slots = ref_slots
+        self.clock_rate = clock_rate
+        self.window = window
+        self.fill = fill
+        self.fast_slots = slots // 8 if fast_slots is None else fast_slots
+
+        # Clock unwrapping -- last raw and unwrapped tick
+        self._raw_last = None
+        self._clk_last = None
+        # IRIG anchors, (unwrapped tick, UTC) of recent second markers
+        self._anchors = np.empty((0, 2), dtype=np.float64)
+        self._max_anchors = 64
+
+        # Last edge (tick, count, travel, position) and recent periods
+        self._last = None
+        self._period_tail = np.empty(0)
+        # Travel and time over the last rotation, for the frequency
+        self._hist_travel = np.empty(0, dtype=np.int64)
+        self._hist_time = np.empty(0)
+
+        # Position of angle zero, None until the first reference
+        self.p0 = None
+        self._bad_refs = 0
+        self.latest = None
+        self.stats = {'edges': 0, 'repaired': 0, 'refs': 0,
+                      'ref_errors': 0, 'relocks': 0}
+
+    # ***** Public Methods *****
+    def process(self, block):
+        """
+        Process a decoded block from the Receiver
+
+        Args:
+        block (dict): counter or IRIG block of this board
+
+        Returns the edge record of a counter block, None otherwise:
+        {'board', 'time', 'clock', 'count', 'position', 'angle' [rad],
+         'freq' [Hz], 'ref' (rotation start), 'filled', 'synced' (IRIG)}
+        """
+        if block['type'] == 'irig':
+            self._irig(block)
+        elif block['type'] == 'counter' and len(block['clock']) > 0:
+            return self._counter(block)
+        return None
+
+    def to_utc(self, clock):
+        """
+        Map unwrapped clock ticks to UTC through the IRIG markers
+
+        Args:
+        clock (array): unwrapped ticks
+        """
+        clock = np.asarray(clock, dtype=np.float64)
+        anchors = self._anchors
+        if len(anchors) == 0:
+            return None
+        # Clock rate between consecutive markers
+        rate = np.full(len(anchors), float(self.clock_rate))
+        if len(anchors) > 1:
+            rate[1:] = np.diff(anchors[:, 0]) / np.diff(anchors[:, 1])
+            rate[0] = rate[1]
+        i = np.clip(np.searchsorted(anchors[:, 0], clock, 'right') - 1,
+                    0, len(anchors) - 1)
+        return anchors[i, 1] + (clock - anchors[i, 0]) / rate[i]
+
+    # ***** Helper Methods *****
+    def _unwrap(self, raw):
+        """ Unwrap 32-bit clock ticks, allowing small steps back """
+        raw = np.asarray(raw, dtype=np.int64)
+        prev = raw[0] if self._raw_last is None else self._raw_last
+        base = raw[0] if self._clk_last is None else self._clk_last
+        step = np.diff(raw, prepend=prev)
+        step = (step + 2**31) % 2**32 - 2**31
+        clk = base + np.cumsum(step)
+        self._raw_last = int(raw[-1])
+        self._clk_last = int(clk[-1])
+        return clk
+
+    def _irig(self, block):
+        clk = self._unwrap(block['rising_edge'])
+        utc = ep.irig_to_unix(block['info'])
+        self._anchors = np.concatenate(
+            (self._anchors, np.column_stack((clk, utc))))[-self._max_anchors:]
+        return
+
+    def _times(self, clock, block):
+        """ UTC time of each edge, and whether it came from IRIG """
+        t = self.to_utc(clock)
+        if t is not None:
+            return t, True
+        # Until IRIG arrives: the last edge of each packet left the
+        # board just before the packet arrived, so the least latency
+        # offset over the block anchors the clock
+        ends = np.arange(1, len(block['time']) + 1) * ep.counter_length
+        last = clock[np.minimum(ends, len(clock)) - 1]
+        offset = np.min(block['time'] - last / self.clock_rate)
+        return offset + clock / self.clock_rate, False
+
+    def _periods(self, x):
+        """ Running median of the per-position interval """
+        w = self.window
+        xx = np.concatenate((self._period_tail, x))
+        self._period_tail = xx[-(w - 1):]
+        if len(xx) < w:
+            return np.full(len(x), np.median(xx))
+        win = np.lib.stride_tricks.sliding_window_view(xx, w)
+        med = np.partition(win, w // 2, axis=1)[:, w // 2]
+        if len(med) < len(x):
+            med = np.concatenate((np.full(len(x) - len(med), med[0]), med))
+        return med[-len(x):]
+
+    def _counter(self, block):
+        clock = self._unwrap(block['clock'])
+        count = block['count'].astype(np.int64)
+        direction = np.where(block['quad'] > 0, 1, -1)
+        t, synced = self._times(clock, block)
+        self.stats['edges'] += len(clock)
+
+        # Interval and edge count step from the edge before
+        if self._last is None:
+            self._last = (clock[0], count[0] - 1, 0, 0)
+        clk_prev, count_prev, travel_prev, pos_prev = self._last
+        dt = np.diff(clock, prepend=clk_prev).astype(np.float64)
+        step = np.diff(count, prepend=count_prev) % 2**32
+        step = np.maximum(step, 1)
+
+        # Positions advanced, never fewer than the edge count says
+        period = self._periods(dt / step)
+        adv = np.maximum(np.rint(dt / period).astype(np.int64), step)
+        if self._hist_travel.size == 0:
+            # Very first edge: nothing to measure against
+            adv[0] = 0
+        travel = travel_prev + np.cumsum(adv)
+        position = pos_prev + np.cumsum(adv * direction)
+        self._last = (clock[-1], count[-1], travel[-1], position[-1])
+
+        ref = self._references(adv, step, direction, position)
+        if self.p0 is not None:
+            # Skipped positions beyond those at the reference were
+            # missed edges
+            zone = np.floor_divide(position - self.p0, self.slots)
+            zone_prev = np.floor_divide(
+                np.concatenate(([pos_prev], position[:-1])) - self.p0,
+                self.slots)
+            missed = (adv - step) - self.ref_slots * np.abs(zone - zone_prev)
+            self.stats['repaired'] += int(np.clip(missed, 0, None).sum())
+
+        freq, fast = self._frequency(travel, t)
+        freq = direction * freq
+        filled = np.zeros(len(t), dtype=bool)
+        if self.fill and self.p0 is not None and np.all(direction == direction[0]):
+            t, clock, position, freq, ref, filled = self._fill(
+                t, clock, position, freq, ref)
+            count = None
+
+        if self.p0 is None:
+            angle = np.full(len(t), np.nan)
+        else:
+            angle = (2. * np.pi / self.slots) * ((position - self.p0) % self.slots)
+        self.latest = {'time': t[-1], 'angle': angle[-1], 'freq': freq[-1],
+                       'freq_fast': direction[-1] * fast,
+                       'arrival': block['time'][-1], 'synced': synced}
+        return {'board': self.board, 'time': t, 'clock': clock,
+                'count': count, 'position': position, 'angle': angle,
+                'freq': freq, 'ref': ref, 'filled': filled,
+                'synced': synced}
+
+    def _references(self, adv, step, direction, position):
+        """ Find the reference edges and lock or check angle zero """
+        ref = np.zeros(len(adv), dtype=bool)
+        cand = np.nonzero((step == 1) & (adv == self.ref_slots + 1))[0]
+        for i in cand:
+            # Forward, the reference edge is ref_slots past zero;
+            # in reverse it is one before
+            if direction[i] > 0:
+                p0 = position[i] - self.ref_slots
+            else:
+                p0 = position[i] + 1
+            if self.p0 is None:
+                self.p0 = p0
+            if (p0 - self.p0) % self.slots == 0:
+                ref[i] = direction[i] > 0
+                self.stats['refs'] += 1
+                self._bad_refs = 0
+                continue
+            self.stats['ref_errors'] += 1
+            self._bad_refs += 1
+            if self._bad_refs >= 3:
+                # The lock is wrong, follow the references
+                self.p0 = p0
+                self._bad_refs = 0
+                self.stats['relocks'] += 1
+                ref[i] = direction[i] > 0
+        return ref
+
+    def _frequency(self, travel, t):
+        """
+        Rotations per second over the last rotation of each edge, and
+        over the last fast_slots positions of the newest edge
+        """
+        tr = np.concatenate((self._hist_travel, travel))
+        tt = np.concatenate((self._hist_time, t))
+        n = len(travel)
+        i = np.arange(len(tr) - n, len(tr))
+        j = np.searchsorted(tr, tr[i] - self.slots, 'left')
+        span = tt[i] - tt[j]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            freq = np.where(span > 0, (tr[i] - tr[j]) / (self.slots * span),
+                            np.nan)
+        j = np.searchsorted(tr, tr[-1] - self.fast_slots, 'left')
+        span = tt[-1] - tt[j]
+        fast = (tr[-1] - tr[j]) / (self.slots * span) if span > 0 else np.nan
+        keep = tr >= tr[-1] - self.slots
+        self._hist_travel = tr[keep]
+        self._hist_time = tt[keep]
+        return freq, fast
+
+    def _fill(self, t, clock, position, freq, ref):
+        """ Add interpolated edges at the skipped slot positions """
+        order = np.argsort(position, kind='stable')
+        p = position[order]
+        grid = np.arange(p[0], p[-1] + 1)
+        grid = grid[(grid - self.p0) % self.slots >= self.ref_slots]
+        filled = ~np.isin(grid, p)
+        if not filled.any():
+            return t, clock, position, freq, ref, np.zeros(len(t), dtype=bool)
+        t_out = np.interp(grid, p, t[order])
+        clock_out = np.rint(np.interp(grid, p, clock[order])).astype(np.int64)
+        freq_out = np.interp(grid, p, freq[order])
+        ref_out = np.isin(grid, position[ref])
+        if position[-1] < position[0]:
+            # Back to time order in reverse
+            grid, t_out, clock_out, freq_out, ref_out, filled = [
+                a[::-1] for a in (grid, t_out, clock_out, freq_out, ref_out,
+                                  filled)]
+        return t_out, clock_out, grid, freq_out, ref_out, filled
+
+
+class Tracker:
+    """
+    The Tracker object keeps one Reconstructor per board. Subscribed to
+    a Receiver, it turns every block into edge records and passes them
+    on to its own subscribers
+
+    Args:
+    names (list): board names (default encoder1, encoder2)
+    fill (bool): add interpolated edges at skipped positions (default False)
+    """
+    def __init__(self, names=('encoder1', 'encoder2'), fill=False):
+        self.boards = {name: Reconstructor(name, fill=fill) for name in names}
+        self._consumers = []
+        self._lock = threading.Lock()
+
+    # ***** Public Methods *****
+    def subscribe(self, func):
+        """
+        Register a consumer of the edge records
+
+        Args:
+        func (callable): called as func(record)
+        """
+        self._consumers.append(func)
+        return True
+
+    def process(self, block):
+        """
+        Process a Receiver block
+
+        Args:
+        block (dict): decoded block
+        """
+        if block['board'] not in self.boards:
+            return None
+        with self._lock:
+            record = self.boards[block['board']].process(block)
+        if record is not None:
+            for func in self._consumers:
+                func(record)
+        return record
+
+    def latest(self, max_age=None):
+        """
+        Return the newest {'time', 'angle', 'freq', 'freq_fast',
+        'arrival', 'synced'} over the boards, or None if there is none or it is too old
+
+        Args:
+        max_age (float): longest time since the packet arrived [sec]
+        """
+        latest = [b.latest for b in self.boards.values()
+                  if b.latest is not None]
+        if len(latest) == 0:
+            return None
+        newest = max(latest, key=lambda l: l['arrival'])
+        if max_age is not None and tm.time() - newest['arrival'] > max_age:
+            return None
+        return newest
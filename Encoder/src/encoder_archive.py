@@ -0,0 +1,497 @@
+# Built-in python modules
+import datetime as dt
+import json
+import re
+import time as tm
+import sys as sy
+import os
+import numpy as np
+
+this_dir = os.path.dirname(__file__)
+sy.path.append(
+    os.path.join(this_dir, '..', '..', "config"))
+
+import pb2b_config as cg  # noqa: E402
+
+# Default archive directory -- the ENC folder at the top of the repository
+archive_dir = os.path.join(this_dir, '..', '..', "ENC")
+
+# One record per encoder edge
+record_dtype = np.dtype([
+    ('time', '<f8'),
+    ('clock', '<i8'),
+    ('position', '<i8'),
+    ('angle', '<f4'),
+    ('freq', '<f4'),
+    ('count', '<i4'),
+    ('flags', 'u1'),
+    ('pad', 'u1', (3,))])
+
+# Bits of the flags field
+flag_ref = 1
+flag_filled = 2
+flag_synced = 4
+
+# One record per rotation start: row in the chunk and its time
+rotation_dtype = np.dtype([
+    ('row', '<i8'),
+    ('time', '<f8')])
+
+# Rotation starts returned by Archive.rotations()
+rotations_dtype = np.dtype([
+    ('chunk', '<f8'),
+    ('part', '<i8'),
+    ('row', '<i8'),
+    ('time', '<f8')])
+
+
+class Chunk:
+    """
+    The Chunk object is one time chunk of one board's encoder archive:
+
+    <name>.enc    edge records (record_dtype), back to back
+    <name>.rot    rotation starts (rotation_dtype)
+    <name>.json   start time, time source, rows written and record layout
+
+    A chunk being written is grown in large steps and filled through a
+    memory map, and the row count in the .json file is updated once a
+    second. Reads memory-map the files, so they return views without
+    copying or reading ahead.
+
+    Args:
+    path (str): chunk path without extension
+    start (float): chunk start time, for a new chunk
+    write (bool): open for appending (default False)
+    grow (int): records added each time the file grows (default 2**20)
+    synced (bool): times from IRIG rather than arrival, for a new chunk
+    part (int): chunk number within its time slot, for a new chunk
+    """
+    def __init__(self, path, start=None, write=False, grow=2**20,
+                 synced=None, part=0):
+        self.path = path
+        self.write = write
+        self.grow = grow
+        try:
+            with open(path + '.json') as f:
+                self.meta = json.load(f)
+        except (OSError, ValueError):
+            if not write:
+                raise Exception(
+                    'Archive Exception: no chunk at %s' % (path))
+            self.meta = {'start': start, 'rows': 0, 'closed': False,
+                         'synced': synced, 'part': part,
+                         'dtype': record_dtype.descr}
+        self._map = None
+        self._last_flush = 0.
+        if write:
+            self._open_write()
+
+    # ***** Public Methods *****
+    @property
+    def start(self):
+        return self.meta['start']
+
+    @property
+    def rows(self):
+        return self.meta['rows']
+
+    @property
+    def synced(self):
+        return self.meta.get('synced')
+
+    @property
+    def part(self):
+        return self.meta.get('part', 0)
+
+    def data(self):
+        """ Return the records as a memory-mapped view """
+        if self.write:
+            return self._map[:self.rows]
+        if self.rows == 0:
+            return np.empty(0, dtype=record_dtype)
+        return np.memmap(self.path + '.enc', dtype=record_dtype, mode='r',
+                         shape=(self.rows,))
+
+    def rotations(self):
+        """ Return the rotation starts as a memory-mapped view """
+        try:
+            n = os.path.getsize(self.path + '.rot') // rotation_dtype.itemsize
+        except OSError:
+            n = 0
+        # The index is flushed ahead of the row count
+        if n == 0:
+            return np.empty(0, dtype=rotation_dtype)
+        rot = np.memmap(self.path + '.rot', dtype=rotation_dtype, mode='r',
+                        shape=(n,))
+        return rot[:np.searchsorted(rot['row'], self.rows)]
+
+    def append(self, records):
+        """
+        Append edge records
+
+        Args:
+        records (np.ndarray): record_dtype array
+        """
+        n = len(records)
+        if self.rows + n > len(self._map):
+            self._resize(self.rows + n + self.grow)
+        self._map[self.rows:self.rows + n] = records
+        refs = np.flatnonzero(records['flags'] & flag_ref)
+        if len(refs) > 0:
+            rot = np.empty(len(refs), dtype=rotation_dtype)
+            rot['row'] = self.rows + refs
+            rot['time'] = records['time'][refs]
+            self._rot.write(rot.tobytes())
+        self.meta['rows'] += n
+        if tm.monotonic() - self._last_flush > 1.:
+            self.flush()
+        return
+
+    def flush(self):
+        """ Write the data out and record the row count """
+        if self._map is not None:
+            self._map.flush()
+        self._rot.flush()
+        tmp = self.path + '.json.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self.path + '.json')
+        self._last_flush = tm.monotonic()
+        return
+
+    def close(self):
+        """ Flush and trim the file to the rows written """
+        if not self.write:
+            return
+        self.meta['closed'] = True
+        self.flush()
+        self._map = None
+        os.truncate(self.path + '.enc', self.rows * record_dtype.itemsize)
+        self._rot.close()
+        self.write = False
+        return
+
+    # ***** Helper Methods *****
+    def _open_write(self):
+        if not os.path.exists(self.path + '.enc'):
+            open(self.path + '.enc', 'wb').close()
+        size = os.path.getsize(self.path + '.enc') // record_dtype.itemsize
+        self._resize(max(size, self.rows + self.grow))
+        # Rows written after the last flush before a crash: records
+        # are never all zero, so keep the non-zero run past the count
+        written = self._map['time'][self.rows:] != 0
+        self.meta['rows'] += (len(written) if written.all()
+                              else int(np.argmin(written)))
+        self.meta['closed'] = False
+        # Drop index entries past the recovered rows
+        rot = self.path + '.rot'
+        if os.path.exists(rot):
+            n = os.path.getsize(rot) // rotation_dtype.itemsize
+            keep = 0
+            if n > 0:
+                rows = np.memmap(rot, dtype=rotation_dtype, mode='r',
+                                 shape=(n,))['row']
+                keep = int(np.searchsorted(rows, self.rows))
+            os.truncate(rot, keep * rotation_dtype.itemsize)
+        self._rot = open(rot, 'ab')
+        return
+
+    def _resize(self, capacity):
+        """ Grow the file to hold capacity records and map it again """
+        if self._map is not None:
+            self._map.flush()
+            self._map = None
+        os.truncate(self.path + '.enc', capacity * record_dtype.itemsize)
+        self._map = np.memmap(self.path + '.enc', dtype=record_dtype,
+                              mode='r+', shape=(capacity,))
+        return
+
+
+class Archive:
+    """
+    The Archive object stores the edge records of every board, chunked
+    by time:
+
+    ENC/YYYY_MM_DD/<board>/HHMMSS.{enc,rot,json}
+
+    Each chunk covers chunk_seconds from a multiple of chunk_seconds.
+    Records are fixed-size, so a time or a rotation is found by binary
+    search on the time column or the rotation index, and reads return
+    memory-mapped views that touch only the pages they use.
+
+    Edge times come from the arrival time until the board syncs to
+    IRIG, and the two do not line up, so a change of time source
+    starts a new part of the chunk, HHMMSS_1, HHMMSS_2, ..., and the
+    times within each part stay ordered.
+
+    Each time a chunk starts, the oldest chunks are removed: those
+    from more than keep_days ago, then more until the archive is under
+    max_bytes.
+
+    Subscribe write() to a Tracker to archive what it reconstructs.
+
+    Args:
+    archive_dir (str): archive directory (default is the ENC folder)
+    chunk_seconds (float): chunk length (default cg.encoder_chunk_seconds)
+    keep_days (float): days kept (default cg.encoder_keep_days)
+    max_bytes (int): archive size kept (default cg.encoder_max_bytes)
+    """
+    def __init__(self, archive_dir=archive_dir,
+                 chunk_seconds=cg.encoder_chunk_seconds,
+                 keep_days=cg.encoder_keep_days,
+                 max_bytes=cg.encoder_max_bytes):
+        self.archive_dir = archive_dir
+        self.chunk_seconds = chunk_seconds
+        self.keep_days = keep_days
+        self.max_bytes = max_bytes
+        if not os.path.isdir(self.archive_dir):
+            os.makedirs(self.archive_dir)
+
+        # Chunk being written for each board
+        self._open = {}
+
+    def __del__(self):
+        self.close()
+
+    # ***** Public Methods *****
+    def write(self, record):
+        """
+        Append a Tracker edge record
+
+        Args:
+        record (dict): edge record from encoder_angle.Reconstructor
+        """
+        n = len(record['time'])
+        if n == 0:
+            return
+        recs = np.zeros(n, dtype=record_dtype)
+        recs['time'] = record['time']
+        recs['clock'] = record['clock']
+        recs['position'] = record['position']
+        recs['angle'] = record['angle']
+        recs['freq'] = record['freq']
+        recs['count'] = -1 if record['count'] is None else record['count']
+        recs['flags'] = (flag_ref * record['ref'] +
+                         flag_filled * record['filled'] +
+                         flag_synced * bool(record['synced']))
+
+        # Split at chunk boundaries
+        key = np.floor(recs['time'] / self.chunk_seconds).astype(np.int64)
+        cuts = np.flatnonzero(np.diff(key)) + 1
+        for part in np.split(np.arange(n), cuts):
+            self._chunk(record['board'], key[part[0]],
+                        bool(record['synced'])).append(
+                recs[part[0]:part[-1] + 1])
+        return
+
+    def prune(self):
+        """
+        Remove the chunks past the retention, oldest first. Chunks
+        being written are kept
+        """
+        oldest = (dt.datetime.now() -
+                  dt.timedelta(days=self.keep_days)).strftime("%Y_%m_%d")
+        writing = [c.path for c in self._open.values()]
+        chunks = []
+        for day in sorted(os.listdir(self.archive_dir)):
+            ddir = os.path.join(self.archive_dir, day)
+            if not (re.match(r'^\d{4}_\d{2}_\d{2}$', day) and
+                    os.path.isdir(ddir)):
+                continue
+            for board in os.listdir(ddir):
+                for f in os.listdir(os.path.join(ddir, board)):
+                    if f.endswith('.json'):
+                        path = os.path.join(ddir, board, f[:-len('.json')])
+                        chunks.append((day, f, path, self._size(path)))
+        chunks.sort()
+
+        total = sum(c[3] for c in chunks)
+        for day, _, path, size in chunks:
+            if day >= oldest and total <= self.max_bytes:
+                break
+            if path in writing:
+                continue
+            for ext in ['.json', '.rot', '.enc']:
+                try:
+                    os.remove(path + ext)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            # Remove the board and day directories once empty
+            for d in [os.path.dirname(path), os.path.dirname(
+                    os.path.dirname(path))]:
+                try:
+                    os.rmdir(d)
+                except OSError:
+                    break
+        return
+
+    def close(self):
+        """ Close the chunks being written """
+        for chunk in getattr(self, '_open', {}).values():
+            chunk.close()
+        self._open = {}
+        return
+
+    def chunks(self, board, start, stop):
+        """
+        Return the chunks of a board overlapping a time range
+
+        Args:
+        board (str): board name
+        start (float): start time
+        stop (float): stop time
+        """
+        out = []
+        day = dt.datetime.fromtimestamp(
+            start - self.chunk_seconds).date()
+        last = dt.datetime.fromtimestamp(stop).date()
+        while day <= last:
+            bdir = os.path.join(self.archive_dir,
+                                day.strftime("%Y_%m_%d"), board)
+            if os.path.isdir(bdir):
+                for f in sorted(os.listdir(bdir)):
+                    if not f.endswith('.json'):
+                        continue
+                    path = os.path.join(bdir, f[:-len('.json')])
+                    chunk = self._open.get(board)
+                    if chunk is None or chunk.path != path:
+                        chunk = Chunk(path)
+                    if (chunk.start < stop and
+                       chunk.start + self.chunk_seconds > start):
+                        out.append(chunk)
+            day += dt.timedelta(days=1)
+        return out
+
+    def views(self, board, start, stop):
+        """
+        Return the records of a time range as one view per chunk
+
+        Args:
+        board (str): board name
+        start (float): start time
+        stop (float): stop time
+        """
+        out = []
+        for chunk in self.chunks(board, start, stop):
+            data = chunk.data()
+            i, j = np.searchsorted(data['time'], [start, stop])
+            if j > i:
+                out.append(data[i:j])
+        return out
+
+    def read(self, board, start, stop):
+        """
+        Return the records of a time range, as a view when they are
+        in one chunk
+
+        Args:
+        board (str): board name
+        start (float): start time
+        stop (float): stop time
+        """
+        views = self.views(board, start, stop)
+        if len(views) == 0:
+            return np.empty(0, dtype=record_dtype)
+        if len(views) == 1:
+            return views[0]
+        return np.concatenate(views)
+
+    def rotations(self, board, start, stop):
+        """
+        Return the rotation starts in a time range with fields
+        'chunk' (chunk start), 'part' (chunk part), 'row' and 'time'
+
+        Args:
+        board (str): board name
+        start (float): start time
+        stop (float): stop time
+        """
+        parts = []
+        for chunk in self.chunks(board, start, stop):
+            rot = chunk.rotations()
+            rot = rot[(rot['time'] >= start) & (rot['time'] < stop)]
+            part = np.empty(len(rot), dtype=rotations_dtype)
+            part['chunk'] = chunk.start
+            part['part'] = chunk.part
+            part['row'] = rot['row']
+            part['time'] = rot['time']
+            parts.append(part)
+        if len(parts) == 0:
+            return np.empty(0, dtype=rotations_dtype)
+        return np.concatenate(parts)
+
+    def rotation(self, board, t):
+        """
+        Return the records of the rotation under way at time t, as a
+        view unless it crosses a chunk boundary
+
+        Args:
+        board (str): board name
+        t (float): time
+        """
+        # A rotation at the slowest speeds in use takes under a minute
+        rot = self.rotations(board, t - 60., t + 60.)
+        i = np.searchsorted(rot['time'], t, 'right') - 1
+        if i < 0 or i + 1 >= len(rot):
+            return np.empty(0, dtype=record_dtype)
+        if (rot['chunk'][i] == rot['chunk'][i + 1] and
+           rot['part'][i] == rot['part'][i + 1]):
+            chunk = self._find(board, rot['chunk'][i], rot['part'][i])
+            return chunk.data()[rot['row'][i]:rot['row'][i + 1]]
+        return self.read(board, rot['time'][i], rot['time'][i + 1])
+
+    # ***** Helper Methods *****
+    def _chunk(self, board, key, synced):
+        """
+        Return the chunk being written for a board, chunk key and time
+        source
+        """
+        start = float(key * self.chunk_seconds)
+        chunk = self._open.get(board)
+        if chunk is not None and chunk.start == start and \
+           chunk.synced == synced:
+            return chunk
+        if chunk is not None:
+            chunk.close()
+        t = dt.datetime.fromtimestamp(start)
+        bdir = os.path.join(self.archive_dir, t.strftime("%Y_%m_%d"), board)
+        if not os.path.isdir(bdir):
+            os.makedirs(bdir)
+
+        # Carry on with the last part of the slot, unless its time
+        # source differs
+        base = os.path.join(bdir, t.strftime("%H%M%S"))
+        part = 0
+        while os.path.exists(self._part_path(base, part + 1) + '.json'):
+            part += 1
+        if (os.path.exists(self._part_path(base, part) + '.json') and
+           Chunk(self._part_path(base, part)).synced != synced):
+            part += 1
+        new = not os.path.exists(self._part_path(base, part) + '.json')
+        chunk = Chunk(self._part_path(base, part), start, write=True,
+                      synced=synced, part=part)
+        self._open[board] = chunk
+        if new:
+            self.prune()
+        return chunk
+
+    def _part_path(self, base, part):
+        return base if part == 0 else "%s_%d" % (base, part)
+
+    def _size(self, path):
+        """ Bytes on disk of a chunk """
+        size = 0
+        for ext in ['.json', '.rot', '.enc']:
+            try:
+                size += os.path.getsize(path + ext)
+            except OSError:
+                pass
+        return size
+
+    def _find(self, board, start, part=0):
+        for chunk in self.chunks(board, start, start + 1.):
+            if chunk.start == start and chunk.part == part:
+                return chunk
+        raise Exception('Archive Exception: no %s chunk at %.0f'
+                        % (board, start))
@@ -0,0 +1,176 @@
+# Built-in python modules
+import numpy as np
+
+# Packets sent over UDP by Beaglebone_Encoder_DAQ on each Beaglebone.
+# Every packet starts with a little-endian uint32 header word
+counter_header = 0x1EAF
+irig_header = 0xCAFE
+timeout_header = 0x1234
+error_header = 0xE12A
+
+# Edges per counter packet
+counter_length = 120
+
+# Counter packet: quadrature bit, PRU clock tick and edge count of
+# each encoder edge
+counter_dtype = np.dtype([
+    ('header', '<u4'),
+    ('quad', '<u4', (counter_length,)),
+    ('clock', '<u4', (counter_length,)),
+    ('count', '<u4', (counter_length,))])
+
+# IRIG packet: PRU clock tick of the IRIG second marker, the ten IRIG
+# info words and the clock ticks of the sub-second synch pulses
+irig_dtype = np.dtype([
+    ('header', '<u4'),
+    ('rising_edge', '<u4'),
+    ('info', '<u4', (10,)),
+    ('synch', '<u4', (21,))])
+
+# Timeout packet: no encoder edges or IRIG frames for a while.
+# The type word says which (1 = encoder, 2 = IRIG)
+timeout_dtype = np.dtype([
+    ('header', '<u4'),
+    ('type', '<u4')])
+
+error_dtype = np.dtype([
+    ('header', '<u4')])
+
+sizes = {counter_header: counter_dtype.itemsize,
+         irig_header: irig_dtype.itemsize,
+         timeout_header: timeout_dtype.itemsize,
+         error_header: error_dtype.itemsize}
+
+# Largest packet
+max_size = max(sizes.values())
+
+
+def padded(dtype, itemsize):
+    """
+    Return dtype laid out in slots of itemsize bytes, so a buffer of
+    fixed-size packet slots can be viewed as one structured array
+
+    Args:
+    dtype (np.dtype): packet dtype
+    itemsize (int): slot size [bytes]
+    """
+    return np.dtype({'names': dtype.names,
+                     'formats': [dtype.fields[n][0] for n in dtype.names],
+                     'offsets': [dtype.fields[n][1] for n in dtype.names],
+                     'itemsize': itemsize})
+
+
+def pack_counter(quad, clock, count):
+    """
+    Build a counter packet
+
+    Args:
+    quad (array): quadrature bit of each edge
+    clock (array): PRU clock tick of each edge
+    count (array): edge count of each edge
+    """
+    pkt = np.zeros(1, counter_dtype)
+    pkt['header'] = counter_header
+    pkt['quad'] = quad
+    pkt['clock'] = clock
+    pkt['count'] = count
+    return pkt.tobytes()
+
+
+def pack_irig(rising_edge, t, synch=None):
+    """
+    Build an IRIG packet
+
+    Args:
+    rising_edge (int): PRU clock tick of the second marker
+    t (float): UTC time of the second marker
+    synch (array): clock ticks of the synch pulses (default zeros)
+    """
+    pkt = np.zeros(1, irig_dtype)
+    pkt['header'] = irig_header
+    pkt['rising_edge'] = rising_edge
+    pkt['info'] = irig_encode(t)
+    if synch is not None:
+        pkt['synch'] = synch
+    return pkt.tobytes()
+
+
+def pack_timeout(kind=1):
+    """
+    Build a timeout packet
+
+    Args:
+    kind (int): 1 for encoder, 2 for IRIG (default 1)
+    """
+    pkt = np.zeros(1, timeout_dtype)
+    pkt['header'] = timeout_header
+    pkt['type'] = kind
+    return pkt.tobytes()
+
+
+# IRIG-B time fields: (info word, bit shift) of seconds, minutes,
+# hours, day of year (units, hundreds) and two-digit year
+_irig_fields = {'sec': (0, 1), 'min': (1, 0), 'hour': (2, 0),
+                'day': (3, 0), 'day100': (4, 0), 'year': (5, 0)}
+# BCD digit weights of the nine bits in a field; bit 4 is unused
+_irig_weights = [1, 2, 4, 8, 0, 10, 20, 40, 80]
+
+
+def irig_decode(info):
+    """
+    Decode the IRIG-B time fields of the info words
+
+    Args:
+    info (array): (..., 10) info words
+
+    Returns dict of int arrays: sec, min, hour, day (of year), year
+    """
+    info = np.asarray(info, dtype=np.int64)
+    out = {}
+    for name, (word, shift) in _irig_fields.items():
+        val = np.zeros(info.shape[:-1], dtype=np.int64)
+        for bit, weight in enumerate(_irig_weights):
+            val += ((info[..., word] >> (bit + shift)) & 1) * weight
+        out[name] = val
+    out['day'] = out['day'] + 100 * out.pop('day100')
+    out['year'] = out['year'] + 2000
+    return out
+
+
+def irig_to_unix(info):
+    """
+    Return the UTC time [sec] of the IRIG info words
+
+    Args:
+    info (array): (..., 10) info words
+    """
+    f = irig_decode(info)
+    year = (f['year'] - 1970).astype('datetime64[Y]')
+    days = (year.astype('datetime64[D]') +
+            (f['day'] - 1).astype('timedelta64[D]'))
+    return (days.astype('datetime64[s]').astype(np.int64) +
+            3600 * f['hour'] + 60 * f['min'] + f['sec']).astype(np.float64)
+
+
+def irig_encode(t):
+    """
+    Encode a UTC time [sec] as IRIG info words
+
+    Args:
+    t (float): UTC time, rounded down to the second
+    """
+    sec = np.datetime64(int(t), 's')
+    year = sec.astype('datetime64[Y]')
+    doy = int((sec.astype('datetime64[D]') -
+               year.astype('datetime64[D]')).astype(np.int64)) + 1
+    tod = int(t) % 86400
+    fields = {'sec': tod % 60, 'min': (tod // 60) % 60,
+              'hour': tod // 3600, 'day': doy % 100, 'day100': doy // 100,
+              'year': (year.astype(np.int64) + 1970) % 100}
+    info = np.zeros(10, dtype=np.uint32)
+    for name, (word, shift) in _irig_fields.items():
+        # Units digit in bits 0-3, tens digit in bits 5-8
+        val = int(fields[name])
+        bits = (val % 10) | ((val // 10) << 5)
+        info[word] |= bits << shift
+    return info
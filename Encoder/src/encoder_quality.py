@@ -0,0 +1,342 @@
+# Built-in python modules
+import collections
+import threading
+import time as tm
+import sys as sy
+import os
+import numpy as np
+
+this_dir = os.path.dirname(__file__)
+sy.path.append(
+    os.path.join(this_dir, '..', '..', "config"))
+sy.path.append(
+    os.path.join(this_dir, '..', '..', "housekeeping"))
+
+import pb2b_config as cg  # noqa: E402
+import hk_store as hs  # noqa: E402
+import spool as sp  # noqa: E402
+import log_encoder as lg  # noqa: E402
+
+
+class Quality:
+    """
+    The Quality object watches the encoder data of both boards over a
+    sliding window and acts when a board degrades:
+
+    loss          fraction of edges lost in dropped packets
+    jitter        rms of edge intervals about the slot period [sec]
+    missing refs  rotations without a detected reference
+    since packet  time since the board sent any packet [sec]
+    skew          drift of the angle offset between the boards,
+                  as a time [sec]
+
+    Edge metrics come from the Tracker records, packet metrics from
+    the Receiver counters. Every period the metrics are appended to
+    the housekeeping store (group 'encoder') and published to slowdaq
+    as CHWP_Encoder.
+
+    Only boards whose collection is wanted are judged. A board that
+    stops sending, or whose loss, jitter or missing references pass
+    their limits while it is spinning, gets its packet collection
+    restarted. If it is still bad once the holdoff has passed, it is
+    rebooted and collection is started again after the boot. After
+    cg.encoder_max_reboots reboots without recovery the board is only
+    reported. Skew has no single culprit and is only logged.
+
+    Args:
+    receiver (encoder_receiver.Receiver): packet receiver
+    tracker (encoder_angle.Tracker): angle reconstruction
+    restart (callable): restart(index) restarts collection on a board
+    reboot (callable): reboot(index) reboots a board
+    wanted (callable): wanted(index) is whether collection on a board
+                       should be running (default all boards)
+    auto (bool): take actions, otherwise only report (default True)
+    publish (bool): publish to slowdaq (default True)
+    """
+    # Seconds from a reboot to starting collection again
+    boot_time = 90.
+
+    def __init__(self, receiver, tracker, restart=None, reboot=None,
+                 wanted=None, auto=True, publish=True):
+        self.receiver = receiver
+        self.tracker = tracker
+        self.names = list(tracker.boards.keys())
+        self._restart = restart
+        self._reboot = reboot
+        self._wanted = wanted
+        self.auto = auto
+        self.window = cg.encoder_quality_window
+        self.period = cg.encoder_quality_period
+        self.limits = {'loss': cg.encoder_max_loss,
+                       'jitter': cg.encoder_max_jitter,
+                       'missing refs': cg.encoder_max_missing_refs}
+        self._log = lg.Logging()
+        self._store = hs.Store()
+        self._pub = None
+        if publish:
+            self._pub = sp.Spool(
+                'CHWP_Encoder', self._publisher,
+                max_bytes=cg.slowdaq_spool_max_bytes)
+
+        # Per-board samples in the window:
+        # (time, edges, squared residual sum, residuals, refs, wraps)
+        self._edges = {name: collections.deque() for name in self.names}
+        # Per-board receiver counters: (time, edges, missed edges)
+        self._packets = {name: collections.deque() for name in self.names}
+        # Recent (time, angle) of each board, for the skew
+        self._angles = {name: (np.empty(0), np.empty(0))
+                        for name in self.names}
+        self._skew_ref = None
+        self._lock = threading.Lock()
+
+        # Last action per board: (monotonic time, 'restart' or 'reboot')
+        self._actions = {name: None for name in self.names}
+        # Reboots of each board since it was last good
+        self._reboots = {name: 0 for name in self.names}
+        # Pending collection starts after a reboot: board -> time
+        self._boot = {}
+        self.latest = None
+        self._running = False
+        self._started = tm.time()
+        self._thread = None
+
+    # ***** Public Methods *****
+    def consume(self, record):
+        """
+        Take a Tracker edge record
+
+        Args:
+        record (dict): edge record
+        """
+        name = record['board']
+        t = record['time']
+        if name not in self._edges or len(t) < 3:
+            return
+        dt = np.diff(t)
+        dp = np.abs(np.diff(record['position']))
+        ok = dp > 0
+        resid = np.empty(0)
+        if ok.any():
+            period = np.median(dt[ok] / dp[ok])
+            resid = dt[ok] - dp[ok] * period
+        refs = int(np.count_nonzero(record['ref']))
+        # Angle wraps are the reference crossings that should have been
+        # seen, whichever way the rotor turns
+        angle = record['angle']
+        wraps = int(np.count_nonzero(np.abs(np.diff(angle)) > np.pi))
+        with self._lock:
+            self._edges[name].append(
+                (t[-1], len(t), float(np.sum(resid**2)), len(resid),
+                 refs, wraps))
+            # Only IRIG times are comparable between the boards
+            if record['synced'] and not np.isnan(angle).all():
+                ht, ha = self._angles[name]
+                keep = ht > t[-1] - 2.
+                self._angles[name] = (
+                    np.concatenate((ht[keep], t)),
+                    np.concatenate((ha[keep], angle)))
+        return
+
+    def start(self):
+        """ Start the monitor thread """
+        if self._running:
+            return False
+        self._running = True
+        self._started = tm.time()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """ Stop the monitor thread """
+        if not self._running:
+            return False
+        self._running = False
+        self._thread.join()
+        if self._pub is not None:
+            self._pub.close()
+        return True
+
+    def update(self):
+        """ Compute the window metrics, record them and act on them """
+        now = tm.time()
+        stats = self.receiver.stats()
+        sample = {}
+        breach = {}
+        with self._lock:
+            for name in self.names:
+                m = self._board(name, stats[name], now)
+                for key, val in m.items():
+                    sample["%s %s" % (name, key)] = val
+                breach[name] = self._breach(m)
+            skew = self._skew()
+        sample['skew'] = skew
+        if not np.isnan(skew) and abs(skew) > cg.encoder_max_skew:
+            self._log.err("Quality.update(): Inter-board skew %.2e sec"
+                          % (skew))
+        self.latest = sample
+
+        self._store.append('encoder', sample, now)
+        if self._pub is not None:
+            self._pub.put(dict(sample, time=now))
+        self._act(breach)
+        return sample
+
+    # ***** Helper Methods *****
+    def _publisher(self):
+        """ slowdaq Publisher, built from the spool thread """
+        sy.path.append(cg.slowdaq_folder)
+        from slowdaq.pb2 import Publisher
+        return Publisher('CHWP_Encoder', cg.slowdaq_ip, cg.slowdaq_port)
+
+    def _run(self):
+        """ Monitor thread """
+        while self._running:
+            t0 = tm.monotonic()
+            try:
+                self.update()
+            except Exception as e:
+                self._log.err("Quality._run(): %s" % (str(e)))
+            self._start_after_boot()
+            while self._running and tm.monotonic() - t0 < self.period:
+                tm.sleep(0.1)
+        return
+
+    def _board(self, name, st, now):
+        """ Window metrics of one board """
+        start = now - self.window
+        edges = self._edges[name]
+        while len(edges) > 0 and edges[0][0] < start:
+            edges.popleft()
+        packets = self._packets[name]
+        packets.append((now, st['edges'], st['missed_edges']))
+        while len(packets) > 1 and packets[0][0] < start:
+            packets.popleft()
+
+        n_edges = sum(e[1] for e in edges)
+        n_resid = sum(e[3] for e in edges)
+        got = packets[-1][1] - packets[0][1]
+        missed = packets[-1][2] - packets[0][2]
+        latest = self.tracker.boards[name].latest
+        return {
+            'loss': missed / float(got + missed) if got + missed > 0 else 0.,
+            'jitter': (np.sqrt(sum(e[2] for e in edges) / n_resid)
+                       if n_resid > 0 else np.nan),
+            'missing refs': max(0, sum(e[5] for e in edges) -
+                                sum(e[4] for e in edges)),
+            'edges': n_edges,
+            'packet rate': st['packet_rate'],
+            # Counted from the start until the first packet
+            'since packet': now - (st['last_time'] or self._started),
+            'freq': latest['freq'] if latest is not None else np.nan}
+
+    def _breach(self, m):
+        """ Return why a board is bad, or None """
+        if m['since packet'] > cg.encoder_stall:
+            # IRIG packets come every second even when the rotor is
+            # still, so silence means the collector is down
+            return "no packets for %.0f sec" % (m['since packet'])
+        if m['edges'] < 2 * cg.encoder_slots:
+            # Too few edges to judge the rest
+            return None
+        for key, limit in self.limits.items():
+            if m[key] > limit:
+                return "%s %.3g over %.3g" % (key, m[key], limit)
+        return None
+
+    def _skew(self):
+        """
+        Change of the angle offset between the first two boards since
+        the first measurement, as a time
+        """
+        if len(self.names) < 2:
+            return np.nan
+        (t1, a1), (t2, a2) = [self._angles[n] for n in self.names[:2]]
+        if len(t1) < 2 or len(t2) < 2:
+            return np.nan
+        sel = (t1 >= t2[0]) & (t1 <= t2[-1])
+        if not sel.any():
+            return np.nan
+        a2i = np.interp(t1[sel], t2, np.unwrap(a2))
+        offset = np.angle(np.mean(np.exp(1j * (a1[sel] - a2i))))
+        if self._skew_ref is None:
+            self._skew_ref = offset
+        latest = self.tracker.latest()
+        freq = abs(latest['freq']) if latest is not None else np.nan
+        if not freq > 0:
+            return np.nan
+        drift = np.angle(np.exp(1j * (offset - self._skew_ref)))
+        return drift / (2. * np.pi * freq)
+
+    def _is_wanted(self, name):
+        """ Whether collection on a board should be running """
+        if self._wanted is None:
+            return True
+        return self._wanted(self.names.index(name) + 1)
+
+    def _act(self, breach):
+        """ Restart, then reboot, a board that stays bad """
+        for i, name in enumerate(self.names):
+            why = breach[name]
+            index = i + 1
+            last = self._actions[name]
+            now = tm.monotonic()
+            if not self._is_wanted(name):
+                # Stopped by the operator, not ours to bring back
+                self._actions[name] = None
+                self._reboots[name] = 0
+                self._boot.pop(name, None)
+                continue
+            if why is None:
+                if (last is not None and name not in self._boot and
+                   now - last[0] > cg.encoder_action_holdoff):
+                    # Recovered, start over with a restart next time
+                    self._actions[name] = None
+                    self._reboots[name] = 0
+                continue
+            if name in self._boot or (
+                    last is not None and now - last[0] < cg.encoder_action_holdoff):
+                # Give the last action time to work
+                continue
+            if not self.auto:
+                self._log.err("Quality: %s bad (%s)" % (name, why))
+                continue
+            if self._reboots[name] >= cg.encoder_max_reboots:
+                # Reported once per holdoff until it recovers
+                self._log.err("Quality: %s still bad (%s) after %d reboots"
+                              % (name, why, self._reboots[name]))
+                self._actions[name] = (now, 'reboot')
+                continue
+            if last is None or last[1] == 'reboot':
+                self._log.err("Quality: %s bad (%s), restarting collection"
+                              % (name, why))
+                self._actions[name] = (now, 'restart')
+                if self._restart is not None:
+                    self._restart(index)
+            else:
+                self._log.err("Quality: %s still bad (%s), rebooting"
+                              % (name, why))
+                self._actions[name] = (now, 'reboot')
+                self._reboots[name] += 1
+                if self._reboot is not None:
+                    self._reboot(index)
+                self._boot[name] = now + self.boot_time
+                if self._reboots[name] >= cg.encoder_max_reboots:
+                    self._log.err("Quality: %s rebooted %d times, no further "
+                                  "actions until it recovers"
+                                  % (name, self._reboots[name]))
+        return
+
+    def _start_after_boot(self):
+        """ Start collection on boards whose reboot is done """
+        now = tm.monotonic()
+        for name, due in list(self._boot.items()):
+            if now < due:
+                continue
+            del self._boot[name]
+            self._actions[name] = (now, 'reboot')
+            self._log.out("Quality: %s rebooted, restarting collection"
+                          % (name))
+            if self._restart is not None:
+                self._restart(self.names.index(name) + 1)
+        return
@@ -0,0 +1,293 @@
+# Built-in python modules
+import queue
+import select
+import socket
+import threading
+import time as tm
+import sys as sy
+import os
+import numpy as np
+
+this_dir = os.path.dirname(__file__)
+sy.path.append(
+    os.path.join(this_dir, '..', '..', "config"))
+
+import pb2b_config as cg  # noqa: E402
+import encoder_packets as ep  # noqa: E402
+import log_encoder as lg  # noqa: E402
+
+
+class Receiver:
+    """
+    The Receiver object ingests the UDP packet streams of both
+    Beaglebones on one port and tells the boards apart by source
+    address. Packets are read in batches into a preallocated buffer of
+    fixed-size slots: once data arrives, every packet the kernel has
+    queued is read without waiting, up to the batch size. Each
+    batch is decoded at once by viewing the buffer as structured
+    arrays, so the per-packet cost is only the read itself.
+
+    Edge counts are checked for continuity to find dropped packets,
+    and packet and edge rates are kept per board. Decoded blocks,
+    one per board and packet type per batch, are handed to the
+    consumers registered with subscribe() from a separate thread, so a
+    slow consumer never holds up reception:
+
+    {'board': name, 'type': 'counter', 'time': arrival time of each
+     packet, 'quad', 'clock', 'count': per-edge arrays}
+    {'board': name, 'type': 'irig', 'time', 'rising_edge', 'info',
+     'synch': per-packet arrays}
+
+    Args:
+    boards (dict): source ip -> board name (default the two Beaglebones)
+    ip (str): address to listen on (default all)
+    port (int): UDP port (default cg.encoder_port)
+    batch (int): packet slots per batch (default 256)
+    rcvbuf (int): socket receive buffer [bytes] (default cg.encoder_rcvbuf)
+    queue_size (int): blocks waiting for the consumers (default 1000)
+    """
+    def __init__(self, boards=None, ip='', port=cg.encoder_port,
+                 batch=256, rcvbuf=cg.encoder_rcvbuf, queue_size=1000):
+        if boards is None:
+            boards = {cg.bb1_ip: 'encoder1', cg.bb2_ip: 'encoder2'}
+        self.boards = boards
+        self.names = sorted(set(boards.values()))
+        self._board_index = {addr: self.names.index(name)
+                             for addr, name in boards.items()}
+        self.batch = batch
+        self._log = lg.Logging()
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        self.sock.bind((ip, port))
+        self.sock.setblocking(False)
+        self._poll = select.poll()
+        self._poll.register(self.sock, select.POLLIN)
+        # Wait this long for the first packet of a batch [ms]
+        self._wait = 500
+
+        # Packet slots, rounded up to keep the fields aligned
+        self._slot = 8 * ((ep.max_size + 64 + 7) // 8)
+        self._buf = bytearray(self._slot * self.batch)
+        view = memoryview(self._buf)
+        self._slots = [view[i * self._slot:(i + 1) * self._slot]
+                       for i in range(self.batch)]
+        self._size = np.zeros(self.batch, dtype=np.int64)
+        self._time = np.zeros(self.batch, dtype=np.float64)
+        self._board = np.zeros(self.batch, dtype=np.int64)
+        # Views of the whole buffer as each packet type
+        self._counter = np.frombuffer(
+            self._buf, ep.padded(ep.counter_dtype, self._slot))
+        self._irig = np.frombuffer(
+            self._buf, ep.padded(ep.irig_dtype, self._slot))
+        self._timeout = np.frombuffer(
+            self._buf, ep.padded(ep.timeout_dtype, self._slot))
+
+        self._stats = {name: self._new_stats() for name in self.names}
+        self.unknown = 0
+        self.dropped_blocks = 0
+        self._rate_period = 1.
+
+        self._consumers = []
+        self._blocks = queue.Queue(maxsize=queue_size)
+        self._running = False
+        self._threads = []
+
+    def __del__(self):
+        self.stop()
+
+    # ***** Public Methods *****
+    def subscribe(self, func):
+        """
+        Register a consumer of the decoded blocks
+
+        Args:
+        func (callable): called as func(block) from the dispatch thread
+        """
+        self._consumers.append(func)
+        return True
+
+    def start(self):
+        """ Start the receive and dispatch threads """
+        if self._running:
+            return False
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._run, daemon=True),
+            threading.Thread(target=self._dispatch, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        self._log.out(
+            "Receiver.start(): Receiving encoder packets on port %d"
+            % (self.sock.getsockname()[1]))
+        return True
+
+    def stop(self):
+        """ Stop the threads and close the socket """
+        if not getattr(self, '_running', False):
+            return False
+        self._running = False
+        for thread in self._threads:
+            thread.join()
+        self.sock.close()
+        self._log.out("Receiver.stop(): Stopped, %s" % (self._summary()))
+        return True
+
+    def stats(self):
+        """ Return the per-board counters and rates """
+        out = {name: {k: v for k, v in st.items() if not k.startswith('_')}
+               for name, st in self._stats.items()}
+        out['unknown'] = self.unknown
+        out['dropped_blocks'] = self.dropped_blocks
+        return out
+
+    # ***** Helper Methods *****
+    def _new_stats(self):
+        return {'packets': 0, 'edges': 0, 'irig': 0, 'timeouts': 0,
+                'errors': 0, 'malformed': 0, 'bytes': 0,
+                'gaps': 0, 'missed_edges': 0, 'out_of_order': 0,
+                'last_count': None, 'last_time': None,
+                'packet_rate': 0., 'edge_rate': 0.,
+                '_window': (tm.monotonic(), 0, 0)}
+
+    def _run(self):
+        """ Receive thread """
+        while self._running:
+            n = self._read()
+            if n > 0:
+                self._decode(n)
+            self._rates()
+        return
+
+    def _read(self):
+        """ Read one batch of packets into the slots """
+        n = 0
+        if len(self._poll.poll(self._wait)) == 0:
+            return n
+        while n < self.batch:
+            try:
+                nbytes, addr = self.sock.recvfrom_into(self._slots[n])
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                if self._running:
+                    self._log.err("Receiver._read(): %s" % (str(e)))
+                break
+            self._size[n] = nbytes
+            self._time[n] = tm.time()
+            self._board[n] = self._board_index.get(addr[0], -1)
+            n += 1
+        return n
+
+    def _decode(self, n):
+        """ Sort a batch by board and type and decode it """
+        size = self._size[:n]
+        header = self._timeout['header'][:n]
+        board = self._board[:n]
+        self.unknown += int(np.count_nonzero(board < 0))
+
+        is_counter = ((header == ep.counter_header) &
+                      (size == ep.counter_dtype.itemsize))
+        is_irig = (header == ep.irig_header) & (size == ep.irig_dtype.itemsize)
+        is_timeout = ((header == ep.timeout_header) &
+                      (size == ep.timeout_dtype.itemsize))
+        is_error = header == ep.error_header
+        for b, name in enumerate(self.names):
+            mine = board == b
+            if not mine.any():
+                continue
+            st = self._stats[name]
+            st['packets'] += int(np.count_nonzero(mine))
+            st['bytes'] += int(size[mine].sum())
+            st['last_time'] = float(self._time[:n][mine][-1])
+            st['timeouts'] += int(np.count_nonzero(mine & is_timeout))
+            st['errors'] += int(np.count_nonzero(mine & is_error))
+            st['malformed'] += int(np.count_nonzero(
+                mine & ~(is_counter | is_irig | is_timeout | is_error)))
+
+            sel = mine & is_counter
+            if sel.any():
+                self._counter_block(name, st, sel)
+            sel = mine & is_irig
+            if sel.any():
+                pkts = self._irig[:n][sel]
+                st['irig'] += len(pkts)
+                self._handoff({'board': name, 'type': 'irig',
+                               'time': self._time[:n][sel],
+                               'rising_edge': pkts['rising_edge'],
+                               'info': pkts['info'],
+                               'synch': pkts['synch']})
+        return
+
+    def _counter_block(self, name, st, sel):
+        """ Check edge count continuity and hand off a counter block """
+        n = len(sel)
+        pkts = self._counter[:n][sel]
+        count = pkts['count']
+        st['edges'] += count.size
+
+        # Each packet should pick up one past the last edge of the one
+        # before it. A forward jump is a gap, a backward one is a
+        # reordered packet or a board restart
+        first = count[:, 0].astype(np.int64)
+        last = count[:, -1].astype(np.int64)
+        prev = np.empty_like(first)
+        prev[0] = first[0] - 1 if st['last_count'] is None else st['last_count']
+        prev[1:] = last[:-1]
+        step = (first - prev - 1) % 2**32
+        gaps = (step > 0) & (step < 2**31)
+        st['gaps'] += int(np.count_nonzero(gaps))
+        st['missed_edges'] += int(step[gaps].sum())
+        st['out_of_order'] += int(np.count_nonzero(step >= 2**31))
+        st['last_count'] = int(last[-1])
+
+        self._handoff({'board': name, 'type': 'counter',
+                       'time': self._time[:n][sel],
+                       'quad': pkts['quad'].ravel(),
+                       'clock': pkts['clock'].ravel(),
+                       'count': count.ravel()})
+        return
+
+    def _handoff(self, block):
+        """ Queue a block for the consumers """
+        if len(self._consumers) == 0:
+            return
+        try:
+            self._blocks.put_nowait(block)
+        except queue.Full:
+            self.dropped_blocks += 1
+        return
+
+    def _dispatch(self):
+        """ Dispatch thread """
+        while self._running or not self._blocks.empty():
+            try:
+                block = self._blocks.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            for func in self._consumers:
+                try:
+                    func(block)
+                except Exception as e:
+                    self._log.err(
+                        "Receiver._dispatch(): Consumer %s failed: %s"
+                        % (getattr(func, '__name__', str(func)), str(e)))
+        return
+
+    def _rates(self):
+        """ Update the packet and edge rates once per period """
+        now = tm.monotonic()
+        for st in self._stats.values():
+            t0, packets0, edges0 = st['_window']
+            if now - t0 < self._rate_period:
+                continue
+            st['packet_rate'] = (st['packets'] - packets0) / (now - t0)
+            st['edge_rate'] = (st['edges'] - edges0) / (now - t0)
+            st['_window'] = (now, st['packets'], st['edges'])
+        return
+
+    def _summary(self):
+        return ', '.join(
+            "%s: %d packets, %d gaps (%d edges missed)"
+            % (name, st['packets'], st['gaps'], st['missed_edges'])
+            for name, st in self._stats.items())
@@ -0,0 +1,15 @@
+# Built-in python modules
+import sys as sy
+import os
+
+# Shared logging backend
+sy.path.append(os.path.join(os.path.dirname(__file__), '..', '..', "housekeeping"))
+import log_backend as lb  # noqa: E402
+
+
+class Logging(lb.Logging):
+    """ The Logging object saves encoder DAQ logging messages """
+    def __init__(self):
+        super().__init__("encoder")
+        self.log("Logging to file '%s'" % (os.path.join(
+            self._backend.log_dir, "%s_log_*.txt" % (self.subsystem))))
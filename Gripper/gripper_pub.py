@@ -6,31 +6,59 @@ this_dir = os.path.dirname(__file__)
 sys.path.append(
     os.path.join(this_dir, 'src'))
 sys.path.append(
-    os.path.join(this_dir, '..', '..', 'config'))
+    os.path.join(this_dir, '..', 'config'))
+sys.path.append(
+    os.path.join(this_dir, '..', 'housekeeping'))
 
-import gripper_open_command_close as occ
+import gripper_session as gs
 import pb2b_config as cg
+import delta as dl
+import hk_store as hs
+import spool as sp
+import poll_scheduler as ps
+import acq_clock as ac
 
 sys.path.append(cg.slowdaq_folder)
 
 from slowdaq.pb2 import Publisher
 
-pub = Publisher('CHWP_Gripper',cg.slowdaq_ip,cg.slowdaq_port)
+# Packets are spooled to disk and published from a background
+# thread, so polling never waits on the slowdaq server
+pub = sp.Spool('CHWP_Gripper', lambda: Publisher('CHWP_Gripper',cg.slowdaq_ip,cg.slowdaq_port),
+               max_bytes=cg.slowdaq_spool_max_bytes)
+store = hs.Store()
+# Monotonic UTC clock for acquisition stamps
+clock = ac.Clock()
+# Status reads go through the asyncio PLC client, which bounds each
+# request and sends the four module reads back to back
+session = gs.Session(asynchronous=True)
+# Poll rates follow the CHWP state within the device budgets
+sched = ps.Scheduler(['gripper'], cg.poll_intervals, cg.poll_devices,
+                     cg.poll_budgets)
+
+# Send a keyframe every status_keyframe_interval and only
+# the changed bits in between
+delta = dl.Delta(cg.status_keyframe_interval)
 
 while True:
+    sched.next_due()
     try:
-        status = occ.open_command_close('status')        
+        # Skip the poll if a control command holds the port
+        status, now, latency = session.status(timeout=0., clock=clock)
     except BlockingIOError:
         print('Busy! Trying again...')
         time.sleep(2)
     else:
         if type(status) == dict:
-            pub.serve()
-            status['time'] - time.time()
-            data = pub.pack(status)
-            pub.queue(data)
-            print('Sending data...')
-            time.sleep(10)
+            # Every sample is kept locally, only changes are published.
+            # The sample is stamped with the query midpoint
+            store.append('gripper', dict(status, latency=latency), now)
+            packet = delta.encode(status, now)
+            if packet is not None:
+                packet['latency'] = latency
+                pub.put(packet)
+                print('Sending data...')
+            sched.done('gripper')
         else:
             print('Bad output, trying again...')
             time.sleep(2)
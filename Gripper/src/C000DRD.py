@@ -22,68 +22,18 @@ class C000DRD:
     def __init__(self, rtu_port=None, tcp_ip=None, tcp_port=None):
         # Connect to device
         self._conn(rtu_port, tcp_ip, tcp_port)
-
-        # Private variables
-        self._count = 1  # Number of bytes to read -- defaults to 1
-        self._unit = 1  # ID of the slave -- always 1 for the CHWP gripper
-
-        # Click PLC Addresses as shown in the Windows software
-        # Hardware configuration from right to left:
-        # C0-00DR-D : C0-08TR : C0-16NE3
-
-        # Unit 00 = C0-00DR-D
-        # Read only -- not controllable by user
-        self.X001 = 100001
-        self.X002 = 100002
-        self.X003 = 100003
-        self.X004 = 100004
-        self.X005 = 100005
-        self.X006 = 100006
-        self.X007 = 100007
-        self.X008 = 100008
-        # Read/write -- controllable by user
-        self.Y001 = 8192
-        self.Y002 = 8193
-        self.Y003 = 8194
-        self.Y004 = 8195
-        self.Y005 = 8196
-        self.Y006 = 8197
-
-        # Unit 10 = C0-08TR
-        # Read/write -- controllable by user
-        self.Y101 = 8224
-        self.Y102 = 8225
-        self.Y103 = 8226
-        self.Y104 = 8227
-        self.Y105 = 8228
-        self.Y106 = 8229
-        self.Y107 = 8230
-        self.Y108 = 8231
-
-        # Unit 20 = C0-16NE3
-        # Read only -- not controllable by user
-        self.X201 = 100065
-        self.X202 = 100066
-        self.X203 = 100067
-        self.X204 = 100068
-        self.X205 = 100069
-        self.X206 = 100070
-        self.X207 = 100071
-        self.X208 = 100072
-        self.X209 = 100073
-        self.X210 = 100074
-        self.X211 = 100075
-        self.X212 = 100076
-        self.X213 = 100077
-        self.X214 = 100078
-        self.X215 = 100079
-        self.X216 = 100080
+        self._map_addresses()
 
     def __del__(self):
         self.client.close()
         del self.client
 
     # ***** Public Methods *****
+    def close(self):
+        """ Close the connection """
+        self.client.close()
+        return
+
     def read_pin(self, addr):
         """
         Read PLC switch
@@ -91,8 +41,19 @@ class C000DRD:
         Args:
         addr (int): PLC address from which to read
         """
-        return self.client.read_discrete_inputs(
-            self._addr(addr), self._count, unit=self._unit).bits[0]
+        return self._bits(self.client.read_discrete_inputs(
+            self._addr(addr), self._count, unit=self._unit), self._count)[0]
+
+    def read_pins(self, addr, count):
+        """
+        Read a block of consecutive PLC switches in one request
+
+        Args:
+        addr (int): first PLC address from which to read
+        count (int): number of consecutive switches to read
+        """
+        return self._bits(self.client.read_discrete_inputs(
+            self._addr(addr), count, unit=self._unit), count)
 
     def set_pin_on(self, addr):
         """
@@ -125,6 +86,13 @@ class C000DRD:
             self._addr(addr), [not read_pin(addr)], unit=self._unit)
 
     # ***** Helper Methods *****
+    def _bits(self, rr, count):
+        """ Return the bits of a read response, raising on an error reply """
+        if rr is None or rr.isError() or not hasattr(rr, 'bits'):
+            raise Exception(
+                'C000DRD Exception: read failed: %s' % (str(rr)))
+        return rr.bits[:count]
+
     def _addr(self, addr):
         """ Convert provided address to correct Modbus address """
         if addr > 65535:
@@ -155,3 +123,61 @@ class C000DRD:
                 tcp_ip, port=int(tcp_port), baudrate=38400,
                 timeout=0.1, parity=serial.PARITY_ODD, framer=ModbusRtuFramer)
             self.conn = self.client.connect()
+
+    def _map_addresses(self):
+        """ Assign the Click PLC address map """
+        # Private variables
+        self._count = 1  # Number of bytes to read -- defaults to 1
+        self._unit = 1  # ID of the slave -- always 1 for the CHWP gripper
+
+        # Click PLC Addresses as shown in the Windows software
+        # Hardware configuration from right to left:
+        # C0-00DR-D : C0-08TR : C0-16NE3
+
+        # Unit 00 = C0-00DR-D
+        # Read only -- not controllable by user
+        self.X001 = 100001
+        self.X002 = 100002
+        self.X003 = 100003
+        self.X004 = 100004
+        self.X005 = 100005
+        self.X006 = 100006
+        self.X007 = 100007
+        self.X008 = 100008
+        # Read/write -- controllable by user
+        self.Y001 = 8192
+        self.Y002 = 8193
+        self.Y003 = 8194
+        self.Y004 = 8195
+        self.Y005 = 8196
+        self.Y006 = 8197
+
+        # Unit 10 = C0-08TR
+        # Read/write -- controllable by user
+        self.Y101 = 8224
+        self.Y102 = 8225
+        self.Y103 = 8226
+        self.Y104 = 8227
+        self.Y105 = 8228
+        self.Y106 = 8229
+        self.Y107 = 8230
+        self.Y108 = 8231
+
+        # Unit 20 = C0-16NE3
+        # Read only -- not controllable by user
+        self.X201 = 100065
+        self.X202 = 100066
+        self.X203 = 100067
+        self.X204 = 100068
+        self.X205 = 100069
+        self.X206 = 100070
+        self.X207 = 100071
+        self.X208 = 100072
+        self.X209 = 100073
+        self.X210 = 100074
+        self.X211 = 100075
+        self.X212 = 100076
+        self.X213 = 100077
+        self.X214 = 100078
+        self.X215 = 100079
+        self.X216 = 100080
@@ -0,0 +1,268 @@
+# Built-in python modules
+import asyncio
+import threading
+import sys as sy
+import os
+from pymodbus.client.asynchronous.async_io import init_tcp_client
+from pymodbus.client.asynchronous.async_io import AsyncioModbusSerialClient
+from pymodbus.transaction import ModbusRtuFramer
+
+# CHWP Gripper modules
+this_dir = os.path.dirname(__file__)
+sy.path.append(this_dir)
+sy.path.append(
+    os.path.join(this_dir, '..', '..', "config"))
+import pb2b_config as cg  # noqa: E402
+import C000DRD as c0  # noqa: E402
+
+
+class AsyncC000DRD(c0.C000DRD):
+    """
+    The AsyncC000DRD object is an asyncio variant of the C000DRD object
+    with the same address map. All requests share one Modbus connection.
+    RTU framing allows only one outstanding request, so requests from
+    concurrent tasks are queued on a lock and sent back to back, and
+    tasks wait on the event loop rather than blocking a thread.
+
+    Every request is bounded by timeout, and an error reply raises,
+    as in C000DRD.
+
+    Args:
+    rtu_port (int): Modbus serial port (defualt None).
+    tcp_ip (str): TCP IP address (default None)
+    tcp_port (int): TCP IP port (default None)
+    timeout (float): longest wait for one request [sec]
+                     (default cg.gripper_request_timeout)
+
+    Only either rtu_port or tcp_ip + tcp_port can be defined.
+    Call 'await connect()' from the event loop before use.
+    """
+    def __init__(self, rtu_port=None, tcp_ip=None, tcp_port=None,
+                 timeout=cg.gripper_request_timeout):
+        if rtu_port is None and (
+           tcp_ip is None or tcp_port is None):
+            raise Exception(
+                'AsyncC000DRD Exception: no RTU or TCP port specified')
+        elif rtu_port is not None and (
+           tcp_ip is not None or tcp_port is not None):
+            raise Exception(
+                'AsyncC000DRD Exception: RTU and TCP port specified. '
+                'Can only have one or the other.')
+        self._rtu_port = rtu_port
+        self._tcp_ip = tcp_ip
+        self._tcp_port = tcp_port
+        self.timeout = timeout
+        self.client = None
+        self._lock = None
+        self._map_addresses()
+
+    def __del__(self):
+        self.close()
+
+    # ***** Public Methods *****
+    async def connect(self):
+        """ Connect to the device from the running event loop """
+        loop = asyncio.get_event_loop()
+        self._lock = asyncio.Lock()
+        if self._rtu_port is not None:
+            self.client = AsyncioModbusSerialClient(
+                self._rtu_port, framer=ModbusRtuFramer, loop=loop,
+                baudrate=38400, parity='O', timeout=0.1)
+            await asyncio.wait_for(self.client.connect(), self.timeout)
+        else:
+            self.client = await asyncio.wait_for(init_tcp_client(
+                None, loop, self._tcp_ip, int(self._tcp_port),
+                framer=ModbusRtuFramer, timeout=0.1), self.timeout)
+        if not getattr(self.client, 'connected', True):
+            raise Exception('AsyncC000DRD Exception: cannot connect')
+        return True
+
+    def close(self):
+        """ Close the connection """
+        if self.client is not None:
+            self.client.stop()
+            self.client = None
+        return
+
+    async def read_pin(self, addr):
+        """
+        Read PLC switch
+
+        Args:
+        addr (int): PLC address from which to read
+        """
+        return (await self.read_pins(addr, self._count))[0]
+
+    async def read_pins(self, addr, count):
+        """
+        Read a block of consecutive PLC switches in one request
+
+        Args:
+        addr (int): first PLC address from which to read
+        count (int): number of consecutive switches to read
+        """
+        rr = await self._request(
+            self.client.protocol.read_discrete_inputs,
+            self._addr(addr), count)
+        return self._bits(rr, count)
+
+    async def set_pin_on(self, addr):
+        """
+        Set PLC switch to on
+
+        Args:
+        addr (int): PLC address from which to read
+        """
+        return self._written(await self._request(
+            self.client.protocol.write_coils, self._addr(addr), [True]))
+
+    async def set_pin_off(self, addr):
+        """
+        Set PLC switch to off
+
+        Args:
+        addr (int): PLC address from which to read
+        """
+        return self._written(await self._request(
+            self.client.protocol.write_coils, self._addr(addr), [False]))
+
+    async def toggle_pin(self, addr):
+        """
+        Toggle PLC switch
+
+        Args:
+        addr (int): PLC address from which to read
+        """
+        state = await self.read_pin(addr)
+        if state:
+            return await self.set_pin_off(addr)
+        return await self.set_pin_on(addr)
+
+    async def image(self):
+        """
+        Read every PLC switch. The four module blocks are requested
+        concurrently and come back as one {address: state} dict
+        """
+        blocks = [(self.Y001, 6), (self.Y101, 8),
+                  (self.X001, 8), (self.X201, 16)]
+        # Every read finishes, each within timeout, before a failure
+        # is raised, so none is left queued on the lock
+        reads = await asyncio.gather(
+            *[self.read_pins(first, count) for first, count in blocks],
+            return_exceptions=True)
+        for bits in reads:
+            if isinstance(bits, Exception):
+                raise bits
+        image = {}
+        for (first, count), bits in zip(blocks, reads):
+            for i in range(count):
+                image[first + i] = bool(bits[i])
+        return image
+
+    def blocking(self):
+        """
+        Return a C000DRD-compatible blocking interface to this PLC,
+        served by an event loop in a background thread. Blocking
+        control code (JXC831, Control) and asyncio tasks submitted with
+        submit() then share the same connection.
+        """
+        return BlockingC000DRD(self)
+
+    # ***** Helper Methods *****
+    async def _request(self, func, addr, arg):
+        """ Send one request, waiting at most timeout for the reply """
+        if self.client is None or self.client.protocol is None:
+            raise Exception('AsyncC000DRD Exception: not connected')
+        async with self._lock:
+            try:
+                return await asyncio.wait_for(
+                    func(addr, arg, unit=self._unit), self.timeout)
+            except asyncio.TimeoutError:
+                raise Exception(
+                    'AsyncC000DRD Exception: no reply from address %d '
+                    'within %.1f sec' % (addr, self.timeout))
+
+    def _written(self, rr):
+        """ Return a write response, raising on an error reply """
+        if rr is None or rr.isError():
+            raise Exception(
+                'AsyncC000DRD Exception: write failed: %s' % (str(rr)))
+        return rr
+
+
+class BlockingC000DRD:
+    """
+    The BlockingC000DRD object drives an AsyncC000DRD from blocking code.
+    It owns an event loop thread, connects on construction, and exposes
+    the same address attributes and pin methods as C000DRD, plus
+    image().
+
+    Args:
+    PLC (src.AsyncC000DRD): asyncio PLC object
+    """
+    def __init__(self, PLC):
+        self.PLC = PLC
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        try:
+            self._call(self.PLC.connect())
+        except Exception:
+            self.close()
+            raise
+
+    def __getattr__(self, name):
+        # Address map and private variables come from the PLC object
+        if name in ['PLC', 'loop', '_thread']:
+            raise AttributeError(name)
+        return getattr(self.PLC, name)
+
+    def __del__(self):
+        self.close()
+
+    # ***** Public Methods *****
+    def submit(self, coro):
+        """
+        Schedule a coroutine, such as a housekeeping poller, on the
+        PLC event loop. Returns a concurrent.futures.Future
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def close(self):
+        """ Close the connection and stop the event loop """
+        if hasattr(self, 'loop') and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.PLC.close)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+            self.loop.close()
+        return
+
+    def read_pin(self, addr):
+        """ Read PLC switch """
+        return self._call(self.PLC.read_pin(addr))
+
+    def read_pins(self, addr, count):
+        """ Read a block of consecutive PLC switches """
+        return self._call(self.PLC.read_pins(addr, count))
+
+    def set_pin_on(self, addr):
+        """ Set PLC switch to on """
+        return self._call(self.PLC.set_pin_on(addr))
+
+    def set_pin_off(self, addr):
+        """ Set PLC switch to off """
+        return self._call(self.PLC.set_pin_off(addr))
+
+    def toggle_pin(self, addr):
+        """ Toggle PLC switch """
+        return self._call(self.PLC.toggle_pin(addr))
+
+    def image(self):
+        """ Read every PLC switch, the module blocks pipelined """
+        return self._call(self.PLC.image())
+
+    # ***** Helper Methods *****
+    def _call(self, coro):
+        """ Run a coroutine on the PLC event loop and wait for it """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
@@ -28,6 +28,11 @@ class JXC831:
         # because sometimes they fail for no obvious reason...
         self.num_attempts = 5
 
+        # Number of failed read/write attempts so far. The Modbus client
+        # reconnects after a failure, so any change means cached
+        # controller state can no longer be trusted
+        self.errors = 0
+
         # Assign SMC controller pins to PLC pins. Also listed are the I/O
         # cable wire colors for the connections
         # Read/write -- controllable by the user
@@ -97,10 +102,42 @@ class JXC831:
             try:
                 return self.PLC.read_pin(addr)
             except:
+                self.errors += 1
                 continue
         raise Exception(
             'JXC831 Exception: Cannot read pin at address', addr)
 
+    def read_block(self, addr, count):
+        """
+        Read a block of consecutive JXC addresses
+
+        Args:
+        addr (int): first address to be read
+        count (int): number of consecutive addresses to read
+        """
+        for n in range(self.num_attempts):
+            try:
+                return self.PLC.read_pins(addr, count)
+            except:
+                self.errors += 1
+                continue
+        raise Exception(
+            'JXC831 Exception: Cannot read pin block at address', addr)
+
+    def read_image(self):
+        """
+        Read every PLC switch as an {address: state} dict, with a PLC
+        client that provides image()
+        """
+        for n in range(self.num_attempts):
+            try:
+                return self.PLC.image()
+            except:
+                self.errors += 1
+                continue
+        raise Exception(
+            'JXC831 Exception: Cannot read the PLC image')
+
     def set_on(self, addr):
         """
         Set JXC address value to ON
@@ -112,6 +149,7 @@ class JXC831:
             try:
                 return self.PLC.set_pin_on(addr)
             except:
+                self.errors += 1
                 continue
         return Exception(
             'JXC831 Exception: Cannot write to pin at address', addr)
@@ -127,6 +165,7 @@ class JXC831:
             try:
                 return self.PLC.set_pin_off(addr)
             except:
+                self.errors += 1
                 continue
         return Exception(
             'JXC831 Exception: Cannot write to pin at address', addr)
@@ -142,6 +181,7 @@ class JXC831:
             try:
                 return self.PLC.toggle_pin(addr)
             except:
+                self.errors += 1
                 continue
         return Exception(
             'JXC831 Exception: Cannot read/write to pin at address', addr)
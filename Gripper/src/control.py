@@ -6,6 +6,7 @@ import os
 this_dir = os.path.dirname(__file__)
 sy.path.append(this_dir)
 import log_gripper as lg  # noqa: E402
+import watcher as wt  # noqa: E402
 
 
 class Control:
@@ -32,6 +33,17 @@ class Control:
         self._tout = 10.0  # sec
         self._tstep = 0.1  # sec
 
+        # Output image watcher for BUSY, INP and SVRE waits
+        self.watch = wt.Watcher(self._JXC, tmax=self._tstep)
+        self.watch.on("BUSY_FALL", self._on_busy_fall)
+        self.watch.on("INP_RISE", self._on_inp_rise)
+
+        # Cached controller state confirmed by hardware reads. Entries
+        # hold the confirmation time and JXC error count, and expire
+        # after a timeout, on a Modbus error, or on explicit invalidation
+        self._state = {}
+        self._state_ttl = 30.0  # sec
+
         #  Dictionary of pins to write for each step number
         # Binary input = step number + 1
         self.step_inputs = {
@@ -140,10 +152,12 @@ class Control:
         else:
             self.log.log("Disengaged brakes in Control.ON()")
 
+        self._confirm("ON")
         return True
 
     def OFF(self):
         """ Turn the controller off """
+        self.invalidate()
         # Turn on the brakes
         if (self._JXC.read(self._JXC.BRAKE1) or
            self._JXC.read(self._JXC.BRAKE2) or
@@ -173,7 +187,7 @@ class Control:
     def HOME(self):
         """ Home all actuators """
         # Make sure the motors are on
-        if not self.ON():
+        if not self._ensure_on():
             self.log.err(
                 "Control.HOME() aborted due to SVON not being ON")
             return False
@@ -219,7 +233,7 @@ class Control:
         axis_no (int): axis number (default is None, which enables all axes)
         """
         # Make sure the motor is turned on
-        if not self.ON():
+        if not self._ensure_on():
             self.log.err(
                 "Control.STEP() aborted due to SVON not being ON")
             return False
@@ -270,6 +284,7 @@ class Control:
             self.log.err(
                 "STEP operation for step no %02d in Control.STEP() failed "
                 "due to timout" % (int(step_num)))
+            self.invalidate()
             timeout = True
 
         # Reset inputs
@@ -347,6 +362,8 @@ class Control:
         state (bool): brake states. True for on, False for off
         axis (1-3): axis on which to apply the brake (default is all)
         """
+        self.invalidate("ON")
+
         # Check the inputs
         if axis is None:
             axes = range(3)
@@ -405,6 +422,7 @@ class Control:
 
     def RESET(self):
         """ Reset the alarm """
+        self.invalidate()
         if self._is_alarm():
             # Toggle the RESET pin on
             self._JXC.set_on(self._JXC.RESET)
@@ -442,55 +460,62 @@ class Control:
 
     def INP(self):
         """ Read the INP pins """
-        self.ON()
+        self._ensure_on()
         self._sleep(1.)
         out1 = int(self._JXC.read(self._JXC.INP1))
         out2 = int(self._JXC.read(self._JXC.INP2))
         out3 = int(self._JXC.read(self._JXC.INP3))
         return bool(out1), bool(out2), bool(out3)
 
-    def STATUS(self):
-        """ Print the control status """
+    def STATUS(self, verbose=True):
+        """
+        Print and return the control status
+
+        Args:
+        verbose (bool): print the status bits (default True)
+        """
+        image = self._read_image()
         status_dict = {}
-        status_dict["IN0"] = int(self._JXC.read(self._JXC.IN0))
-        status_dict["IN1"] = int(self._JXC.read(self._JXC.IN1))
-        status_dict["IN2"] = int(self._JXC.read(self._JXC.IN2))
-        status_dict["IN3"] = int(self._JXC.read(self._JXC.IN3))
-        status_dict["IN4"] = int(self._JXC.read(self._JXC.IN4))
-        status_dict["SETUP"]= int(self._JXC.read(self._JXC.SETUP))
-        status_dict["HOLD"] = int(self._JXC.read(self._JXC.HOLD))
-        status_dict["DRIVE"] = int(self._JXC.read(self._JXC.DRIVE))
-        status_dict["RESET"] = int(self._JXC.read(self._JXC.RESET))
-        status_dict["SVON"] = int(self._JXC.read(self._JXC.SETON))
-        status_dict["OUT0"] = int(self._JXC.read(self._JXC.OUT0))
-        status_dict["OUT1"] = int(self._JXC.read(self._JXC.OUT1))
-        status_dict["OUT2"] = int(self._JXC.read(self._JXC.OUT2))
-        status_dict["OUT3"] = int(self._JXC.read(self._JXC.OUT3))
-        status_dict["OUT4"] = int(self._JXC.read(self._JXC.OUT4))
-        status_dict["BUSY"] = int(self._JXC.read(self._JXC.BUSY))
-        status_dict["AREA"] = int(self._JXC.read(self._JXC.AREA))
-        status_dict["SETON"] = int(self._JXC.read(self._JXC.SETON))
-        status_dict["INP"] = int(self._JXC.read(self._JXC.INP))
-        status_dict["SVRE"] = int(self._JXC.read(self._JXC.SVRE))
-        status_dict["ESTOP"] = int(not self._JXC.read(self._JXC.ESTOP))
-        status_dict["ALARM"] = int(not self._JXC.read(self._JXC.ALARM))
-        status_dict["BUSY1"] = int(self._JXC.read(self._JXC.BUSY1))
-        status_dict["BUSY2"] = int(self._JXC.read(self._JXC.BUSY2))
-        status_dict["BUSY3"] = int(self._JXC.read(self._JXC.BUSY3))
-        status_dict["AREA1"] = int(self._JXC.read(self._JXC.AREA1))
-        status_dict["AREA2"] = int(self._JXC.read(self._JXC.AREA2))
-        status_dict["AREA3"] = int(self._JXC.read(self._JXC.AREA3))
-        status_dict["INP1"] = int(self._JXC.read(self._JXC.INP1))
-        status_dict["INP2"] = int(self._JXC.read(self._JXC.INP2))
-        status_dict["INP3"] = int(self._JXC.read(self._JXC.INP3))
-        status_dict["BRAKE1"] = int(not self._JXC.read(self._JXC.BRAKE1))
-        status_dict["BRAKE2"] = int(not self._JXC.read(self._JXC.BRAKE2))
-        status_dict["BRAKE3"] = int(not self._JXC.read(self._JXC.BRAKE3))
-        status_dict["ALARM1"] = int(not self._JXC.read(self._JXC.ALARM1))
-        status_dict["ALARM2"] = int(not self._JXC.read(self._JXC.ALARM2))
-        status_dict["ALARM3"] = int(not self._JXC.read(self._JXC.ALARM3))
-        for key, value in status_dict.items():
-            print("%s = %d" % (key, value))
+        status_dict["IN0"] = int(image[self._JXC.IN0])
+        status_dict["IN1"] = int(image[self._JXC.IN1])
+        status_dict["IN2"] = int(image[self._JXC.IN2])
+        status_dict["IN3"] = int(image[self._JXC.IN3])
+        status_dict["IN4"] = int(image[self._JXC.IN4])
+        status_dict["SETUP"]= int(image[self._JXC.SETUP])
+        status_dict["HOLD"] = int(image[self._JXC.HOLD])
+        status_dict["DRIVE"] = int(image[self._JXC.DRIVE])
+        status_dict["RESET"] = int(image[self._JXC.RESET])
+        status_dict["SVON"] = int(image[self._JXC.SETON])
+        status_dict["OUT0"] = int(image[self._JXC.OUT0])
+        status_dict["OUT1"] = int(image[self._JXC.OUT1])
+        status_dict["OUT2"] = int(image[self._JXC.OUT2])
+        status_dict["OUT3"] = int(image[self._JXC.OUT3])
+        status_dict["OUT4"] = int(image[self._JXC.OUT4])
+        status_dict["BUSY"] = int(image[self._JXC.BUSY])
+        status_dict["AREA"] = int(image[self._JXC.AREA])
+        status_dict["SETON"] = int(image[self._JXC.SETON])
+        status_dict["INP"] = int(image[self._JXC.INP])
+        status_dict["SVRE"] = int(image[self._JXC.SVRE])
+        status_dict["ESTOP"] = int(not image[self._JXC.ESTOP])
+        status_dict["ALARM"] = int(not image[self._JXC.ALARM])
+        status_dict["BUSY1"] = int(image[self._JXC.BUSY1])
+        status_dict["BUSY2"] = int(image[self._JXC.BUSY2])
+        status_dict["BUSY3"] = int(image[self._JXC.BUSY3])
+        status_dict["AREA1"] = int(image[self._JXC.AREA1])
+        status_dict["AREA2"] = int(image[self._JXC.AREA2])
+        status_dict["AREA3"] = int(image[self._JXC.AREA3])
+        status_dict["INP1"] = int(image[self._JXC.INP1])
+        status_dict["INP2"] = int(image[self._JXC.INP2])
+        status_dict["INP3"] = int(image[self._JXC.INP3])
+        status_dict["BRAKE1"] = int(not image[self._JXC.BRAKE1])
+        status_dict["BRAKE2"] = int(not image[self._JXC.BRAKE2])
+        status_dict["BRAKE3"] = int(not image[self._JXC.BRAKE3])
+        status_dict["ALARM1"] = int(not image[self._JXC.ALARM1])
+        status_dict["ALARM2"] = int(not image[self._JXC.ALARM2])
+        status_dict["ALARM3"] = int(not image[self._JXC.ALARM3])
+        if verbose:
+            for key, value in status_dict.items():
+                print("%s = %d" % (key, value))
         return status_dict
 
     def ALARM(self):
@@ -500,6 +525,32 @@ class Control:
         self.log.out("ALARM3 = %d" % (not self._JXC.read(self._JXC.ALARM3)))
         return self._is_alarm()
 
+    def AXIS_ALARM(self):
+        """
+        Read the total and per-axis alarm states in one bulk read
+
+        Returns (total alarm, [axis 1 alarm, axis 2 alarm, axis 3 alarm])
+        """
+        first = self._JXC.ALARM
+        bits = self._JXC.read_block(first, self._JXC.ALARM3 - first + 1)
+        total = not bits[0]
+        axes = [not bits[addr - first] for addr in
+                [self._JXC.ALARM1, self._JXC.ALARM2, self._JXC.ALARM3]]
+        return total, axes
+
+    def invalidate(self, key=None):
+        """
+        Forget cached controller state
+
+        Args:
+        key (str): state to forget (default is all)
+        """
+        if key is None:
+            self._state = {}
+        elif key in self._state.keys():
+            del self._state[key]
+        return
+
     def ALARM_GROUP(self):
         """ Identify the alarm group """
         # ID the alarm group
@@ -532,6 +583,39 @@ class Control:
             tm.sleep(time)
         return
 
+    def _read_image(self):
+        """ Read every PLC module with one block read each """
+        PLC = self._JXC.PLC
+        # The asyncio PLC client sends the four reads back to back
+        if hasattr(PLC, 'image'):
+            return self._JXC.read_image()
+        blocks = [(PLC.Y001, 6), (PLC.Y101, 8), (PLC.X001, 8), (PLC.X201, 16)]
+        image = {}
+        for first, count in blocks:
+            bits = self._JXC.read_block(first, count)
+            for i in range(count):
+                image[first + i] = bool(bits[i])
+        return image
+
+    def _confirm(self, key):
+        """ Record that a controller state was just confirmed """
+        self._state[key] = (tm.monotonic(), self._JXC.errors)
+        return
+
+    def _is_confirmed(self, key):
+        """ Returns whether a cached controller state is still valid """
+        if key not in self._state.keys():
+            return False
+        t, errors = self._state[key]
+        return (errors == self._JXC.errors and
+                tm.monotonic() - t < self._state_ttl)
+
+    def _ensure_on(self):
+        """ Turn the controller on unless it is known to be on already """
+        if self._is_confirmed("ON"):
+            return True
+        return self.ON()
+
     def _is_moving(self):
         """ Return whether the motors are moving """
         if self._JXC.read(self._JXC.BUSY):
@@ -548,19 +632,12 @@ class Control:
 
     def _is_powered(self):
         """ Returns whether the motors are powered """
-        t = 0.  # stopwatch
-        while t < self._tout:
-            if not self._JXC.read(self._JXC.SVRE):
-                self._sleep()
-                t += self._tstep
-                continue
-            else:
-                return True
-        return False
+        return self.watch.wait(lambda image: image["SVRE"], self._tout)
 
     def _is_alarm(self):
         """ Returns whether an alarm is triggered """
         if not self._JXC.read(self._JXC.ALARM):
+            self.invalidate()
             return True
         else:
             return False
@@ -569,15 +646,19 @@ class Control:
         """ Function to wait for step_num to finish """
         if timeout is None:
             timeout = self._tout
-        t = 0.  # stopwatch
-        while t < timeout:
-            if self._is_moving():
-                self._sleep()
-                t += self._tstep
-                continue
-            else:
-                return True
-        return False
+        return self.watch.wait(lambda image: not image["BUSY"], timeout)
+
+    def _on_busy_fall(self, image, elapsed):
+        """ Log the end of a move """
+        self.log.log(
+            "BUSY fell after %.2f sec in Control._wait()" % (elapsed))
+        return
+
+    def _on_inp_rise(self, image, elapsed):
+        """ Log the actuators arriving in position """
+        self.log.log(
+            "INP rose after %.2f sec in Control._wait()" % (elapsed))
+        return
 
     def _zero_inputs(self):
         self._JXC.set_off(self._JXC.IN0)
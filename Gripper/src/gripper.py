@@ -1,7 +1,5 @@
 # Built-in python modules
-import datetime as dt
 import sys as sy
-import numpy as np
 import os
 
 # CHWP Gripper modules
@@ -14,6 +12,7 @@ import C000DRD as c0  # noqa: E402
 import JXC831 as jx  # noqa: E402
 import control as ct  # noqa: E402
 import command_gripper as cd  # noqa: E402
+import journal as jn  # noqa: E402
 
 class Gripper:
     """
@@ -43,19 +42,11 @@ class Gripper:
         # Logging object
         self.log = self.CTL.log
 
-        # Position file
+        # Position journal
         self.pos_dir = os.path.join(
             os.path.dirname(os.path.realpath(__file__)), '..', "POS")
-        self.pos_file = os.path.join(
-            self.pos_dir, "chwpGripper_positionLog.txt")
-
-        if not os.path.isdir(self.pos_dir):
-            os.mkdir(self.pos_dir)
-        
-        if os.path.exists(self.pos_file):
-            self.posf = open(self.pos_file, 'a+')
-        else:
-            self.posf = open(self.pos_file, 'w+')
+        self.journal = jn.Journal(self.pos_dir)
+        self.pos_file = self.journal.txt_file
 
         # Read initial positions
         self._read_pos()
@@ -100,8 +91,11 @@ class Gripper:
         self.steps_pos["29"] = (+0.0, +5.0, +0.0)
         self.steps_pos["30"] = (+0.0, +0.0, +5.0)
 
+        # Step grid
+        self._grid = 0.1  # mm
+
     def __del__(self):
-        self.posf.close()
+        self.journal.close()
         return
 
     # ***** Public Methods *****
@@ -113,7 +107,7 @@ class Gripper:
         """ Turn the controller off """
         return self.CTL.OFF()
 
-    def MOVE(self, mode, dist, axis_no):
+    def MOVE(self, mode, dist, axis_no, check_inp=True):
         """
         Move a specified motor a specified distance
 
@@ -121,6 +115,8 @@ class Gripper:
         mode (str): 'POS' for positioning mode, 'PUSH' for pushing mode
         dist (float): distance to move the motor [mm]
         axis_no (int): axis to move (1-3)
+        check_inp (bool): return the INP flags rather than True once
+        the move completes (default True)
         """
         # Calculate target position
         motor = self.motors[str(axis_no)]
@@ -152,8 +148,39 @@ class Gripper:
 
         # Write new position and return whether in position
         self._write_pos()
+        if not check_inp:
+            return True
         return self.INP()
 
+    def PUSH(self, dist, axis_no):
+        """
+        Push a motor a specified distance, reading the alarms after
+        every step. The motor position only counts steps that ended
+        without an alarm on the axis, and stops at the first failed
+        step or alarm
+
+        Args:
+        dist (float): distance to push the motor [mm]
+        axis_no (int): axis to push (1-3)
+
+        Returns (success, total alarm, [axis 1-3 alarm])
+        """
+        motor = self.motors[str(axis_no)]
+        alarms = [False] * self.num_motors
+        steps = self._select_steps('PUSH', dist, axis_no)
+        if steps is None:
+            return False, False, alarms
+        ok, total = True, False
+        for st in steps:
+            ok = self.CTL.STEP(st, axis_no)
+            total, alarms = self.CTL.AXIS_ALARM()
+            if ok and not alarms[axis_no-1]:
+                motor.pos += self.steps_push[st][axis_no-1]
+            if not ok or total:
+                break
+        self._write_pos()
+        return ok and not total, total, alarms
+
     def HOME(self):
         """ Home all motors """
         # Home all motors
@@ -240,69 +267,84 @@ class Gripper:
         #    self.log.out("INP%d = %d" % (i+1, outs[i]))
         return outs
 
-    def STATUS(self):
-        """ Return control status """
-        return self.CTL.STATUS()
+    def STATUS(self, verbose=True):
+        """ Return control status, printing it if verbose """
+        return self.CTL.STATUS(verbose)
 
     # ***** Helper Methods *****
     def _read_pos(self):
-        """ Read motor positions from position file """
-        lines = self.posf.readlines()
-        if len(lines) == 0:
+        """ Read motor positions from the position journal """
+        last = self.journal.latest()
+        if last is None:
             self.motors["1"].pos = 0.
             self.motors["2"].pos = 0.
             self.motors["3"].pos = 0.
         else:
-            lastWrite = lines[-1]
-            date, time = lastWrite.split('[')[1].split(']')[0].split()
-            pos1, pos2, pos3 = lastWrite.split()[2:]
-            self.motors["1"].pos = float(pos1)
-            self.motors["2"].pos = float(pos2)
-            self.motors["3"].pos = float(pos3)
+            self.motors["1"].pos = last[1]
+            self.motors["2"].pos = last[2]
+            self.motors["3"].pos = last[3]
         return True
 
     def _write_pos(self, init=False):
-        """ Write motor positions to position file """
-        now = dt.datetime.now()
-        date = "%04d-%02d-%02d" % (now.year, now.month, now.day)
-        time = "%02d:%02d:%02d" % (now.hour, now.minute, now.second)
-        wrmsg = (
-            "[%s %s] %s %-20.2f %-20.2f %-20.2f\n"
-            % (date, time, ' '*3,
-               self.motors["1"].pos,
-               self.motors["2"].pos,
-               self.motors["3"].pos))
-        self.posf.write(wrmsg)
-        return True
+        """ Write motor positions to the position journal """
+        return self.journal.append(
+            [self.motors["1"].pos,
+             self.motors["2"].pos,
+             self.motors["3"].pos])
 
     def _select_steps(self, mode, dist, axis_no):
-        """ Select the steps to move a specified motor """
-        d = dist
+        """
+        Select the steps to move a specified motor
+
+        Takes the largest steps first, all in the direction of the move,
+        for the distance rounded to the 0.1 mm grid. The step sizes are
+        multiples of each other, so this is also the fewest steps, and
+        the motor passes only through positions between the start and
+        the target, which must be within the motor travel range.
+        """
+        steps = self._steps_for_mode(mode)
+        if steps is None:
+            self.log.log(
+                "Did not understand mode '%s' in "
+                "GRIPPER()._select_steps()" % (mode))
+            return None
+        motor = self.motors[str(axis_no)]
+        target_pos = motor.pos + dist
+        if target_pos < motor.min_pos or target_pos > motor.max_pos:
+            self.log.err(
+                "Cannot move axis %d %.1f mm from %.1f mm, outside of the "
+                "range %.1f to %.1f mm in GRIPPER()._select_steps()"
+                % (axis_no, dist, motor.pos, motor.min_pos, motor.max_pos))
+            return None
+        units = int(round(float(dist) / self._grid))
+
+        # Steps in the direction of the move, largest first
+        moves = sorted(
+            [k for k in steps.keys()
+             if self._step_units(steps, k, axis_no) * units > 0],
+            key=lambda k: -abs(self._step_units(steps, k, axis_no)))
         steps_to_do = []
-        while abs(d) >= 0.1:  # mm
-            # Check input mode
-            if mode == 'PUSH':
-                steps_to_check = self.steps_push
-            elif mode == 'POS':
-                steps_to_check = self.steps_pos
-            else:
-                self.log.log(
-                    "Did not understand mode '%s' in "
-                    "GRIPPER()._select_steps()" % (mode))
-                return None
-            # Loop over steps to construct move from largest to smallest
-            for k in list(steps_to_check.keys())[::-1]:
-                move_step = float(steps_to_check[k][axis_no-1])
-                if np.round(move_step, decimals=1) == 0.0:
-                    continue
-                try:
-                    div = np.round(float(d)/move_step, decimals=1)
-                except ZeroDivisionError:
-                    continue
-                if div >= 1.0:
-                    steps_to_do.append(k)
-                    d -= move_step
-                    break
-                else:
-                    continue
+        for k in moves:
+            size = self._step_units(steps, k, axis_no)
+            while abs(units) >= abs(size):
+                steps_to_do.append(k)
+                units -= size
+        if units != 0:
+            self.log.err(
+                "Cannot decompose %.1f mm move in mode '%s' for axis %d "
+                "in GRIPPER()._select_steps()" % (dist, mode, axis_no))
+            return None
         return steps_to_do
+
+    def _steps_for_mode(self, mode):
+        """ Return the step dictionary for a given move mode """
+        if mode == 'PUSH':
+            return self.steps_push
+        elif mode == 'POS':
+            return self.steps_pos
+        else:
+            return None
+
+    def _step_units(self, steps, k, axis_no):
+        """ Return the size of step k for an axis in grid units """
+        return int(round(steps[k][axis_no-1] / self._grid))
@@ -3,32 +3,22 @@ import os
 
 this_dir = os.path.dirname(__file__)
 sys.path.append(this_dir)
-sys.path.append(
-    os.path.join(this_dir, '..', '..', 'config'))
+sys.path.append(os.path.join(this_dir, '..', '..', 'config'))
 
+import gripper_session as gs
 import pb2b_config as cg
-import C000DRD as c0
-import JXC831 as jx
-import control as ct
-import gripper as gp
-import command_gripper as cd
-import fcntl as f
 
-def open_command_close(cmd):
-    lockfile = open(os.path.join(this_dir, '.gripper_port_busy'))
-    f.flock(lockfile, f.LOCK_EX | f.LOCK_NB)
-    if cg.use_tcp:
-        PLC = c0.C000DRD(tcp_ip=cg.gripper_ip, tcp_port=cg.gripper_port)
-    else:
-        PLC = c0.C000DRD(rtu_port=cg.rtu_port)
-#    print('Port opened')
-    JXC = jx.JXC831(PLC)
-    CTL = ct.Control(JXC)
-    GPR = gp.Gripper(CTL)
-    CMD = cd.Command(GPR)
-    result = CMD.CMD(cmd)
-#    print('Command sent')
-#    print('Port closed')
-    del(PLC,JXC,CTL,GPR,CMD)
-    f.flock(lockfile, f.LOCK_UN)
-    return result
+# One gripper session per process, reused by every command
+_session = gs.Session()
+
+def open_command_close(cmd, timeout=cg.gripper_lock_timeout):
+    return _session.command(cmd, timeout)
+
+def status(timeout=cg.gripper_lock_timeout, clock=None):
+    return _session.status(timeout, clock)
+
+def open_squeeze_close(incr, axes=None, timeout=cg.gripper_lock_timeout):
+    return _session.squeeze(incr, axes, timeout)
+
+def close():
+    return _session.close()
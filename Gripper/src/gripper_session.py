@@ -0,0 +1,227 @@
+# Built-in python modules
+import fcntl as f
+import threading
+import time as tm
+import sys as sy
+import os
+
+# CHWP Gripper modules
+this_dir = os.path.dirname(__file__)
+sy.path.append(this_dir)
+sy.path.append(os.path.join(this_dir, '..', '..', "config"))
+import pb2b_config as cg  # noqa: E402
+import C000DRD as c0  # noqa: E402
+import C000DRD_asyncio as ca  # noqa: E402
+import JXC831 as jx  # noqa: E402
+import control as ct  # noqa: E402
+import gripper as gp  # noqa: E402
+import command_gripper as cd  # noqa: E402
+import squeeze as sq  # noqa: E402
+
+
+class Session:
+    """
+    The Session object keeps one gripper control stack (PLC connection,
+    JXC, Control, Gripper and Command objects) open across a sequence
+    of commands. The stack is built on first use and torn down after
+    an error or once no command has run for idle seconds, so an idle
+    process does not hold one of the few MOXA connections; the next
+    command rebuilds it. Commands from threads of one process run one
+    at a time. The port lock is taken around each command, so other
+    processes can still interleave their own commands. A command waits
+    up to its timeout for the lock and raises BlockingIOError if it is
+    still held.
+
+    Args:
+    lock (str): lock file name (default '.gripper_port_busy')
+    idle (float): idle time before closing the connection [sec]
+                  (default cg.gripper_idle_timeout)
+    asynchronous (bool): talk to the PLC through the asyncio client,
+                         which bounds every request and reads the
+                         status blocks back to back (default False)
+    """
+    def __init__(self, lock='.gripper_port_busy',
+                 idle=cg.gripper_idle_timeout, asynchronous=False):
+        self._lock_file = os.path.join(this_dir, lock)
+        self.idle = idle
+        self.asynchronous = asynchronous
+        self._mutex = threading.RLock()
+        self._timer = None
+        self._last_use = None
+        self.PLC = None
+        self.JXC = None
+        self.CTL = None
+        self.GPR = None
+        self.CMD = None
+
+        # Size of the position journal after our last command. A
+        # change means another process moved the grippers
+        self._journal_size = None
+
+    def __del__(self):
+        self.close()
+
+    # ***** Public Methods *****
+    def command(self, cmd, timeout=cg.gripper_lock_timeout):
+        """
+        Execute a gripper command string
+
+        Args:
+        cmd (str): command, as accepted by Command.CMD()
+        timeout (float): longest wait for the port lock [sec]
+                         (default cg.gripper_lock_timeout)
+        """
+        return self._run(lambda: self.CMD.CMD(cmd), cmd, timeout)
+
+    def status(self, timeout=cg.gripper_lock_timeout, clock=None):
+        """
+        Read the controller status bits without printing them. With a
+        clock, returns (status, midpoint, latency) of the read itself,
+        after the port lock and the connection
+
+        Args:
+        timeout (float): longest wait for the port lock [sec]
+                         (default cg.gripper_lock_timeout)
+        clock (acq_clock.Clock): clock stamping the read (default None)
+        """
+        def read():
+            return self.GPR.STATUS(verbose=False)
+        if clock is not None:
+            return self._run(lambda: clock.call(read), 'STATUS', timeout)
+        return self._run(read, 'STATUS', timeout)
+
+    def squeeze(self, incr, axes=None, timeout=cg.gripper_lock_timeout):
+        """
+        Squeeze the rotor with interleaved axis pushes
+
+        Args:
+        incr (float): push increment per cycle [mm]
+        axes (list): axes to squeeze (default is all)
+        timeout (float): longest wait for the port lock [sec]
+                         (default cg.gripper_lock_timeout)
+        """
+        return self._run(
+            lambda: sq.Squeeze(self.GPR).run(incr, axes), "SQUEEZE %s" % (
+                str(incr)), timeout)
+
+    def close(self):
+        """ Tear down the gripper control stack """
+        with self._mutex:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self.GPR is not None:
+                self.GPR.journal.close()
+            if self.PLC is not None:
+                self.PLC.close()
+            self.PLC = None
+            self.JXC = None
+            self.CTL = None
+            self.GPR = None
+            self.CMD = None
+            self._journal_size = None
+        return True
+
+    # ***** Helper Methods *****
+    def _open(self):
+        """ Build the gripper control stack """
+        if self.asynchronous:
+            if cg.use_tcp:
+                PLC = ca.AsyncC000DRD(
+                    tcp_ip=cg.gripper_ip, tcp_port=cg.gripper_port)
+            else:
+                PLC = ca.AsyncC000DRD(rtu_port=cg.rtu_port)
+            self.PLC = PLC.blocking()
+        elif cg.use_tcp:
+            self.PLC = c0.C000DRD(
+                tcp_ip=cg.gripper_ip, tcp_port=cg.gripper_port)
+        else:
+            self.PLC = c0.C000DRD(rtu_port=cg.rtu_port)
+        self.JXC = jx.JXC831(self.PLC)
+        self.CTL = ct.Control(self.JXC)
+        self.GPR = gp.Gripper(self.CTL)
+        self.CMD = cd.Command(self.GPR)
+        self._journal_size = os.path.getsize(self.GPR.journal.bin_file)
+        return True
+
+    def _sync(self):
+        """
+        Forget controller state cached by the previous command, which
+        another process may have changed, and reload the motor
+        positions if another process wrote them
+        """
+        self.CTL.invalidate()
+        size = os.path.getsize(self.GPR.journal.bin_file)
+        if size != self._journal_size:
+            self.GPR._read_pos()
+        return
+
+    def _lock(self, timeout):
+        """ Take the port lock, waiting at most timeout [sec] """
+        lockf = open(self._lock_file)
+        deadline = tm.monotonic() + timeout
+        while True:
+            try:
+                f.flock(lockf, f.LOCK_EX | f.LOCK_NB)
+                return lockf
+            except BlockingIOError:
+                if tm.monotonic() >= deadline:
+                    lockf.close()
+                    raise
+            tm.sleep(0.1)
+
+    def _idle_close(self):
+        """ Close the connection if no command ran for idle seconds """
+        if not self._mutex.acquire(blocking=False):
+            # A command is running and will rearm the timer
+            return
+        try:
+            if (self._last_use is not None and
+               tm.monotonic() - self._last_use >= self.idle):
+                self.close()
+        finally:
+            self._mutex.release()
+        return
+
+    def _run(self, func, cmd, timeout):
+        """ Run func with the session and port locks held """
+        with self._mutex:
+            try:
+                return self._locked(func, cmd, timeout)
+            finally:
+                self._last_use = tm.monotonic()
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if self.GPR is not None:
+                    self._timer = threading.Timer(self.idle, self._idle_close)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+    def _locked(self, func, cmd, timeout):
+        """ Run func under the port lock, rebuilding the stack on error """
+        lockf = self._lock(timeout)
+        try:
+            if self.GPR is None:
+                self._open()
+            else:
+                self._sync()
+            start = tm.monotonic()
+            result = func()
+            self.GPR.log.log(
+                "Command '%s' -> %s" % (cmd, str(result)), command=cmd,
+                duration=tm.monotonic() - start)
+            self._journal_size = os.path.getsize(self.GPR.journal.bin_file)
+            return result
+        except Exception as e:
+            # Do not retry -- a half-finished move must not be repeated.
+            # The stack is rebuilt on the next command instead
+            if self.GPR is not None:
+                self.GPR.log.err(
+                    "Gripper session closed after error '%s'" % (str(e)),
+                    command=cmd)
+            self.close()
+            raise
+        finally:
+            f.flock(lockf, f.LOCK_UN)
+            lockf.close()
@@ -0,0 +1,147 @@
+# Built-in python modules
+import datetime as dt
+import struct
+import time as tm
+import os
+
+
+class Journal:
+    """
+    The Journal object records gripper positions. Every record is
+    appended both to the human-readable position log and to a binary
+    journal of fixed-size records, so the latest record is one seek
+    from the end and time ranges are found by bisection.
+
+    Args:
+    pos_dir (str): directory holding the position files
+    name (str): base file name (default "chwpGripper_positionLog")
+    """
+    # Record = (unix time, axis 1 pos, axis 2 pos, axis 3 pos)
+    _fmt = struct.Struct('<dddd')
+
+    def __init__(self, pos_dir, name="chwpGripper_positionLog"):
+        if not os.path.isdir(pos_dir):
+            os.mkdir(pos_dir)
+        self.txt_file = os.path.join(pos_dir, name + ".txt")
+        self.bin_file = os.path.join(pos_dir, name + ".bin")
+
+        # Convert the text log to the binary journal the first time
+        if not os.path.exists(self.bin_file):
+            self._convert()
+
+        self._txtf = open(self.txt_file, 'a')
+        self._binf = open(self.bin_file, 'ab')
+
+    def __del__(self):
+        self.close()
+
+    # ***** Public Methods *****
+    def close(self):
+        """ Close the journal files """
+        for f in [getattr(self, '_txtf', None), getattr(self, '_binf', None)]:
+            if f is not None and not f.closed:
+                f.close()
+        return
+
+    def append(self, pos):
+        """
+        Append a position record
+
+        Args:
+        pos (list): axis 1-3 positions [mm]
+        """
+        now = tm.time()
+        local = dt.datetime.fromtimestamp(now)
+        self._txtf.write(
+            "[%s] %s %-20.2f %-20.2f %-20.2f\n"
+            % (local.strftime("%Y-%m-%d %H:%M:%S"), ' '*3,
+               pos[0], pos[1], pos[2]))
+        self._txtf.flush()
+        # Drop a torn record left by an interrupted write
+        size = os.fstat(self._binf.fileno()).st_size
+        if size % self._fmt.size:
+            self._binf.truncate(size - size % self._fmt.size)
+        self._binf.write(self._fmt.pack(now, pos[0], pos[1], pos[2]))
+        self._binf.flush()
+        return True
+
+    def latest(self):
+        """ Return the latest (time, pos1, pos2, pos3) record or None """
+        with open(self.bin_file, 'rb') as binf:
+            n = self._count(binf)
+            if n == 0:
+                return None
+            return self._record(binf, n - 1)
+
+    def query(self, start=None, stop=None):
+        """
+        Return the records with start <= time < stop
+
+        Args:
+        start (float): unix start time (default is the first record)
+        stop (float): unix stop time (default is the last record)
+        """
+        with open(self.bin_file, 'rb') as binf:
+            n = self._count(binf)
+            lo = 0 if start is None else self._bisect(binf, n, start)
+            hi = n if stop is None else self._bisect(binf, n, stop)
+            if hi <= lo:
+                return []
+            binf.seek(lo * self._fmt.size)
+            data = binf.read((hi - lo) * self._fmt.size)
+        return list(self._fmt.iter_unpack(data))
+
+    # ***** Helper Methods *****
+    def _count(self, binf):
+        """ Number of complete records in the binary journal """
+        return os.fstat(binf.fileno()).st_size // self._fmt.size
+
+    def _record(self, binf, i):
+        """ Read record i of the binary journal """
+        binf.seek(i * self._fmt.size)
+        return self._fmt.unpack(binf.read(self._fmt.size))
+
+    def _bisect(self, binf, n, t):
+        """ Index of the first record with time >= t """
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._record(binf, mid)[0] < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _convert(self):
+        """
+        Write every record of the text log to a new binary journal.
+        The journal is linked into place once complete, so an
+        interrupted conversion is redone on the next start. Each process
+        converts into its own temporary file and the first to finish
+        publishes it, so a journal already in use is never replaced
+        """
+        tmp = "%s.%d.tmp" % (self.bin_file, os.getpid())
+        with open(tmp, 'wb') as binf:
+            if os.path.exists(self.txt_file):
+                with open(self.txt_file, 'rb') as txtf:
+                    for line in txtf:
+                        rec = self._parse_line(line.decode(errors='ignore'))
+                        if rec is not None:
+                            binf.write(self._fmt.pack(*rec))
+        try:
+            os.link(tmp, self.bin_file)
+        except FileExistsError:
+            pass
+        os.remove(tmp)
+        return
+
+    def _parse_line(self, line):
+        """ Parse a text log line into a record, or None """
+        try:
+            stamp = line.split('[')[1].split(']')[0]
+            t = tm.mktime(
+                dt.datetime.strptime(stamp, "%Y-%m-%d %H:%M:%S").timetuple())
+            pos1, pos2, pos3 = line.split()[2:]
+            return (t, float(pos1), float(pos2), float(pos3))
+        except (IndexError, ValueError):
+            return None
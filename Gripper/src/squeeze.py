@@ -0,0 +1,90 @@
+# Built-in python modules
+import time as tm
+
+
+class Squeeze:
+    """
+    The Squeeze object pushes several gripper axes forward in
+    interleaved increments until each one trips its alarm
+
+    Args:
+    GPR (src.Gripper): Gripper object
+    """
+    def __init__(self, GPR=None):
+        if GPR is None:
+            raise Exception(
+                "Squeeze error: No gripper object passed "
+                "to Squeeze() constructor")
+        self.GPR = GPR
+        self.log = self.GPR.log
+
+    # ***** Public Methods *****
+    def run(self, incr=0.1, axes=None):
+        """
+        Squeeze the given axes until all of them have alarmed
+
+        One cycle pushes every active axis by one increment. The alarm
+        bits are read in a single bulk read after each push, so an
+        alarm is reset before any other axis moves. An axis drops out
+        when its alarm trips or its push fails; an alarm not tied to
+        an axis, or a failed reset, stops the squeeze.
+
+        Args:
+        incr (float): push increment per cycle [mm]
+        axes (list): axes to squeeze (default is all)
+
+        Returns a dict keyed by axis with the travel [mm], number of
+        increments, time spent moving [sec] and whether the axis alarmed
+        """
+        if axes is None:
+            axes = [int(k) for k in self.GPR.motors.keys()]
+        report = {ax: {'travel': 0., 'steps': 0, 'time': 0.,
+                       'alarm': False} for ax in axes}
+        active = list(axes)
+        start = tm.monotonic()
+
+        while len(active):
+            for ax in list(active):
+                motor = self.GPR.motors[str(ax)]
+                if motor.pos + incr > motor.max_pos:
+                    self.log.err(
+                        "Axis %d reached maximum position %.1f mm in "
+                        "Squeeze.run()" % (ax, motor.max_pos))
+                    active.remove(ax)
+                    continue
+                start_pos = motor.pos
+                t0 = tm.monotonic()
+                result, total, alarms = self.GPR.PUSH(incr, ax)
+                report[ax]['time'] += tm.monotonic() - t0
+                report[ax]['travel'] += motor.pos - start_pos
+                report[ax]['steps'] += 1
+
+                tripped = [a for a in active if alarms[a - 1]]
+                for a in tripped:
+                    report[a]['alarm'] = True
+                    active.remove(a)
+                    self.log.log(
+                        "Axis %d alarmed after %.1f mm in Squeeze.run()"
+                        % (a, report[a]['travel']))
+                if not result and ax in active:
+                    self.log.err(
+                        "Axis %d dropped from Squeeze.run() after a "
+                        "failed push" % (ax))
+                    active.remove(ax)
+                if not total:
+                    continue
+                if len(tripped) == 0:
+                    self.log.err(
+                        "Squeeze.run() aborted due to an alarm on no "
+                        "single axis")
+                    self.GPR.RESET()
+                    active = []
+                    break
+                if not self.GPR.RESET():
+                    self.log.err(
+                        "Squeeze.run() aborted due to failed alarm RESET")
+                    active = []
+                    break
+
+        report['total_time'] = tm.monotonic() - start
+        return report
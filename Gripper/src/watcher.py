@@ -0,0 +1,99 @@
+# Built-in python modules
+import time as tm
+
+
+class Watcher:
+    """
+    The Watcher object polls the JXC output image and reports edges
+    on the BUSY and INP outputs. Polling starts fast and backs off
+    geometrically, and deadlines are tracked on a monotonic clock.
+
+    Args:
+    JXC (src.JXC831): JXC object
+    tmin (float): first polling interval [sec] (default 0.01)
+    tmax (float): longest polling interval [sec] (default 0.1)
+    """
+    def __init__(self, JXC, tmin=0.01, tmax=0.1):
+        if JXC is None:
+            raise Exception(
+                'Watcher Error: Watcher() constructor requires a '
+                'controller object')
+        self._JXC = JXC
+        self._tmin = tmin
+        self._tmax = tmax
+        self._backoff = 1.5
+
+        # Output pins read in each block, in address order
+        self._blocks = [
+            (self._JXC.OUT0, ["OUT0", "OUT1", "OUT2", "OUT3", "OUT4",
+                              "BUSY", "AREA", "SETON"]),
+            (self._JXC.INP, ["INP", "SVRE", "ESTOP", "ALARM",
+                             "BUSY1", "BUSY2", "BUSY3",
+                             "AREA1", "AREA2", "AREA3",
+                             "INP1", "INP2", "INP3",
+                             "ALARM1", "ALARM2", "ALARM3"])]
+
+        # Edge callbacks -- called as func(image, elapsed time)
+        self._callbacks = {"BUSY_FALL": [], "INP_RISE": []}
+
+    # ***** Public Methods *****
+    def on(self, edge, func):
+        """
+        Register a callback for an edge
+
+        Args:
+        edge (str): 'BUSY_FALL' or 'INP_RISE'
+        func (callable): called as func(image, elapsed time)
+        """
+        if edge not in self._callbacks.keys():
+            raise Exception(
+                'Watcher Error: unknown edge %s' % (str(edge)))
+        self._callbacks[edge].append(func)
+        return True
+
+    def image(self):
+        """ Read all controller outputs with one read per PLC module """
+        image = {}
+        for first, names in self._blocks:
+            bits = self._JXC.read_block(first, len(names))
+            for name, bit in zip(names, bits):
+                image[name] = bool(bit)
+        return image
+
+    def wait(self, until, timeout):
+        """
+        Poll the output image until a condition is met
+
+        Args:
+        until (callable): returns True when passed a finished image
+        timeout (float): maximum time to wait [sec]
+
+        Returns True if the condition was met before the timeout
+        """
+        start = tm.monotonic()
+        deadline = start + timeout
+        interval = self._tmin
+        prev = None
+        while True:
+            image = self.image()
+            now = tm.monotonic()
+            if prev is not None:
+                self._edges(prev, image, now - start)
+            if until(image):
+                return True
+            if now >= deadline:
+                return False
+            tm.sleep(min(interval, deadline - now))
+            interval = min(interval * self._backoff, self._tmax)
+            prev = image
+
+    # ***** Helper Methods *****
+    def _edges(self, prev, image, elapsed):
+        """ Fire the callbacks for edges between two images """
+        if prev["BUSY"] and not image["BUSY"]:
+            for func in self._callbacks["BUSY_FALL"]:
+                func(image, elapsed)
+        if not prev["INP"] and image["INP"]:
+            for func in self._callbacks["INP_RISE"]:
+                func(image, elapsed)
+        return
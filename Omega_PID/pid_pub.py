@@ -7,33 +7,52 @@ sys.path.append(
     os.path.join(this_dir, '..', 'config'))
 sys.path.append(
     os.path.join(this_dir, 'src'))
+sys.path.append(
+    os.path.join(this_dir, '..', 'housekeeping'))
 
 import pid_controller as pc
 import pb2b_config as cg
+import hk_store as hs
+import spool as sp
+import poll_scheduler as ps
+import acq_clock as ac
 
 sys.path.append(cg.slowdaq_folder)
 
 from slowdaq.pb2 import Publisher
 
-pub = Publisher('CHWP_PID', cg.slowdaq_ip, cg.slowdaq_port)
+# Packets are spooled to disk and published from a background
+# thread, so polling never waits on the slowdaq server
+pub = sp.Spool('CHWP_PID', lambda: Publisher('CHWP_PID', cg.slowdaq_ip, cg.slowdaq_port),
+               max_bytes=cg.slowdaq_spool_max_bytes)
 pid = pc.PID(cg.pid_ip, cg.pid_port)
+store = hs.Store()
+# Monotonic UTC clock for acquisition stamps
+clock = ac.Clock()
+# Poll rates follow the CHWP state within the device budgets
+sched = ps.Scheduler(['pid'], cg.poll_intervals, cg.poll_devices,
+                     cg.poll_budgets)
 
 index = 0
 
 while True:
+    sched.next_due()
     try:
-        hwp_freq = pid.get_freq()
+        hwp_freq, t_freq, lat_freq = clock.call(pid.get_freq)
     except BlockingIOError:
         print('Busy port! Trying again...')
         time.sleep(2)
     else:
         if type(hwp_freq) == float or type(hwp_freq) == int:
-            pub.serve()
-            data = pub.pack({'PID_frequency': hwp_freq, 'time': time.time(), 'index': index})
+            # Stamped with the request/response midpoint of the query
+            sample = {'PID_frequency': hwp_freq,
+                      'PID_frequency latency': lat_freq}
+            store.append('pid', sample, t_freq)
+            sample.update({'time': t_freq, 'index': index})
+            pub.put(sample)
             print(f'HWP Frequency: {hwp_freq}')
-            pub.queue(data)
             index += 1
-            time.sleep(10)
+            sched.done('pid')
         else:
             print('Bad outputs! tyring again...')
             time.sleep(2)
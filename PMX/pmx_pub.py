@@ -7,54 +7,77 @@ sys.path.append(
     os.path.join(this_dir, 'src'))
 sys.path.append(
     os.path.join(this_dir, '..', 'config'))
+sys.path.append(
+    os.path.join(this_dir, '..', 'housekeeping'))
 
 import pmx_open_command_close as occ
 import pb2b_config as cg
+import hk_store as hs
+import spool as sp
+import poll_scheduler as ps
+import acq_clock as ac
 
 sys.path.append(cg.slowdaq_folder)
 
 from slowdaq.pb2 import Publisher
 
-pub = Publisher('CHWP_PMX',cg.slowdaq_ip,cg.slowdaq_port)
+# Packets are spooled to disk and published from a background
+# thread, so polling never waits on the slowdaq server
+pub = sp.Spool('CHWP_PMX', lambda: Publisher('CHWP_PMX',cg.slowdaq_ip,cg.slowdaq_port),
+               max_bytes=cg.slowdaq_spool_max_bytes)
+store = hs.Store()
+# Monotonic UTC clock for acquisition stamps
+clock = ac.Clock()
+
+# Poll rates follow the CHWP state within the device budgets
+sched = ps.Scheduler(['pmx_drive', 'pmx_bias'], cg.poll_intervals,
+                     cg.poll_devices, cg.poll_budgets)
+
+# Supplies polled for each channel
+supplies = {'pmx_drive': [('Drive Kikusui', cg.kdrive_ip, cg.kdrive_port,
+                           '.drive_port_busy')],
+            'pmx_bias': [('Bias1 Kikusui', cg.kbias_ips[0], cg.kbias_ports[0],
+                          '.bias1_port_busy'),
+                         ('Bias2 Kikusui', cg.kbias_ips[1], cg.kbias_ports[1],
+                          '.bias2_port_busy')]}
+
+# Each reading is stamped with the request/response midpoint of its
+# own query, as the supplies are read one after another
+def query(ip, port, lock):
+    (voltage, current), t_vc, lat_vc = occ.open_command_close(
+        'VC?', ip=ip, port=port, lock=lock, clock=clock)
+    output, t_out, lat_out = occ.open_command_close(
+        'O?', ip=ip, port=port, lock=lock, clock=clock)
+    return {'Measured voltage': voltage,
+            'Measured current': current,
+            'VC time': t_vc,
+            'VC latency': lat_vc,
+            'Output status': output[1],
+            'Output time': t_out,
+            'Output latency': lat_out}
 
 index = 0
 
 while True:
+    due = sched.next_due()
+    sample = {}
     try:
-        d_voltage, d_current = occ.open_command_close('VC?')
-        d_output = occ.open_command_close('O?')[1]
-        b1_voltage, b1_current = occ.open_command_close('VC?',ip=cg.kbias_ips[0],
-							port=cg.kbias_ports[0],
-							lock='.bias1_port_busy')
-        b1_output = occ.open_command_close('O?',ip=cg.kbias_ips[0],
-					   port=cg.kbias_ports[0],
-					   lock='.bias1_port_busy')[1]
-        b2_voltage, b2_current = occ.open_command_close('VC?',ip=cg.kbias_ips[1],
-							port=cg.kbias_ports[1],
-							lock='.bias2_port_busy')
-        b2_output = occ.open_command_close('O?',ip=cg.kbias_ips[1],
-					   port=cg.kbias_ports[1],
-					   lock='.bias2_port_busy')[1]
+        for ch in due:
+            for name, ip, port, lock in supplies[ch]:
+                sample[name] = query(ip, port, lock)
     except BlockingIOError:
         print('Busy port! Trying again...')
         time.sleep(2)
     else:
-        if type(d_voltage)==float and type(d_current)==float and type(d_output)==int:
-            pub.serve()
-            data = pub.pack({'Drive Kikusui': {'Measured voltage':d_voltage,
-                             		       'Measured current':d_current,
-                             		       'Output status':d_output},
-			     'Bias1 Kikusui': {'Measured voltage': b1_voltage,
-                             		       'Measured current':b1_current,
-                             		       'Output status':b1_output},
-			     'Bias2 Kikusui': {'Measured voltage': b2_voltage,
-                             		       'Measured current':b2_current,
-                             		       'Output status':b2_output},
-                             'time': time.time(), 'index': index})
-            pub.queue(data)
+        if all(type(d['Measured voltage'])==float and type(d['Measured current'])==float
+               and type(d['Output status'])==int for d in sample.values()):
+            sample['time'] = min(d['VC time'] for d in sample.values())
+            sample['index'] = index
+            store.append('pmx', sample, sample['time'])
+            pub.put(sample)
             index += 1
-            time.sleep(10)
+            for ch in due:
+                sched.done(ch)
         else:
             print('Bad outputs! trying again...')
             time.sleep(2)
-
@@ -10,6 +10,11 @@ sy.path.append(os.path.join(
     this_dir, "..","..", "MOXA"))
 
 import moxaSerial as mx  # noqa: E402
+sy.path.append(this_dir)
+import log_pmx as lg  # noqa: E402
+
+# One logger shared by every PMX object in this process
+log = lg.Logging()
 
 class PMX:
     """
@@ -21,9 +26,11 @@ class PMX:
     tcp_port (int): TCP port
     """
     def __init__(self, rtu_port=None, tcp_ip=None, tcp_port=None, timeout=None):
+        self.log = log
+
         # Connect to device
         msg = self.__conn(rtu_port, tcp_ip, tcp_port, timeout)
-        print(msg)
+        self.log.out(msg)
         self._remote_Mode()
 
         # Timing variables
@@ -31,12 +38,12 @@ class PMX:
 
     def __del__(self):
         if not self.using_tcp:
-            print(
+            self.log.out(
                 "Disconnecting from RTU port %s"
                 % (self._rtu_port))
             self.ser.close()
         else:
-            print(
+            self.log.out(
                 "Disconnecting from TCP IP %s at port %d"
                 % (self._tcp_ip, self._tcp_port))
             pass
@@ -49,7 +56,7 @@ class PMX:
         self.wait()
         val = float(self.ser.readline())
         msg = "Measured voltage = %.3f V" % (val)
-        print(msg)
+        self.log.out(msg)
         return msg, val
 
     def check_current(self):
@@ -59,7 +66,7 @@ class PMX:
         self.wait()
         val = float(self.ser.readline())
         msg = "Measured current = %.3f A" % (val)
-        print(msg)
+        self.log.out(msg)
         return msg, val
 
     def check_voltage_current(self):
@@ -86,7 +93,7 @@ class PMX:
             msg = "Measured output state = ON"
         else:
             msg = "Failed to measure output..."
-        print(msg)
+        self.log.out(msg)
         return msg, val
 
     def set_voltage(self, val, silent=False):
@@ -99,7 +106,7 @@ class PMX:
         val = self.ser.readline()
         msg = "Voltage set = %.3f V" % (float(val))
         if (silent != True):
-            print(msg)
+            self.log.out(msg)
 
         return msg
 
@@ -113,7 +120,7 @@ class PMX:
         val = self.ser.readline()
         msg = "Current set = %.3f A\n" % (float(val))
         if (silent != True):
-            print(msg)
+            self.log.out(msg)
 
         return msg
 
@@ -126,7 +133,7 @@ class PMX:
         self.wait()
         val = self.ser.readline()
         msg = "External source = %s" % (str(val))
-        print(msg)
+        self.log.out(msg)
 
         return msg
 
@@ -139,7 +146,7 @@ class PMX:
         self.wait()
         val = self.ser.readline()
         msg = "External source = %s" % (str(val))
-        print(msg)
+        self.log.out(msg)
 
         return msg
 
@@ -153,7 +160,7 @@ class PMX:
         val = self.ser.readline()
         msg = "Voltage limit set = %.3f V" % (float(val))
         if (silent != True):
-            print(msg)
+            self.log.out(msg)
 
         return msg
 
@@ -167,7 +174,7 @@ class PMX:
         val = self.ser.readline()
         msg = "Current limit set = %.3f A\n" % (float(val))
         if (silent != True):
-            print(msg)
+            self.log.out(msg)
 
         return msg
 
@@ -180,7 +187,7 @@ class PMX:
         self.wait()
         val = self.ser.readline()
         msg = "Output state = %s" % (val)
-        print(msg)
+        self.log.out(msg)
 
         return msg
 
@@ -193,7 +200,7 @@ class PMX:
         self.wait()
         val = self.ser.readline()
         msg = "Output state = %s" % (val)
-        print(msg)
+        self.log.out(msg)
 
         return msg
 
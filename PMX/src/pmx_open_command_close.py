@@ -11,19 +11,34 @@ import command as cm
 import fcntl as f
 
 def open_command_close(cmd, ip = cg.kdrive_ip, port = cg.kdrive_port, 
-		       lock = '.drive_port_busy'):
+		       lock = '.drive_port_busy', timeout = None, clock = None):
+    # With an acq_clock.Clock, returns (result, midpoint, latency) of
+    # the request/response alone
+    # Wait for the port lock, at most timeout [sec] if one is given
+    lockfile = open(os.path.join(this_dir, lock))
+    deadline = None if timeout is None else time.monotonic() + timeout
     while True:
         try:
-            lockfile = open(os.path.join(this_dir, lock))
             f.flock(lockfile, f.LOCK_EX | f.LOCK_NB)
             break
         except BlockingIOError:
+            if deadline is not None and time.monotonic() >= deadline:
+                lockfile.close()
+                raise
             print('PMX BlockingIOError, trying again')
-            time.sleep(1)
+            time.sleep(1 if deadline is None else
+                       max(0., min(1, deadline - time.monotonic())))
 
     PMX = pm.PMX(tcp_ip=ip, tcp_port=port)
     CMD = cm.Command(PMX)
-    result = CMD.user_input(cmd)
+    start = time.monotonic()
+    if clock is None:
+        result = CMD.user_input(cmd)
+    else:
+        result = clock.call(CMD.user_input, cmd)
+    PMX.log.log("%s:%s command '%s' -> %s" % (ip, str(port), cmd, str(result)),
+                command=cmd, duration=time.monotonic() - start)
     del(PMX,CMD)
     f.flock(lockfile, f.LOCK_UN)
+    lockfile.close()
     return result
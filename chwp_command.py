@@ -34,8 +34,12 @@ def print_help():
     print('bb_packet_collect_stop:              Stop process on Beaglebones generating encoder packets')
     print("emergency_monitor_start [value]:     Start emergency stop monitor: [(optional) verbose '0' or '1']")
     print('emergency_monitor_stop:              Stop emergency stop monitor')
+    print('emergency_monitor_status:            Print the state of the emergency stop monitor')
     print('slowdaq_publishers_start:            Start all CHWP slowdaq publishers')
     print('slowdaq_publishers_stop:             Stop all CHWP slowdaq publishers')
+    print('process_status:                      Print state, restarts, CPU and memory of the collectors and publishers')
+    print("process_start [value]:               Start one process: [e.g. 'encoder1' or 'pmx']")
+    print("process_stop [value]:                Stop one process: [e.g. 'encoder1' or 'pmx']")
     print("help:                                Help menu (you're here now)")
     print('exit:                                Exit')
 
@@ -52,7 +56,8 @@ def process_command(user_input):
         return
 
     func = cmds[cmd]
-    if func in [CC.rotation_direction, CC.rotation_bias, CC.gripper_brake]:
+    if func in [CC.rotation_direction, CC.rotation_bias, CC.gripper_brake,
+                CC.process_start, CC.process_stop]:
         func(str(args[1]))
     elif func in [CC.rotation_spin, CC.rotation_voltage]:
         func(float(args[1]))
@@ -93,8 +98,12 @@ cmds = {'warm_grip': CC.warm_grip,
         'bb_packet_collect_stop': CC.bb_packet_collect_stop,
         'emergency_monitor_start': CC.emergency_monitor_start,
         'emergency_monitor_stop': CC.emergency_monitor_stop,
+        'emergency_monitor_status': CC.emergency_monitor_status,
         'slowdaq_publishers_start': CC.slowdaq_publishers_start,
         'slowdaq_publishers_stop': CC.slowdaq_publishers_stop,
+        'process_status': CC.process_status,
+        'process_start': CC.process_start,
+        'process_stop': CC.process_stop,
         'help': print_help,
         'exit': exit}
 
@@ -105,6 +114,7 @@ ps.add_argument('-d', action = 'store', dest = 'direction', type = str, default
 ps.add_argument('-f', action = 'store', dest = 'frequency', type = float, default = 0.0)
 ps.add_argument('-v', action = 'store', dest = 'voltage', type = float, default = 0.0)
 ps.add_argument('-p', action = 'store', dest = 'power', type = str, default = 'off')
+ps.add_argument('-n', action = 'store', dest = 'name', type = str, default = None)
 
 args = ps.parse_args()
 if len(sys.argv) > 1:
@@ -118,6 +128,8 @@ if len(sys.argv) > 1:
         func(voltage = args.voltage, set_dir = False)
     elif func == CC.rotation_bias:
         func(power = args.power)
+    elif func in [CC.process_start, CC.process_stop]:
+        func(name = args.name)
     else:
         func()
 else:
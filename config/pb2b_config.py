@@ -17,6 +17,32 @@ bb2_username = 'polarbear'
 bb2_ip = '192.168.2.56'
 bb2_pass = 'pb4000#$'
 
+#encoder packets from the beaglebones
+encoder_port = 8080
+encoder_rcvbuf = 8*1024**2  # UDP receive buffer [bytes]
+bb_clock_rate = 200e6  # PRU clock [Hz]
+#encoder disk: slot positions per rotation and slots left out at the reference
+encoder_slots = 572
+encoder_ref_slots = 2
+#rotation feedback falls back to the PID when no encoder packet came for this long [sec]
+encoder_stale = 2.0
+#encoder archive chunk length [sec]
+encoder_chunk_seconds = 600.
+#encoder archive retention: oldest chunks are removed past either limit
+encoder_keep_days = 7  # days
+encoder_max_bytes = 100*1024**3  # bytes
+#encoder quality monitor: window and publish period [sec]
+encoder_quality_window = 60.
+encoder_quality_period = 5.
+#limits that restart collection, then reboot the board
+encoder_max_loss = 0.01  # fraction of edges lost
+encoder_max_jitter = 5e-6  # rms edge interval residual [sec]
+encoder_max_missing_refs = 3  # per window
+encoder_stall = 10.  # sec without any packet
+encoder_action_holdoff = 300.  # sec between actions on a board
+encoder_max_reboots = 3  # reboots of a board before giving up
+encoder_max_skew = 1e-3  # inter-board skew, logged only [sec]
+
 #cyberswitch
 cyberswitch_tcp_ip = '192.168.2.52'
 cyberswitch_tcp_port = 4001
@@ -25,6 +51,12 @@ cyberswitch_tcp_port = 4001
 kbias_ips = ['192.168.2.53', '192.168.2.53']
 kbias_ports = [4001, 4002]
 
+#bias switching: attempts per supply, first retry delay (doubling) and
+#longest time for both supplies [sec]
+bias_attempts = 3
+bias_retry_delay = 0.5
+bias_timeout = 30.
+
 #kikusui drive power supply
 kdrive_ip = '192.168.2.53'
 kdrive_port = 4003
@@ -32,6 +64,13 @@ kdrive_port = 4003
 #grippers
 gripper_ip = '192.168.2.52'
 gripper_port = 4002
+#longest wait for the gripper port lock of a control command [sec]
+gripper_lock_timeout = 10.
+#idle time after which a gripper session closes its connection [sec],
+#well above the gaps between the commands of an operator session
+gripper_idle_timeout = 300.
+#longest wait for one gripper PLC request on the asyncio client [sec]
+gripper_request_timeout = 1.
 
 #pid controller
 pid_ip = '192.168.2.58'
@@ -45,14 +84,63 @@ pid_stop_p = 0.2
 pid_stop_i = 0
 pid_stop_d = 0
 
+#emergency shutdown: the rotor counts as stopped below this frequency [Hz]
+#for this long [sec]
+shutdown_stopped_freq = 0.02
+shutdown_stopped_hold = 10.
+#longest wait for the rotor to stop after braking, and when coasting [sec]
+shutdown_brake_timeout = 90.
+shutdown_coast_timeout = 1590.
+
+#rotation_status snapshot: longest wait for any one device [sec]
+snapshot_timeout = 10.
+
+#process supervisor: check period, restart backoff range and the uptime
+#that resets the backoff [sec]
+supervisor_period = 2.
+supervisor_backoff = 5.
+supervisor_backoff_max = 300.
+supervisor_stable = 60.
+
 #slowdaq
 slowdaq_folder = '/home/polarbear/slowdaq_pb2b'
 slowdaq_ip = '192.168.2.102'
 slowdaq_port = 3141
 slowdaq_conn_attempts = 5
+slowdaq_spool_max_bytes = 200*1024**2  # on-disk spool limit per publisher
+
+#change-only status publishing (gripper, cyberswitch)
+status_keyframe_interval = 300.0
+
+#adaptive polling: poll interval [sec] per CHWP state and channel
+poll_intervals = {
+    'idle':      {'pid': 30., 'pmx_drive': 30., 'pmx_bias': 60., 'gripper': 10.,
+                  'cyberswitch': 30., 'aux2_ups': 30., 'mux_ups': 60.},
+    'spinning':  {'pid': 5., 'pmx_drive': 5., 'pmx_bias': 30., 'gripper': 10.,
+                  'cyberswitch': 30., 'aux2_ups': 10., 'mux_ups': 30.},
+    'stopping':  {'pid': 1., 'pmx_drive': 1., 'pmx_bias': 10., 'gripper': 5.,
+                  'cyberswitch': 30., 'aux2_ups': 10., 'mux_ups': 30.},
+    'gripping':  {'pid': 5., 'pmx_drive': 10., 'pmx_bias': 30., 'gripper': 5.,
+                  'cyberswitch': 10., 'aux2_ups': 10., 'mux_ups': 30.},
+    'emergency': {'pid': 1., 'pmx_drive': 1., 'pmx_bias': 5., 'gripper': 5.,
+                  'cyberswitch': 5., 'aux2_ups': 5., 'mux_ups': 30.}}
+#device and requests per poll of each channel (the two bias supplies are on
+#their own ports and polled together, so pmx_bias counts one port)
+poll_devices = {'pid': ('pid', 1),
+                'pmx_drive': ('pmx_drive_port', 3),
+                'pmx_bias': ('pmx_bias_port', 3),
+                'gripper': ('gripper_moxa', 4),
+                'cyberswitch': ('gripper_moxa', 1),
+                'aux2_ups': ('aux2_ups', 1),
+                'mux_ups': ('mux_ups', 1)}
+#device bandwidth budgets [requests/sec]
+poll_budgets = {'pid': 2., 'pmx_drive_port': 4., 'pmx_bias_port': 4.,
+                'gripper_moxa': 5.,
+                'aux2_ups': 1., 'mux_ups': 0.5}
 
 #ups
 mux_ups_ip = '192.168.2.60'
 mux_status_file = 'mux_status.pkl'
 aux2_ups_ip = '192.168.2.59'
-aux2_status_file = 'aux2_status.pkl'
+#control socket of the emergency monitor, in src
+emergency_socket = '.emergency_monitor.sock'
@@ -0,0 +1 @@
+#Empty init file for making the files in this folder importable modules
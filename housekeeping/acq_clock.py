@@ -0,0 +1,78 @@
+# Built-in python modules
+import threading
+import time as tm
+
+
+class Clock:
+    """
+    The Clock object gives UTC timestamps from the monotonic clock. It
+    is anchored to the system clock on construction and then every
+    resync seconds, so intervals between stamps are immune to clock
+    steps, and stamps stay tied to UTC.
+
+    Device queries are stamped with the midpoint between request and
+    response, which is within latency/2 of the moment the device
+    sampled, and the latency is returned with it. The device layers
+    take the clock and call() it around the request/response itself,
+    so waits for the port lock and connection setup are left out.
+
+    One clock can be shared by threads: the anchor is one (utc, mono)
+    pair, replaced as a whole under a lock.
+
+    Args:
+    resync (float): seconds between anchors to UTC (default 600)
+    """
+    def __init__(self, resync=600.):
+        self.resync = resync
+        self._lock = threading.Lock()
+        self._anchor0 = self._anchor()
+
+    # ***** Public Methods *****
+    def now(self):
+        """ Return the current UTC time [sec] """
+        mono = tm.monotonic()
+        return self._utc(mono, self._current(mono))
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call a device query and stamp it
+
+        Args:
+        func (callable): query, called as func(*args, **kwargs)
+
+        Returns (result, midpoint UTC time, latency [sec])
+        """
+        # Both ends are placed with one anchor, so a resync in between
+        # cannot step the latency or the midpoint
+        m0 = tm.monotonic()
+        result = func(*args, **kwargs)
+        m1 = tm.monotonic()
+        anchor = self._current(m1)
+        return result, self._utc(0.5 * (m0 + m1), anchor), m1 - m0
+
+    # ***** Helper Methods *****
+    def _current(self, mono):
+        """ Return the (utc, mono) anchor, anchoring again when due """
+        anchor = self._anchor0
+        if mono - anchor[1] > self.resync:
+            with self._lock:
+                # Another thread may have anchored while we waited
+                if mono - self._anchor0[1] > self.resync:
+                    self._anchor0 = self._anchor()
+                anchor = self._anchor0
+        return anchor
+
+    def _utc(self, mono, anchor):
+        """ UTC time of a monotonic time, from an anchor """
+        return anchor[0] + (mono - anchor[1])
+
+    def _anchor(self):
+        """ Pair the monotonic clock with UTC, using the tightest read """
+        best = None
+        for i in range(5):
+            m0 = tm.monotonic()
+            utc = tm.time()
+            m1 = tm.monotonic()
+            if best is None or m1 - m0 < best[0]:
+                best = (m1 - m0, utc, 0.5 * (m0 + m1))
+        return (best[1], best[2])
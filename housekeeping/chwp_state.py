@@ -0,0 +1,75 @@
+# Built-in python modules
+import contextlib
+import pickle as pkl
+import time as tm
+import os
+
+# Default state file, shared by the control process and the publishers
+state_file = os.path.join(
+    os.path.dirname(__file__), '..', "HK", ".chwp_state.pkl")
+
+
+class State:
+    """
+    The State object shares the CHWP operating state between the
+    control process, which sets it, and the publishers, which read it
+    to choose their polling rates. The 'emergency' state is sticky:
+    other states are ignored until it is cleared with force=True
+
+    Args:
+    fname (str): state file (default is HK/.chwp_state.pkl)
+    """
+    states = ['idle', 'spinning', 'stopping', 'gripping', 'emergency']
+
+    def __init__(self, fname=state_file):
+        self.fname = fname
+        if not os.path.isdir(os.path.dirname(self.fname)):
+            os.makedirs(os.path.dirname(self.fname))
+
+    # ***** Public Methods *****
+    def get(self):
+        """ Return the state record {'state', 'time', 'source'} """
+        try:
+            with open(self.fname, 'rb') as state_file:
+                return pkl.load(state_file)
+        except (OSError, EOFError, pkl.UnpicklingError):
+            return {'state': 'idle', 'time': 0., 'source': None}
+
+    def set(self, state, source=None, force=False):
+        """
+        Set the CHWP state
+
+        Args:
+        state (str): one of State.states
+        source (str): what set the state, for the logs
+        force (bool): leave the emergency state (default False)
+        """
+        if state not in self.states:
+            raise Exception(
+                'State Exception: unknown CHWP state %s' % (str(state)))
+        if (not force and state != 'emergency' and
+           self.get()['state'] == 'emergency'):
+            return False
+        tmp = "%s.%d.tmp" % (self.fname, os.getpid())
+        with open(tmp, 'wb') as state_file:
+            pkl.dump({'state': state, 'time': tm.time(),
+                      'source': source}, state_file)
+        os.replace(tmp, self.fname)
+        return True
+
+    @contextlib.contextmanager
+    def during(self, state, source=None):
+        """
+        Set a state for the duration of a with block and restore the
+        previous state afterwards
+
+        Args:
+        state (str): one of State.states
+        source (str): what set the state, for the logs
+        """
+        previous = self.get()['state']
+        self.set(state, source)
+        try:
+            yield
+        finally:
+            self.set(previous, source)
@@ -0,0 +1,59 @@
+# Built-in python modules
+import time as tm
+
+
+class Delta:
+    """
+    The Delta object turns a stream of status samples into change-only
+    slowdaq packets. A keyframe holding every field is sent on the
+    first sample and then every keyframe_interval seconds. In between,
+    only the fields that changed are sent, each with the time the
+    change was seen.
+
+    Args:
+    keyframe_interval (float): seconds between keyframes (default 300)
+    """
+    def __init__(self, keyframe_interval=300.):
+        self.keyframe_interval = keyframe_interval
+        self.index = 0
+        self._last = None
+        self._last_keyframe = None
+
+    # ***** Public Methods *****
+    def encode(self, sample, t=None):
+        """
+        Return the packet to send for a sample, or None if nothing
+        changed and no keyframe is due
+
+        Args:
+        sample (dict): field name -> value
+        t (float): sample time (default is now)
+
+        Keyframe = {fields..., 'time', 'index', 'keyframe': 1}
+        Delta = {'changes': {field: {'value', 'time'}}, 'time', 'index',
+                 'keyframe': 0}
+        """
+        if t is None:
+            t = tm.time()
+        if (self._last is None or
+           t - self._last_keyframe >= self.keyframe_interval or
+           set(sample.keys()) != set(self._last.keys())):
+            packet = dict(sample)
+            packet['keyframe'] = 1
+            self._last_keyframe = t
+        else:
+            changes = {k: {'value': v, 'time': t}
+                       for k, v in sample.items() if v != self._last[k]}
+            if len(changes) == 0:
+                return None
+            packet = {'changes': changes, 'keyframe': 0}
+        self._last = dict(sample)
+        packet['time'] = t
+        packet['index'] = self.index
+        self.index += 1
+        return packet
+
+    def keyframe(self):
+        """ Force a keyframe on the next sample """
+        self._last = None
+        return
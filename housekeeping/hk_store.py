@@ -0,0 +1,302 @@
+# Built-in python modules
+import datetime as dt
+import json
+import re
+import time as tm
+import os
+import numpy as np
+
+# Default store directory -- the HK folder at the top of the repository
+store_dir = os.path.join(os.path.dirname(__file__), '..', "HK")
+
+
+class Store:
+    """
+    The Store object is an append-only local store for housekeeping
+    samples. Samples belong to a group (one per publisher, e.g. 'pmx')
+    and are stored column-wise, one raw numpy file per channel per day:
+
+    HK/YYYY_MM_DD/<group>/time.f8        unix times
+    HK/YYYY_MM_DD/<group>/<channel>.f8   numeric channels
+    HK/YYYY_MM_DD/<group>/<channel>.u1   boolean channels (255 = missing)
+    HK/YYYY_MM_DD/<group>/index.json     channel name -> file, dtype
+
+    Every row is written to every column of the group, so row i of
+    each column belongs to time i. A boolean channel that later gets a
+    number is rewritten as f8, with 255 read as missing. Reads memory-map the columns, so a
+    range read touches only the rows it returns.
+
+    Args:
+    store_dir (str): store directory (default is the HK folder)
+    """
+    _missing = {'f8': np.nan, 'u1': 255}
+
+    def __init__(self, store_dir=store_dir):
+        self.store_dir = store_dir
+        if not os.path.isdir(self.store_dir):
+            os.mkdir(self.store_dir)
+
+        # Open day of each group -- group -> (day, index, files)
+        self._open = {}
+
+    def __del__(self):
+        self.close()
+
+    # ***** Public Methods *****
+    def append(self, group, sample, t=None):
+        """
+        Append a sample to a group. Nested dicts and lists are
+        flattened into 'a.b' and 'a.0' channel names, strings are
+        stored if they start with a number, and other values are
+        dropped. The slowdaq 'time' and 'index' fields are not stored
+        as channels
+
+        Args:
+        group (str): group name
+        sample (dict): channel name -> value
+        t (float): sample time (default is now)
+        """
+        if t is None:
+            t = tm.time()
+        values = {}
+        self._flatten({k: v for k, v in sample.items()
+                       if k not in ['time', 'index']}, '', values)
+        day, index, files = self._day(group, t)
+
+        # New channels are back-filled so all columns stay aligned
+        for name, (dtype, val) in values.items():
+            if name not in index['channels']:
+                self._add_channel(group, day, index, files, name, dtype)
+            elif dtype == 'f8' and index['channels'][name]['dtype'] != 'f8':
+                self._widen(group, day, index, files, name)
+        for name, chan in index['channels'].items():
+            dtype = chan['dtype']
+            val = values[name][1] if name in values else self._missing[dtype]
+            files[name].write(np.array([val], dtype=dtype).tobytes())
+        files['time'].write(np.array([t], dtype='f8').tobytes())
+        for f in files.values():
+            f.flush()
+        index['rows'] += 1
+        return True
+
+    def read(self, group, start, stop, channels=None):
+        """
+        Return the samples of a group with start <= time < stop as a
+        dict of numpy arrays, including 'time'
+
+        Args:
+        group (str): group name
+        start (float): unix start time
+        stop (float): unix stop time
+        channels (list): channel names (default is all)
+        """
+        blocks = []
+        dtypes = {'time': 'f8'}
+        for day in self._days(start, stop):
+            gdir = os.path.join(self.store_dir, day, group)
+            index = self._load_index(gdir)
+            if index is None:
+                continue
+            cols = {'time': self._map(gdir, 'time.f8', 'f8')}
+            names = index['channels'].keys() if channels is None else channels
+            for name in names:
+                if name not in index['channels']:
+                    continue
+                chan = index['channels'][name]
+                cols[name] = self._map(gdir, chan['file'], chan['dtype'])
+                # f8 on any day makes the channel f8
+                if chan['dtype'] == 'f8' or name not in dtypes:
+                    dtypes[name] = chan['dtype']
+            # A crash can leave columns one row apart
+            rows = min(len(col) for col in cols.values())
+            lo, hi = np.searchsorted(cols['time'][:rows], [start, stop])
+            blocks.append((hi - lo, {name: col[lo:hi]
+                                     for name, col in cols.items()}))
+
+        # Channels missing on some days are filled so rows stay aligned
+        if channels is not None:
+            for name in channels:
+                dtypes.setdefault(name, 'f8')
+        out = {}
+        for name, dtype in dtypes.items():
+            parts = [self._cast(cols[name], dtype) if name in cols else
+                     np.full(n, self._missing[dtype], dtype=dtype)
+                     for n, cols in blocks]
+            out[name] = (np.concatenate(parts) if len(parts) > 0
+                         else np.array([], dtype=dtype))
+        return out
+
+    def groups(self):
+        """ Return the names of every stored group """
+        groups = set()
+        for day in os.listdir(self.store_dir):
+            ddir = os.path.join(self.store_dir, day)
+            # Skip hidden directories such as the publisher spool
+            if os.path.isdir(ddir) and not day.startswith('.'):
+                groups.update(os.listdir(ddir))
+        return sorted(groups)
+
+    def channels(self, group, t=None):
+        """
+        Return the channel names of a group on the day of t
+
+        Args:
+        group (str): group name
+        t (float): unix time (default is now)
+        """
+        if t is None:
+            t = tm.time()
+        index = self._load_index(os.path.join(
+            self.store_dir, self._day_name(t), group))
+        return [] if index is None else list(index['channels'].keys())
+
+    def close(self):
+        """ Close the open column files """
+        for day, index, files in getattr(self, '_open', {}).values():
+            for f in files.values():
+                f.close()
+        self._open = {}
+        return
+
+    # ***** Helper Methods *****
+    def _day_name(self, t):
+        return dt.datetime.fromtimestamp(t).strftime("%Y_%m_%d")
+
+    def _days(self, start, stop):
+        """ Day directories that overlap start <= time < stop """
+        day0 = self._day_name(start)
+        day1 = self._day_name(stop)
+        return sorted(d for d in os.listdir(self.store_dir)
+                      if day0 <= d <= day1 and
+                      os.path.isdir(os.path.join(self.store_dir, d)))
+
+    def _day(self, group, t):
+        """ Open (or roll over to) the day of t for a group """
+        day = self._day_name(t)
+        if group in self._open and self._open[group][0] == day:
+            return self._open[group]
+        if group in self._open:
+            for f in self._open[group][2].values():
+                f.close()
+
+        gdir = os.path.join(self.store_dir, day, group)
+        if not os.path.isdir(gdir):
+            os.makedirs(gdir)
+        index = self._load_index(gdir)
+        if index is None:
+            index = {'channels': {}, 'rows': 0}
+        files = {'time': self._open_column(gdir, 'time.f8', 'f8')}
+        for name, chan in index['channels'].items():
+            files[name] = self._open_column(gdir, chan['file'], chan['dtype'])
+
+        # Drop a partial row left by an interrupted append
+        rows = min(f.tell() // np.dtype(self._dtype(f)).itemsize
+                   for f in files.values())
+        for f in files.values():
+            f.truncate(rows * np.dtype(self._dtype(f)).itemsize)
+            f.seek(0, os.SEEK_END)
+        index['rows'] = rows
+
+        self._open[group] = (day, index, files)
+        return self._open[group]
+
+    def _add_channel(self, group, day, index, files, name, dtype):
+        """ Create a column, back-filled with missing values """
+        gdir = os.path.join(self.store_dir, day, group)
+        fname = self._file_name(index, name, dtype)
+        files[name] = self._open_column(gdir, fname, dtype)
+        files[name].truncate(0)
+        files[name].write(
+            np.full(index['rows'], self._missing[dtype], dtype=dtype).tobytes())
+        index['channels'][name] = {'file': fname, 'dtype': dtype}
+        self._save_index(gdir, index)
+        return
+
+    def _widen(self, group, day, index, files, name):
+        """ Rewrite a boolean column as f8, once a value does not fit """
+        gdir = os.path.join(self.store_dir, day, group)
+        chan = index['channels'][name]
+        files.pop(name).close()
+        old = os.path.join(gdir, chan['file'])
+        vals = self._cast(np.fromfile(old, dtype=chan['dtype']), 'f8')
+
+        # The index moves to the new column only once it is written
+        fname = self._file_name(index, name, 'f8')
+        tmp = os.path.join(gdir, fname + ".tmp")
+        vals.tofile(tmp)
+        os.replace(tmp, os.path.join(gdir, fname))
+        index['channels'][name] = {'file': fname, 'dtype': 'f8'}
+        self._save_index(gdir, index)
+        os.remove(old)
+        files[name] = self._open_column(gdir, fname, 'f8')
+        return
+
+    def _file_name(self, index, name, dtype):
+        """ Column file of a channel, unique within the group """
+        fname = re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_') or 'chan'
+        taken = [c['file'] for c in index['channels'].values()] + ['time.f8']
+        base, i = fname, 1
+        while "%s.%s" % (fname, dtype) in taken:
+            fname = "%s_%d" % (base, i)
+            i += 1
+        return "%s.%s" % (fname, dtype)
+
+    def _save_index(self, gdir, index):
+        tmp = os.path.join(gdir, "index.json.tmp")
+        with open(tmp, 'w') as fidx:
+            json.dump({'channels': index['channels']}, fidx, indent=1)
+        os.replace(tmp, os.path.join(gdir, "index.json"))
+        return
+
+    def _cast(self, col, dtype):
+        """ A column as dtype, with missing values kept missing """
+        if col.dtype == dtype:
+            return col
+        out = col.astype(dtype)
+        out[col == self._missing[col.dtype.str[1:]]] = self._missing[dtype]
+        return out
+
+    def _open_column(self, gdir, fname, dtype):
+        f = open(os.path.join(gdir, fname), 'ab+')
+        f.seek(0, os.SEEK_END)
+        return f
+
+    def _dtype(self, f):
+        return os.path.splitext(f.name)[1][1:]
+
+    def _load_index(self, gdir):
+        fidx = os.path.join(gdir, "index.json")
+        if not os.path.exists(fidx):
+            return None
+        with open(fidx) as f:
+            index = json.load(f)
+        index['rows'] = 0
+        return index
+
+    def _map(self, gdir, fname, dtype):
+        """ Memory-map a column read-only """
+        path = os.path.join(gdir, fname)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return np.array([], dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r')
+
+    def _flatten(self, val, name, out):
+        """ Flatten a sample into channel name -> (dtype, value) """
+        if isinstance(val, dict):
+            for k, v in val.items():
+                self._flatten(v, "%s.%s" % (name, k) if name else str(k), out)
+        elif isinstance(val, (list, tuple)):
+            for i, v in enumerate(val):
+                self._flatten(v, "%s.%d" % (name, i), out)
+        elif isinstance(val, (bool, np.bool_)):
+            out[name] = ('u1', int(val))
+        elif isinstance(val, (int, float, np.integer, np.floating)):
+            out[name] = ('f8', float(val))
+        elif isinstance(val, (str, bytes)):
+            if isinstance(val, bytes):
+                val = val.decode(errors='ignore')
+            match = re.match(r'\s*([-+]?[0-9]*\.?[0-9]+([eE][-+]?[0-9]+)?)',
+                             val)
+            if match is not None:
+                out[name] = ('f8', float(match.group(1)))
+        return
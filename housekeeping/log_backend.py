@@ -0,0 +1,312 @@
+# Built-in python modules
+import atexit
+import datetime as dt
+import fcntl
+import gzip
+import json
+import queue
+import shutil
+import threading
+import time as tm
+import os
+
+# Default log directory -- the LOG folder at the top of the repository
+log_dir = os.path.join(os.path.dirname(__file__), '..', "LOG")
+
+
+class Backend:
+    """
+    The Backend object is the single log writer for a process. Records
+    are queued by the Logging objects and written in batches by a
+    background thread, both as human-readable text and as JSON lines,
+    to one pair of daily files per subsystem:
+
+    LOG/<subsystem>_log_YYYY_MM_DD.txt
+    LOG/<subsystem>_log_YYYY_MM_DD.jsonl
+
+    Files are appended with O_APPEND so several processes can share
+    them. Writers hold a shared flock on the file while appending, and
+    rotation and compression hold an exclusive one from the rename to
+    the removal, so no record goes to a file already compressed. A file
+    larger than max_bytes is rotated, and rotated and
+    previous-day files are compressed with gzip, as a series of gzip
+    members of about block_bytes of log each, so a reader can start
+    decompressing at any member.
+
+    Args:
+    log_dir (str): log directory
+    max_bytes (int): rotate files larger than this (default 50 MB)
+    flush_interval (float): longest time a record waits [sec] (default 1)
+    block_bytes (int): uncompressed size of a gzip member (default 1 MB)
+    """
+    def __init__(self, log_dir=log_dir, max_bytes=50*1024**2,
+                 flush_interval=1.0, block_bytes=1024**2):
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.block_bytes = block_bytes
+        if not os.path.isdir(self.log_dir):
+            os.mkdir(self.log_dir)
+
+        self._queue = queue.Queue()
+        self._day = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # ***** Public Methods *****
+    def write(self, record):
+        """
+        Queue a record for writing
+
+        Args:
+        record (dict): time, subsystem, level, msg, command, duration
+        """
+        self._queue.put(record)
+        return
+
+    def flush(self):
+        """ Block until every queued record is written """
+        self._queue.join()
+        return
+
+    def stop(self):
+        """ Write the queued records and stop the writer thread """
+        self._queue.put(None)
+        self._thread.join()
+        return
+
+    # ***** Helper Methods *****
+    def _run(self):
+        """ Writer thread: collect records into batches and write them """
+        while True:
+            batch = [self._queue.get()]
+            deadline = tm.monotonic() + self.flush_interval
+            while batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get(
+                        timeout=max(0., deadline - tm.monotonic())))
+                except queue.Empty:
+                    break
+            done = batch[-1] is None
+            records = [r for r in batch if r is not None]
+            try:
+                self._write_batch(records)
+            except Exception as e:
+                print("Log backend failed to write %d records: %s"
+                      % (len(records), str(e)))
+            for i in range(len(batch)):
+                self._queue.task_done()
+            if done:
+                return
+
+    def _write_batch(self, records):
+        """ Write a batch of records, grouped by file """
+        files = {}
+        for r in records:
+            stamp = dt.datetime.fromtimestamp(r['time'])
+            base = os.path.join(
+                self.log_dir, "%s_log_%s" % (
+                    r['subsystem'], stamp.strftime("%Y_%m_%d")))
+            if base not in files:
+                files[base] = ([], [])
+            files[base][0].append(self._text(r, stamp))
+            files[base][1].append(json.dumps(r))
+
+        for base, (text, js) in files.items():
+            self._append(base + ".txt", text)
+            self._append(base + ".jsonl", js)
+
+        today = dt.date.today()
+        if self._day != today:
+            self._day = today
+            self._compress_old()
+        return
+
+    def _text(self, r, stamp):
+        """ Human-readable form of a record """
+        wrmsg = "[%s.%03d] %-4s %s" % (
+            stamp.strftime("%Y-%m-%d %H:%M:%S"), stamp.microsecond // 1000,
+            r['level'], r['msg'])
+        if r.get('command') is not None:
+            wrmsg += " [cmd=%s]" % (r['command'])
+        if r.get('duration') is not None:
+            wrmsg += " [%.3f sec]" % (r['duration'])
+        return wrmsg
+
+    def _append(self, fname, lines):
+        """ Append lines to a file in one write, rotating it if too big """
+        fd = self._open_locked(fname, os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                               fcntl.LOCK_SH)
+        try:
+            os.write(fd, ('\n'.join(lines) + '\n').encode())
+            full = os.fstat(fd).st_size > self.max_bytes
+        finally:
+            os.close(fd)
+        if full:
+            self._rotate(fname)
+        return
+
+    def _open_locked(self, fname, flags, lock):
+        """
+        Open a file and flock it. A file renamed or removed between the
+        open and the lock is no longer fname, so it is opened again
+        """
+        while True:
+            fd = os.open(fname, flags, 0o664)
+            fcntl.flock(fd, lock)
+            try:
+                if os.stat(fname).st_ino == os.fstat(fd).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def _rotate(self, fname):
+        """ Move a full file aside and compress it """
+        try:
+            fd = self._open_locked(fname, os.O_RDONLY, fcntl.LOCK_EX)
+        except FileNotFoundError:
+            return
+        try:
+            # Another process may have rotated it already
+            if os.fstat(fd).st_size <= self.max_bytes:
+                return
+            root, ext = os.path.splitext(fname)
+            stamp = tm.strftime("%H%M%S")
+            rotated = "%s.%s%s" % (root, stamp, ext)
+            i = 1
+            while os.path.exists(rotated) or os.path.exists(rotated + ".gz"):
+                rotated = "%s.%s_%d%s" % (root, stamp, i, ext)
+                i += 1
+            os.rename(fname, rotated)
+            # Still locked, so writers that opened it wait and then
+            # move to the new file
+            self._gzip(rotated, fd)
+        finally:
+            os.close(fd)
+        return
+
+    def _compress_old(self):
+        """ Compress the log files of previous days """
+        today = dt.date.today().strftime("%Y_%m_%d")
+        for fname in os.listdir(self.log_dir):
+            if (not (fname.endswith(".txt") or fname.endswith(".jsonl")) or
+               "_log_" not in fname or today in fname):
+                continue
+            self._gzip(os.path.join(self.log_dir, fname))
+        return
+
+    def _gzip(self, fname, locked=None):
+        """
+        Compress a file into fname.gz. The file is locked exclusively
+        until it is removed, so a writer that opened it waits and then
+        writes a new file. The directory lock is held while compressing,
+        so processes take turns, and it is released if the holder dies.
+        A file that reappears after it was compressed (a late record for
+        a previous day) is added to the archive as a new gzip member
+        instead of replacing it
+
+        Args:
+        fname (str): file to compress
+        locked (int): descriptor of fname already locked exclusively
+                      (default None, lock it here)
+        """
+        ffd = locked
+        fd = None
+        try:
+            if ffd is None:
+                ffd = self._open_locked(fname, os.O_RDONLY, fcntl.LOCK_EX)
+            # File lock first, then the directory lock, in every path
+            fd = os.open(os.path.join(self.log_dir, ".gzip.lock"),
+                         os.O_WRONLY | os.O_CREAT, 0o664)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            # Compress aside, so a crash never leaves a partial member
+            tmp = fname + ".gz.tmp"
+            with open(fname, 'rb') as fin:
+                with open(tmp, 'wb') as fout:
+                    while True:
+                        # Members end at line ends
+                        block = fin.read(self.block_bytes)
+                        if len(block) == 0:
+                            break
+                        fout.write(gzip.compress(block + fin.readline()))
+            if os.path.exists(fname + ".gz"):
+                with open(tmp, 'rb') as fin:
+                    with open(fname + ".gz", 'ab') as fout:
+                        shutil.copyfileobj(fin, fout)
+                os.remove(tmp)
+            else:
+                os.rename(tmp, fname + ".gz")
+            os.remove(fname)
+        except FileNotFoundError:
+            # Compressed by another process meanwhile
+            pass
+        finally:
+            if fd is not None:
+                os.close(fd)
+            if locked is None and ffd is not None:
+                os.close(ffd)
+        return
+
+
+# One backend per process, started on first use
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def backend():
+    """ Return the process log backend, starting it if needed """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = Backend()
+            atexit.register(_backend.stop)
+    return _backend
+
+
+class Logging:
+    """
+    The Logging object saves logging messages for one subsystem
+    through the shared log backend
+
+    Args:
+    subsystem (str): subsystem name, used for the log file names
+    """
+    def __init__(self, subsystem):
+        self.subsystem = subsystem
+        self._backend = backend()
+
+    # ***** Public Methods *****
+    def log(self, msg, command=None, duration=None):
+        """ Log a message to file """
+        self._write("INFO", msg, command, duration)
+        return
+
+    def err(self, msg, command=None, duration=None):
+        """ Log an error to file and print it """
+        wrmsg = self._write("ERR", msg, command, duration)
+        print(wrmsg)
+        return
+
+    def out(self, msg, command=None, duration=None):
+        """ Log a message to file and print it """
+        wrmsg = self._write("OUT", msg, command, duration)
+        print(wrmsg)
+        return
+
+    # ***** Helper Methods *****
+    def _write(self, level, msg, command, duration):
+        """ Queue a record and return its printable form """
+        record = {'time': tm.time(), 'subsystem': self.subsystem,
+                  'level': level, 'msg': str(msg),
+                  'command': command, 'duration': duration}
+        self._backend.write(record)
+        return self._wrmsg(msg)
+
+    def _wrmsg(self, msg):
+        now = dt.datetime.now()
+        wrmsg = (
+            "[%04d-%02d-%02d %02d:%02d:%02d] %s"
+            % (now.year, now.month, now.day, now.hour,
+               now.minute, now.second, msg))
+        return wrmsg
@@ -0,0 +1,304 @@
+# Built-in python modules
+import bisect
+import contextlib
+import datetime as dt
+import gzip
+import heapq
+import json
+import re
+import time as tm
+import zlib
+import os
+
+# CHWP housekeeping modules
+import log_backend as lb
+
+# <subsystem>_log_YYYY_MM_DD[.HHMMSS[_n]].txt[.gz]
+_name_re = re.compile(
+    r'^(?P<sub>[a-z0-9]+)_log_(?P<date>\d{4}_\d{2}_\d{2})'
+    r'(\.\d{6}(_\d+)?)?\.txt(\.gz)?$')
+
+# [YYYY-MM-DD HH:MM:SS(.mmm)] (LEVEL) msg ([cmd=...]) ([... sec])
+_line_re = re.compile(
+    r'^\[(?P<stamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})(?P<ms>\.\d{3})?\] '
+    r'(?:(?P<level>INFO|ERR|OUT) +)?(?P<msg>.*?)'
+    r'(?: \[cmd=(?P<cmd>.*?)\])?(?: \[(?P<dur>[0-9.]+) sec\])?$')
+
+
+class LogIndex:
+    """
+    The LogIndex object indexes the CHWP text logs by time. For every
+    log file it keeps a small sidecar index in log_dir/.index holding,
+    per minute, the byte offset of the first line at or after that
+    minute, so a time window is read by seeking rather than scanning.
+    The index is extended incrementally as the live logs grow.
+
+    Compressed logs are written as a series of gzip members, and their
+    index also holds the compressed and uncompressed offset of each
+    member, so a read starts decompressing at the member holding the
+    window rather than at the start of the file.
+
+    Lines from several processes can land slightly out of order, so
+    each index also records the largest backwards time jump seen, and
+    reads cover that much more on both sides of a window.
+
+    Args:
+    log_dir (str): log directory (default is the LOG folder)
+    """
+    def __init__(self, log_dir=lb.log_dir):
+        self.log_dir = log_dir
+        self.index_dir = os.path.join(self.log_dir, ".index")
+        if not os.path.isdir(self.index_dir):
+            os.mkdir(self.index_dir)
+
+        # Consecutive lines mostly share a second, so cache its parse
+        self._stamp = (None, None)
+
+    # ***** Public Methods *****
+    def files(self, start=None, stop=None, subsystems=None):
+        """
+        Return the (subsystem, path) of the log files that can hold
+        entries between start and stop
+
+        Args:
+        start (float): unix start time (default is no limit)
+        stop (float): unix stop time (default is no limit)
+        subsystems (list): subsystem names (default is all)
+        """
+        # Files are daily, so the name narrows the search to whole days
+        # (with a day of margin for out-of-order lines around midnight)
+        day0 = None if start is None else (
+            dt.date.fromtimestamp(start) - dt.timedelta(days=1))
+        day1 = None if stop is None else dt.date.fromtimestamp(stop)
+        files = []
+        for fname in sorted(os.listdir(self.log_dir)):
+            match = _name_re.match(fname)
+            if match is None:
+                continue
+            sub = match.group('sub')
+            if subsystems is not None and sub not in subsystems:
+                continue
+            day = dt.datetime.strptime(match.group('date'), "%Y_%m_%d").date()
+            if (day0 is not None and day < day0) or (
+               day1 is not None and day > day1):
+                continue
+            files.append((sub, os.path.join(self.log_dir, fname)))
+        return files
+
+    def update(self, path):
+        """
+        Index a log file, extending an existing index if the file has
+        only grown since, and return the index
+
+        Args:
+        path (str): log file path
+        """
+        stat = os.stat(path)
+        idx_file = os.path.join(
+            self.index_dir, os.path.basename(path) + ".idx")
+        idx = None
+        if os.path.exists(idx_file):
+            with open(idx_file) as fidx:
+                try:
+                    idx = json.load(fidx)
+                except ValueError:
+                    idx = None
+        if idx is not None and (
+           idx['ino'] != stat.st_ino or idx['mtime'] > stat.st_mtime or
+           (path.endswith(".gz") and idx['mtime'] != stat.st_mtime) or
+           (not path.endswith(".gz") and stat.st_size < idx['offset'])):
+            idx = None
+        if idx is None:
+            idx = {'ino': stat.st_ino, 'mtime': 0., 'offset': 0,
+                   'first': None, 'last': None, 'lag': 0.,
+                   'minutes': [], 'offsets': [], 'members': []}
+        if idx['mtime'] == stat.st_mtime:
+            return idx
+
+        if path.endswith(".gz"):
+            # Compressed files do not grow, so are indexed whole
+            offset = 0
+            for coffset, data in self._members(path):
+                idx['members'].append([coffset, offset])
+                for raw in data.splitlines(True):
+                    self._index_line(idx, raw, offset)
+                    offset += len(raw)
+            idx['offset'] = offset
+        else:
+            with open(path, 'rb') as flog:
+                flog.seek(idx['offset'])
+                offset = idx['offset']
+                for raw in flog:
+                    if not raw.endswith(b'\n'):
+                        # Partial line still being written
+                        break
+                    self._index_line(idx, raw, offset)
+                    offset += len(raw)
+                idx['offset'] = offset
+        idx['mtime'] = stat.st_mtime
+
+        tmp = idx_file + ".tmp"
+        with open(tmp, 'w') as fidx:
+            json.dump(idx, fidx, separators=(',', ':'))
+        os.replace(tmp, idx_file)
+        return idx
+
+    def query(self, start, stop, subsystems=None, levels=None, grep=None):
+        """
+        Yield the log entries with start <= time < stop from every
+        matching file, merged in time order. Each entry is a dict with
+        time, subsystem, level, msg, command and duration
+
+        Args:
+        start (float): unix start time
+        stop (float): unix stop time
+        subsystems (list): subsystem names (default is all)
+        levels (list): levels, 'INFO', 'ERR' or 'OUT' (default is all)
+        grep (str): only entries whose message contains grep
+        """
+        streams = []
+        for sub, path in self.files(start, stop, subsystems):
+            idx = self.update(path)
+            if idx['first'] is None or idx['last'] < start - idx['lag'] or (
+               idx['first'] >= stop + idx['lag']):
+                continue
+            entries = [
+                e for e in self._read(path, sub, idx, start, stop)
+                if (levels is None or e['level'] in levels) and
+                (grep is None or grep in e['msg'])]
+            entries.sort(key=lambda e: e['time'])
+            streams.append(entries)
+        return heapq.merge(*streams, key=lambda e: e['time'])
+
+    # ***** Helper Methods *****
+    @contextlib.contextmanager
+    def _open(self, path, idx, offset):
+        """
+        Open a plain or gzipped log file for binary reading, positioned
+        at an uncompressed offset
+        """
+        with open(path, 'rb') as raw:
+            if not path.endswith(".gz"):
+                raw.seek(offset)
+                yield raw
+                return
+            # Start at the last member beginning at or before offset
+            members = idx.get('members') or [[0, 0]]
+            j = bisect.bisect_right([m[1] for m in members], offset) - 1
+            raw.seek(members[j][0])
+            with gzip.GzipFile(fileobj=raw, mode='rb') as flog:
+                flog.seek(offset - members[j][1])
+                yield flog
+
+    def _members(self, path):
+        """ Yield the compressed offset and data of each gzip member """
+        with open(path, 'rb') as fgz:
+            coffset = 0
+            buf = b''
+            while True:
+                if len(buf) == 0:
+                    buf = fgz.read(1024**2)
+                    if len(buf) == 0:
+                        return
+                d = zlib.decompressobj(wbits=31)
+                out = []
+                used = 0
+                while True:
+                    out.append(d.decompress(buf))
+                    if d.eof:
+                        used += len(buf) - len(d.unused_data)
+                        buf = d.unused_data
+                        break
+                    used += len(buf)
+                    buf = fgz.read(1024**2)
+                    if len(buf) == 0:
+                        # Truncated member
+                        out.append(d.flush())
+                        yield coffset, b''.join(out)
+                        return
+                yield coffset, b''.join(out)
+                coffset += used
+
+    def _index_line(self, idx, raw, offset):
+        """ Add one log line at an uncompressed offset to an index """
+        t = self._time(raw)
+        if t is None:
+            return
+        minute = int(t // 60)
+        if idx['first'] is None:
+            idx['first'] = t
+        if idx['last'] is None or t > idx['last']:
+            idx['last'] = t
+        else:
+            idx['lag'] = max(idx['lag'], idx['last'] - t)
+        if len(idx['minutes']) == 0 or minute > idx['minutes'][-1]:
+            idx['minutes'].append(minute)
+            idx['offsets'].append(offset)
+        return
+
+    def _time(self, raw):
+        """ Unix time of a log line, or None for continuation lines """
+        if raw[:1] != b'[' or len(raw) < 21:
+            return None
+        if raw[1:20] == self._stamp[0]:
+            t = self._stamp[1]
+        else:
+            try:
+                stamp = dt.datetime.strptime(
+                    raw[1:20].decode(), "%Y-%m-%d %H:%M:%S")
+            except ValueError:
+                return None
+            t = tm.mktime(stamp.timetuple())
+            self._stamp = (raw[1:20], t)
+        if raw[20:21] == b'.':
+            try:
+                t += int(raw[21:24]) / 1000.
+            except ValueError:
+                pass
+        return t
+
+    def _read(self, path, sub, idx, start, stop):
+        """ Yield the entries of one file in the window """
+        i = bisect.bisect_left(
+            idx['minutes'], int((start - idx['lag']) // 60))
+        if i == len(idx['minutes']):
+            return
+        end = stop + idx['lag']
+        with self._open(path, idx, idx['offsets'][i]) as flog:
+            entry = None
+            offset = idx['offsets'][i]
+            for raw in flog:
+                if offset >= idx['offset']:
+                    # Past the indexed part of the file
+                    break
+                offset += len(raw)
+                line = raw.decode(errors='replace').rstrip('\n')
+                t = self._time(raw)
+                if t is None:
+                    # Continuation of a multi-line message
+                    if entry is not None:
+                        entry['msg'] += '\n' + line
+                    continue
+                if entry is not None:
+                    yield entry
+                    entry = None
+                if t >= end:
+                    break
+                if t < start or t >= stop:
+                    continue
+                entry = self._entry(line, sub, t)
+            if entry is not None:
+                yield entry
+
+    def _entry(self, line, sub, t):
+        """ Parse a log line into an entry """
+        match = _line_re.match(line)
+        if match is None:
+            return {'time': t, 'subsystem': sub, 'level': 'INFO',
+                    'msg': line, 'command': None, 'duration': None}
+        dur = match.group('dur')
+        return {'time': t, 'subsystem': sub,
+                # Lines written before the shared backend carry no level
+                'level': match.group('level') or 'INFO',
+                'msg': match.group('msg'), 'command': match.group('cmd'),
+                'duration': None if dur is None else float(dur)}
@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+
+# Built-in python modules
+import sys
+import argparse
+import datetime as dt
+import time as tm
+import os
+
+# CHWP housekeeping modules
+this_dir = os.path.dirname(__file__)
+sys.path.append(this_dir)
+import log_backend as lb  # noqa: E402
+import log_index as li  # noqa: E402
+
+
+def parse_time(arg):
+    """ Parse 'YYYY-MM-DD HH:MM[:SS]' local time into unix time """
+    for fmt in ["%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"]:
+        try:
+            return tm.mktime(dt.datetime.strptime(arg, fmt).timetuple())
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(
+        "Cannot parse time '%s', use 'YYYY-MM-DD HH:MM[:SS]'" % (arg))
+
+
+parser = argparse.ArgumentParser(
+    description='Merge the CHWP logs of every subsystem for a time window')
+parser.add_argument('--start', type=parse_time,
+                    help="window start 'YYYY-MM-DD HH:MM[:SS]'")
+parser.add_argument('--stop', type=parse_time,
+                    help="window stop 'YYYY-MM-DD HH:MM[:SS]' (default now)")
+parser.add_argument('--last', type=float, default=60.,
+                    help='window length [min] if no start (default 60)')
+parser.add_argument('--subsystem', '-s', action='append',
+                    help='command, gripper, cyberswitch or pmx (repeatable)')
+parser.add_argument('--level', '-l', action='append',
+                    help='INFO, ERR or OUT (repeatable)')
+parser.add_argument('--grep', '-g', help='only messages containing text')
+parser.add_argument('--dir', default=lb.log_dir, help='log directory')
+args = parser.parse_args()
+
+stop = args.stop if args.stop is not None else tm.time()
+start = args.start if args.start is not None else stop - 60. * args.last
+levels = None if args.level is None else [l.upper() for l in args.level]
+
+index = li.LogIndex(args.dir)
+try:
+    for e in index.query(start, stop, args.subsystem, levels, args.grep):
+        stamp = dt.datetime.fromtimestamp(e['time'])
+        wrmsg = "[%s.%03d] %-11s %-4s %s" % (
+            stamp.strftime("%Y-%m-%d %H:%M:%S"), stamp.microsecond // 1000,
+            e['subsystem'], e['level'], e['msg'])
+        if e['command'] is not None:
+            wrmsg += " [cmd=%s]" % (e['command'])
+        if e['duration'] is not None:
+            wrmsg += " [%.3f sec]" % (e['duration'])
+        print(wrmsg)
+except BrokenPipeError:
+    # Output piped into head, less, etc.
+    pass
@@ -0,0 +1,115 @@
+# Built-in python modules
+import time as tm
+
+# CHWP housekeeping modules
+import chwp_state as cs
+
+
+class Scheduler:
+    """
+    The Scheduler object paces the polling of one publisher. Each
+    channel has a poll interval per CHWP state, so channels that matter
+    in a transition are polled faster while it lasts. Every publisher
+    works from the same tables, so each one can enforce the device
+    budgets on its own: if the channels sharing a device would exceed
+    its budget in the current state, their intervals are stretched
+    in proportion until they fit.
+
+    Args:
+    channels (list): channels polled by this publisher
+    intervals (dict): state -> {channel: poll interval [sec]}
+    devices (dict): channel -> (device, requests per poll)
+    budgets (dict): device -> allowed requests per second
+    state (chwp_state.State): state source (default is the shared file)
+    """
+    def __init__(self, channels, intervals, devices, budgets, state=None):
+        self.channels = channels
+        self._intervals = intervals
+        self._devices = devices
+        self._budgets = budgets
+        self._state = state if state is not None else cs.State()
+
+        # State is re-read at most this often [sec]
+        self._state_period = 0.5
+        self._state_read = None
+        self.state = None
+        self.interval = {}
+
+        # Monotonic time of the last and next poll of each channel
+        self._last = {ch: None for ch in self.channels}
+        self._next = {ch: 0. for ch in self.channels}
+        self._refresh()
+
+    # ***** Public Methods *****
+    def due(self):
+        """ Return the channels due for a poll now """
+        self._refresh()
+        now = tm.monotonic()
+        return [ch for ch in self.channels if now >= self._next[ch]]
+
+    def next_due(self):
+        """
+        Sleep until at least one channel is due and return the due
+        channels. The state is re-checked while sleeping, so a state
+        change takes effect within a fraction of a second
+        """
+        while True:
+            due = self.due()
+            if len(due) > 0:
+                return due
+            wait = min(self._next.values()) - tm.monotonic()
+            tm.sleep(max(0., min(wait, self._state_period)))
+
+    def done(self, channel):
+        """
+        Record that a channel was polled
+
+        Args:
+        channel (str): channel name
+        """
+        now = tm.monotonic()
+        self._last[channel] = now
+        self._next[channel] = now + self.interval[channel]
+        return True
+
+    def budget(self, state):
+        """
+        Return the poll intervals of every channel in a state, after
+        stretching them to fit the device budgets
+
+        Args:
+        state (str): CHWP state
+        """
+        base = self._intervals.get(state, self._intervals['idle'])
+        load = {}
+        for ch, interval in base.items():
+            device, cost = self._devices[ch]
+            load[device] = load.get(device, 0.) + cost / float(interval)
+        out = {}
+        for ch, interval in base.items():
+            device = self._devices[ch][0]
+            scale = max(1., load[device] / self._budgets[device])
+            out[ch] = interval * scale
+        return out
+
+    # ***** Helper Methods *****
+    def _refresh(self):
+        """ Pick up a state change and reschedule the channels """
+        now = tm.monotonic()
+        if (self._state_read is not None and
+           now - self._state_read < self._state_period):
+            return
+        self._state_read = now
+        state = self._state.get()['state']
+        if state == self.state:
+            return
+        self.state = state
+        intervals = self.budget(state)
+        self.interval = {ch: intervals[ch] for ch in self.channels}
+        # A shorter interval applies at once, a longer one after the
+        # next poll
+        for ch in self.channels:
+            if self._last[ch] is not None:
+                self._next[ch] = min(
+                    self._next[ch], self._last[ch] + self.interval[ch])
+        return
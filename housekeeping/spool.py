@@ -0,0 +1,251 @@
+# Built-in python modules
+import collections
+import json
+import threading
+import time as tm
+import os
+
+# Default spool directory
+spool_dir = os.path.join(os.path.dirname(__file__), '..', "HK", ".spool")
+
+
+class Spool:
+    """
+    The Spool object sits between a poller and its slowdaq Publisher.
+    put() only appends to memory and returns at once. A background
+    thread moves records to segment files on disk and publishes them
+    from the oldest segment on, so records always go out in the order
+    they were put, and a slow or unreachable slowdaq server never holds
+    up the poller. Records spooled before a restart are sent first.
+
+    A batch counts as sent once the Publisher takes it without raising.
+    After a failure the batch is resent from the same place, so a
+    record can repeat but never jumps ahead of an older one. If the
+    spool outgrows max_bytes, the oldest segment is dropped.
+
+    Args:
+    name (str): spool name, usually the publisher name
+    factory (callable): returns a new Publisher, called from the thread
+    spool_dir (str): spool directory (default is HK/.spool)
+    max_bytes (int): spool size limit on disk (default 200 MB)
+    batch (int): records per send (default 100)
+    """
+    def __init__(self, name, factory, spool_dir=spool_dir,
+                 max_bytes=200*1024**2, batch=100):
+        self.name = name
+        self._factory = factory
+        self.dir = os.path.join(spool_dir, name)
+        self.max_bytes = max_bytes
+        self.batch = batch
+        if not os.path.isdir(self.dir):
+            os.makedirs(self.dir)
+
+        # Records waiting to be written to disk
+        self._mem = collections.deque(maxlen=100000)
+        self._wake = threading.Event()
+        self._stop = False
+
+        # Segment files roll over after this many records
+        self._seg_records = 1000
+        self._seg_count = 0
+        self._seg_file = None
+
+        # Drain state
+        self._pub = None
+        self._backoff = 1.
+        self._retry_at = 0.
+        self._serve_interval = 1.
+        self.sent = 0
+        self.dropped = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # ***** Public Methods *****
+    def put(self, data):
+        """
+        Queue a packet for publishing without blocking
+
+        Args:
+        data (dict): packet, as passed to Publisher.pack()
+        """
+        if len(self._mem) == self._mem.maxlen:
+            self.dropped += 1
+        self._mem.append(data)
+        self._wake.set()
+        return True
+
+    def pending(self):
+        """ Number of records not yet published """
+        segs = self._segments()
+        count = len(self._mem)
+        seg, line, offset = self._read_cursor()
+        for s in segs:
+            with open(os.path.join(self.dir, s), 'rb') as f:
+                if s == seg:
+                    f.seek(offset)
+                count += sum(1 for _ in f)
+        return count
+
+    def close(self, timeout=5.):
+        """
+        Stop the drain thread once the records in memory are on disk.
+        Unsent records stay spooled for the next start
+
+        Args:
+        timeout (float): longest time to keep sending [sec] (default 5)
+        """
+        self._stop = True
+        self._wake.set()
+        self._thread.join(timeout)
+        return
+
+    # ***** Helper Methods *****
+    def _run(self):
+        """ Drain thread """
+        last_serve = 0.
+        while True:
+            self._wake.wait(self._serve_interval)
+            self._wake.clear()
+            sent = False
+            try:
+                self._to_disk()
+                self._limit()
+                sent = self._send()
+                # Keep the Publisher serviced even when idle
+                now = tm.monotonic()
+                if (not sent and self._pub is not None and
+                   now - last_serve >= self._serve_interval):
+                    self._pub.serve()
+                    last_serve = now
+            except Exception as e:
+                print("Spool '%s' drain error: %s" % (self.name, str(e)))
+                self._fail()
+            if self._stop and len(self._mem) == 0:
+                return
+            if sent:
+                # More may be waiting on disk
+                self._wake.set()
+
+    def _to_disk(self):
+        """ Append the records in memory to the newest segment """
+        if len(self._mem) == 0:
+            return
+        lines = []
+        while len(self._mem) > 0:
+            # A record is removed only once serialized, and a bad one
+            # is dropped on its own
+            try:
+                lines.append(json.dumps(self._mem[0]))
+            except (TypeError, ValueError) as e:
+                print("Spool '%s' dropped a record: %s" % (self.name, str(e)))
+                self.dropped += 1
+            self._mem.popleft()
+        while len(lines) > 0:
+            if self._seg_file is None or self._seg_count >= self._seg_records:
+                self._new_segment()
+            n = self._seg_records - self._seg_count
+            chunk, lines = lines[:n], lines[n:]
+            self._seg_file.write(''.join(l + '\n' for l in chunk))
+            self._seg_count += len(chunk)
+        self._seg_file.flush()
+        return
+
+    def _new_segment(self):
+        """ Start a new segment file after the newest one """
+        if self._seg_file is not None:
+            self._seg_file.close()
+        segs = self._segments()
+        seq = int(segs[-1].split('.')[0]) + 1 if len(segs) > 0 else 0
+        self._seg_file = open(
+            os.path.join(self.dir, "%010d.jsonl" % (seq)), 'a')
+        self._seg_count = 0
+        return
+
+    def _segments(self):
+        return sorted(f for f in os.listdir(self.dir) if f.endswith(".jsonl"))
+
+    def _limit(self):
+        """ Drop the oldest segments while the spool is too big """
+        segs = self._segments()
+        size = sum(os.path.getsize(os.path.join(self.dir, s)) for s in segs)
+        while size > self.max_bytes and len(segs) > 1:
+            path = os.path.join(self.dir, segs.pop(0))
+            size -= os.path.getsize(path)
+            with open(path, 'rb') as f:
+                self.dropped += sum(1 for _ in f)
+            os.remove(path)
+            print("Spool '%s' full, dropped %s" % (self.name, path))
+        return
+
+    def _send(self):
+        """ Publish one batch from the oldest segment """
+        if tm.monotonic() < self._retry_at:
+            return False
+        segs = self._segments()
+        if len(segs) == 0:
+            return False
+        seg, line, offset = self._read_cursor()
+        if seg not in segs:
+            seg, line, offset = segs[0], 0, 0
+        # Read on from the cursor offset, not from the segment start
+        batch = []
+        with open(os.path.join(self.dir, seg), 'rb') as f:
+            f.seek(offset)
+            end = offset
+            while len(batch) < self.batch:
+                l = f.readline()
+                if not l.endswith(b'\n'):
+                    # Partial line still being written
+                    break
+                batch.append(l)
+                end += len(l)
+        if len(batch) == 0:
+            if seg != segs[-1]:
+                # Finished with this segment
+                os.remove(os.path.join(self.dir, seg))
+                self._write_cursor(segs[1], 0, 0)
+                return True
+            return False
+
+        if self._pub is None:
+            self._pub = self._factory()
+        self._pub.serve()
+        for l in batch:
+            try:
+                data = json.loads(l)
+            except ValueError:
+                # A line torn by a crash, skipped alone
+                print("Spool '%s' skipped a bad line in %s" % (self.name, seg))
+                self.dropped += 1
+                continue
+            self._pub.queue(self._pub.pack(data))
+        self._pub.serve()
+
+        self.sent += len(batch)
+        self._backoff = 1.
+        self._write_cursor(seg, line + len(batch), end)
+        return True
+
+    def _fail(self):
+        """ Drop the Publisher and back off before resending """
+        self._pub = None
+        self._retry_at = tm.monotonic() + self._backoff
+        self._backoff = min(2. * self._backoff, 60.)
+        return
+
+    def _read_cursor(self):
+        """ Return the (segment, line, offset) of the next record to send """
+        try:
+            with open(os.path.join(self.dir, "cursor")) as f:
+                seg, line, offset = f.read().split()
+            return seg, int(line), int(offset)
+        except (OSError, ValueError):
+            return None, 0, 0
+
+    def _write_cursor(self, seg, line, offset):
+        tmp = os.path.join(self.dir, "cursor.tmp")
+        with open(tmp, 'w') as f:
+            f.write("%s %d %d\n" % (seg, line, offset))
+        os.replace(tmp, os.path.join(self.dir, "cursor"))
+        return
@@ -0,0 +1,340 @@
+# Built-in python modules
+import subprocess
+import threading
+import time as tm
+import os
+
+# Default directory for the output of the supervised processes
+out_dir = os.path.join(os.path.dirname(__file__), '..', "LOG", "process")
+
+
+class Supervisor:
+    """
+    The Supervisor object runs the long-lived child processes of the
+    CHWP control (Beaglebone packet collectors, slowdaq publishers)
+    and keeps them running. Each process is added once by name and
+    then started and stopped by name.
+
+    A background thread, started with the first process, checks every
+    period whether the processes that should be running still are. A
+    process that exits on its own has its exit code and the end of its
+    output logged and is started again after a backoff, which doubles
+    on each quick death up to backoff_max and resets once the process
+    has stayed up for stable seconds. The CPU use and resident memory
+    of each process are read from /proc, and the status of every
+    process is appended to the housekeeping store when one is given
+    and any process is running or wanted, so a process that only
+    queries its supervisor never writes to the store.
+
+    The output of each process goes to <out_dir>/<name>.txt, so the
+    reason for a death is kept.
+
+    Args:
+    log (Logging): logger with out() and err() (default prints)
+    store (hk_store.Store): store for the status (default None)
+    period (float): check period [sec] (default 2)
+    backoff (float): first restart delay [sec] (default 5)
+    backoff_max (float): longest restart delay [sec] (default 300)
+    stable (float): uptime that resets the backoff [sec] (default 60)
+    out_dir (str): output directory (default is LOG/process)
+    max_out_bytes (int): output file size kept at a start (default 10 MB)
+    """
+    def __init__(self, log=None, store=None, period=2., backoff=5.,
+                 backoff_max=300., stable=60., out_dir=out_dir,
+                 max_out_bytes=10*1024**2):
+        self._log = log
+        self._store = store
+        self.period = period
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.stable = stable
+        self.out_dir = out_dir
+        self.max_out_bytes = max_out_bytes
+        if not os.path.isdir(self.out_dir):
+            os.makedirs(self.out_dir)
+
+        # /proc units
+        self._tick = float(os.sysconf('SC_CLK_TCK'))
+        self._page = os.sysconf('SC_PAGE_SIZE')
+
+        self._procs = {}
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ***** Public Methods *****
+    @property
+    def names(self):
+        return list(self._procs.keys())
+
+    def add(self, name, args, restart=True, cwd=None):
+        """
+        Register a process without starting it
+
+        Args:
+        name (str): process name
+        args (list): command line
+        restart (bool): start it again when it dies (default True)
+        cwd (str): working directory (default the current one)
+        """
+        with self._lock:
+            self._procs[name] = {
+                'args': list(args), 'restart': restart, 'cwd': cwd,
+                'popen': None, 'want': False, 'started': None,
+                'starts': 0, 'restarts': 0, 'exit_code': None,
+                'exit_time': None, 'next_start': None,
+                'backoff': self.backoff, 'cpu': None, 'rss': None,
+                'ticks': None}
+        return True
+
+    def alive(self, name):
+        """ Whether a process is running """
+        popen = self._get(name)['popen']
+        return popen is not None and popen.poll() is None
+
+    def start(self, name):
+        """
+        Start a process unless it is running. Returns False if it was
+        already running or did not start
+
+        Args:
+        name (str): process name
+        """
+        with self._lock:
+            proc = self._get(name)
+            # Collect a process that died since the last check
+            self._check(name, proc, tm.monotonic())
+            proc['want'] = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            if proc['popen'] is not None:
+                return False
+            proc['backoff'] = self.backoff
+            return self._launch(name, proc)
+
+    def stop(self, name, timeout=5.):
+        """
+        Stop a process, killing it if it does not end within timeout.
+        Returns False if it was not running
+
+        Args:
+        name (str): process name
+        timeout (float): time allowed to end after SIGTERM [sec]
+        """
+        with self._lock:
+            proc = self._get(name)
+            proc['want'] = False
+            proc['next_start'] = None
+            popen = proc['popen']
+            if popen is None:
+                return False
+            proc['popen'] = None
+        if popen.poll() is None:
+            popen.terminate()
+            try:
+                popen.wait(timeout)
+            except subprocess.TimeoutExpired:
+                popen.kill()
+                popen.wait()
+        with self._lock:
+            proc['exit_code'] = popen.returncode
+            proc['exit_time'] = tm.time()
+            proc['cpu'] = proc['rss'] = proc['ticks'] = None
+        return True
+
+    def restart(self, name):
+        """
+        Stop and start a process
+
+        Args:
+        name (str): process name
+        """
+        self.stop(name)
+        return self.start(name)
+
+    def status(self, name=None):
+        """
+        Return the status of one process, or of all by name:
+        running, wanted, pid, uptime [sec], starts, restarts,
+        exit code and time of the last exit, seconds to the next
+        automatic start, cpu [%] and rss [MB]
+
+        Args:
+        name (str): process name (default all)
+        """
+        if name is None:
+            return {n: self.status(n) for n in self.names}
+        with self._lock:
+            proc = self._get(name)
+            now = tm.monotonic()
+            self._check(name, proc, now)
+            popen = proc['popen']
+            running = popen is not None
+            return {
+                'running': running,
+                'wanted': proc['want'],
+                'pid': popen.pid if running else None,
+                'uptime': now - proc['started'] if running else None,
+                'starts': proc['starts'],
+                'restarts': proc['restarts'],
+                'exit_code': proc['exit_code'],
+                'exit_time': proc['exit_time'],
+                'next_start': (max(0., proc['next_start'] - now)
+                               if proc['next_start'] is not None else None),
+                'cpu': proc['cpu'],
+                'rss': proc['rss']}
+
+    def close(self):
+        """ Stop the check thread and every process """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        for name in self.names:
+            self.stop(name)
+        return
+
+    # ***** Helper Methods *****
+    def _get(self, name):
+        if name not in self._procs:
+            raise Exception(
+                "Supervisor Exception: no process named '%s'" % (name))
+        return self._procs[name]
+
+    def _out(self, msg):
+        if self._log is not None:
+            self._log.out(msg)
+        else:
+            print(msg)
+
+    def _err(self, msg):
+        if self._log is not None:
+            self._log.err(msg)
+        else:
+            print(msg)
+
+    def _launch(self, name, proc):
+        """ Start the process of an entry """
+        fname = os.path.join(self.out_dir, "%s.txt" % (name))
+        mode = 'ab'
+        if (os.path.exists(fname) and
+           os.path.getsize(fname) > self.max_out_bytes):
+            mode = 'wb'
+        with open(fname, mode) as out:
+            out.write(("----- %s start\n" % (
+                tm.strftime("%Y-%m-%d %H:%M:%S"))).encode())
+            out.flush()
+            try:
+                proc['popen'] = subprocess.Popen(
+                    proc['args'], cwd=proc['cwd'], stdin=subprocess.DEVNULL,
+                    stdout=out, stderr=subprocess.STDOUT)
+            except OSError as e:
+                # Retried like a process that died at once
+                self._err("Supervisor: %s did not start: %s" % (name, e))
+                proc['popen'] = None
+                proc['started'] = tm.monotonic()
+                proc['exit_code'] = None
+                proc['exit_time'] = tm.time()
+                self._schedule(name, proc, 0.)
+                return False
+        proc['started'] = tm.monotonic()
+        proc['starts'] += 1
+        proc['next_start'] = None
+        proc['ticks'] = None
+        return True
+
+    def _schedule(self, name, proc, uptime):
+        """ Set the next start of a dead process, with backoff """
+        if not (proc['want'] and proc['restart']):
+            proc['next_start'] = None
+            return
+        if uptime >= self.stable:
+            proc['backoff'] = self.backoff
+        proc['next_start'] = tm.monotonic() + proc['backoff']
+        self._out("Supervisor: restarting %s in %.0f sec"
+                  % (name, proc['backoff']))
+        proc['backoff'] = min(2. * proc['backoff'], self.backoff_max)
+        return
+
+    def _check(self, name, proc, now):
+        """ Collect a dead process and start it again when due """
+        popen = proc['popen']
+        if popen is not None and popen.poll() is not None:
+            uptime = now - proc['started']
+            proc['popen'] = None
+            proc['exit_code'] = popen.returncode
+            proc['exit_time'] = tm.time()
+            proc['cpu'] = proc['rss'] = proc['ticks'] = None
+            self._err("Supervisor: %s (pid %d) exited with code %d after "
+                      "%.0f sec%s" % (name, popen.pid, popen.returncode,
+                                      uptime, self._tail(name)))
+            self._schedule(name, proc, uptime)
+        elif (popen is None and proc['next_start'] is not None and
+              now >= proc['next_start']):
+            proc['restarts'] += 1
+            if self._launch(name, proc):
+                self._out("Supervisor: %s restarted (%d restarts)"
+                          % (name, proc['restarts']))
+        return
+
+    def _tail(self, name, nbytes=200):
+        """ Last line of the output of a process, for the exit message """
+        fname = os.path.join(self.out_dir, "%s.txt" % (name))
+        try:
+            with open(fname, 'rb') as f:
+                f.seek(max(0, os.path.getsize(fname) - nbytes))
+                lines = f.read().decode(errors='replace').strip().splitlines()
+        except OSError:
+            return ''
+        if len(lines) == 0 or lines[-1].startswith('----- '):
+            return ''
+        return ': %s' % (lines[-1])
+
+    def _usage(self, proc, now):
+        """ CPU [%] and RSS [MB] of a running process from /proc """
+        pid = proc['popen'].pid
+        try:
+            with open('/proc/%d/stat' % (pid)) as f:
+                # Fields after the command name, which may hold spaces
+                fields = f.read().rsplit(')', 1)[1].split()
+        except (OSError, IndexError):
+            return
+        # utime and stime are fields 14 and 15, rss is 24
+        ticks = int(fields[11]) + int(fields[12])
+        proc['rss'] = int(fields[21]) * self._page / 1024.**2
+        if proc['ticks'] is not None and now > proc['ticks'][0]:
+            proc['cpu'] = (100. * (ticks - proc['ticks'][1]) / self._tick /
+                           (now - proc['ticks'][0]))
+        proc['ticks'] = (now, ticks)
+        return
+
+    def _record(self):
+        """ Append the status of every process to the store """
+        status = self.status()
+        if not any(st['running'] or st['wanted'] for st in status.values()):
+            return
+        sample = {}
+        for name, st in status.items():
+            sample[name] = {'running': st['running'],
+                            'restarts': st['restarts'],
+                            'uptime': st['uptime'],
+                            'cpu': st['cpu'],
+                            'rss': st['rss']}
+        self._store.append('processes', sample)
+        return
+
+    def _run(self):
+        """ Check thread """
+        while not self._stop.wait(self.period):
+            try:
+                with self._lock:
+                    now = tm.monotonic()
+                    for name, proc in self._procs.items():
+                        self._check(name, proc, now)
+                        if proc['popen'] is not None:
+                            self._usage(proc, now)
+                if self._store is not None:
+                    self._record()
+            except Exception as e:
+                self._err("Supervisor._run(): %s" % (str(e)))
+        return
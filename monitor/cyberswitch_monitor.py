@@ -4,7 +4,7 @@ import os
 
 this_dir = os.path.dirname(__file__)
 sy.path.append(os.path.join(this_dir, '..', "config"))
-import pb2b_config_config as cg  # noqa: E402
+import pb2b_config as cg  # noqa: E402
 sy.path.append(os.path.join(this_dir, "src"))
 import chwpMonitor as cm  # noqa: E402
 sy.path.append(os.path.join(this_dir, '..', "Cyberswitch", "src"))
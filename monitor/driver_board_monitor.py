@@ -30,15 +30,15 @@ try:
         out_dict = {}
         # Power status
         out_dict.update(
-            {("PWR%02d" % (i)): ("%d" % (int(pmx.check_output())))
+            {("PWR%02d" % (i)): ("%d" % (int(pmx.check_output()[1])))
              for i, pmx in enumerate(pmx_arr)})
         # Output voltage
         out_dict.update(
-            {("VOL%02d" % (i)): ("%.05f" % (float(pmx.check_voltage())))
+            {("VOL%02d" % (i)): ("%.05f" % (float(pmx.check_voltage()[1])))
              for i, pmx in enumerate(pmx_arr)})
         # Output current
         out_dict.update(
-            {("CUR%02d" % (i)): ("%.05f" % (float(pmx.check_current())))
+            {("CUR%02d" % (i)): ("%.05f" % (float(pmx.check_current()[1])))
              for i, pmx in enumerate(pmx_arr)})
 
         # Send the data
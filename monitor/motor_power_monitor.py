@@ -30,11 +30,11 @@ try:
         # Collect monitoring information
         out_dict = {}
         # Power status
-        out_dict.update({"PWR": ("%d" % (int(pmx.check_output())))})
+        out_dict.update({"PWR": ("%d" % (int(pmx.check_output()[1])))})
         # Output voltage
-        out_dict.update({"VOL": ("%.05f" % (float(pmx.check_voltage())))})
+        out_dict.update({"VOL": ("%.05f" % (float(pmx.check_voltage()[1])))})
         # Output current
-        out_dict.update({"CUR": ("%.05f" % (float(pmx.check_current())))})
+        out_dict.update({"CUR": ("%.05f" % (float(pmx.check_current()[1])))})
         # Send the data
         success = monitor.send_data(out_dict)
         tm.sleep(send_sleep)
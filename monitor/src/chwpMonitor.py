@@ -1,4 +1,6 @@
+import selectors as sl
 import socket as sk
+import threading as th
 import sys as sy
 import os
 
@@ -10,50 +12,149 @@ import pb2b_config as cg  # noqa: E402
 
 
 class CHWPMonitor(object):
-    def __init__(self):
-        # Establish socket connection to remote slowDAQ publisher
+    """
+    The CHWPMonitor object serves the latest monitor snapshot to any
+    number of clients. A background thread runs a selector loop that
+    accepts connections and answers every 'REQDATA' request with the
+    cached payload, so requests never touch the hardware and never wait
+    on the monitor script's polling loop.
+
+    The payload is "key1,key2,...,keyn:val1,val2,...,valn" followed by
+    a newline, encoded once per snapshot.
+
+    Args:
+    ip (str): address to listen on (default cg.slowdaq_ip)
+    port (int): port to listen on (default cg.slowdaq_port)
+    """
+    def __init__(self, ip=cg.slowdaq_ip, port=cg.slowdaq_port):
         self.s = sk.socket(sk.AF_INET, sk.SOCK_STREAM)
-        self.s.bind((cg.slowdaq_ip, cg.slowdaq_port))
-        self.s.listen(cg.slowdaq_conn_attempts)
+        self.s.setsockopt(sk.SOL_SOCKET, sk.SO_REUSEADDR, 1)
+        self.s.bind((ip, port))
+        self.s.listen(sk.SOMAXCONN)
+        self.s.setblocking(False)
         self._recv_size = 1024
-    
+
+        # Latest payload, replaced whole so the server thread can read
+        # it without a lock
+        self._data_to_send = b''
+
+        self._sel = sl.DefaultSelector()
+        self._sel.register(self.s, sl.EVENT_READ, None)
+        # Client socket -> [input buffer, output buffer]
+        self._clients = {}
+        self._running = True
+        self._thread = th.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
     def __del__(self):
         self.close_socket()
 
     def send_data(self, data_dict):
-        # Check to see if data was requested
-        req_string = self.s.recv(self._recv_size).strip().upper()
-        if req_string == "REQDATA":
-            self._package_data(data_dict)
-            self.s.send(self._data_to_send)
-            return True
-        elif req_string == "":
-            return False
-        else:
-            print("Unexpected string received in CHWPMonitor: %s"
-                  % (req_string))
-            return False
+        """
+        Replace the snapshot served to clients
+
+        Args:
+        data_dict (dict): monitor values
+        """
+        self._package_data(data_dict)
+        return True
 
     def close_socket(self):
-        self.s.shutdown(sk.SHUT_RDWR)
+        if not getattr(self, '_running', False):
+            return
+        self._running = False
+        self._thread.join()
+        for conn in list(self._clients.keys()):
+            self._drop(conn)
+        self._sel.close()
         self.s.close()
         return
 
+    # ***** Helper Methods *****
+    def _serve(self):
+        """ Selector loop, run in the server thread """
+        while self._running:
+            for key, mask in self._sel.select(timeout=0.5):
+                if key.fileobj is self.s:
+                    self._accept()
+                    continue
+                conn = key.fileobj
+                if mask & sl.EVENT_READ:
+                    self._read(conn)
+                if mask & sl.EVENT_WRITE and conn in self._clients:
+                    self._write(conn)
+        return
+
+    def _accept(self):
+        """ Accept every pending connection """
+        while True:
+            try:
+                conn, addr = self.s.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            conn.setblocking(False)
+            self._clients[conn] = [b'', b'']
+            self._sel.register(conn, sl.EVENT_READ, None)
+
+    def _read(self, conn):
+        try:
+            data = conn.recv(self._recv_size)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if data == b'':
+            self._drop(conn)
+            return
+        inbuf = (self._clients[conn][0] + data).upper()
+        # Answer each complete request in the buffer
+        while b'REQDATA' in inbuf:
+            inbuf = inbuf[inbuf.index(b'REQDATA') + len(b'REQDATA'):]
+            self._clients[conn][1] += self._data_to_send
+        if len(inbuf) > self._recv_size:
+            print("Unexpected string received in CHWPMonitor: %s"
+                  % (inbuf.strip()))
+            inbuf = b''
+        self._clients[conn][0] = inbuf[-len(b'REQDATA'):]
+        if len(self._clients[conn][1]) > 0:
+            self._write(conn)
+        return
+
+    def _write(self, conn):
+        outbuf = self._clients[conn][1]
+        try:
+            sent = conn.send(outbuf)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self._drop(conn)
+            return
+        self._clients[conn][1] = outbuf[sent:]
+        events = sl.EVENT_READ
+        if len(self._clients[conn][1]) > 0:
+            events |= sl.EVENT_WRITE
+        self._sel.modify(conn, events, None)
+        return
+
+    def _drop(self, conn):
+        self._sel.unregister(conn)
+        del self._clients[conn]
+        conn.close()
+        return
+
     def _package_data(self, data_dict):
         # Construct a string to be sent to the slowDAQ publisher
         # with the following format
         # "key1,key2,...,keyn:val1,val2,...,valn"
-        wrstr = ''
-        for key in data_dict.keys():
-            if key != data_dict.keys()[-1]:
-                wrstr += ("%s," % (str(key)))
-            else:
-                wrstr += ("%s:" % (str(key)))
-        for val in data_dict.values():
-            if val != data_dict.values()[-1]:
-                wrstr += ("%01d," % (int(val)))
-            else:
-                wrstr += ("%01d" % (int(val)))
-        self._data_to_send = wrstr
+        keys = ','.join(str(key) for key in data_dict.keys())
+        vals = ','.join(self._format(val) for val in data_dict.values())
+        self._data_to_send = ("%s:%s\n" % (keys, vals)).encode()
         return
-    
+
+    def _format(self, val):
+        """ Format a value: bits and ints as integers, floats to 5 places """
+        if isinstance(val, (bool, int)):
+            return "%d" % (int(val))
+        elif isinstance(val, float):
+            return "%.05f" % (val)
+        return str(val)
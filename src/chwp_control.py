@@ -1,8 +1,9 @@
 # Built-in python modules
 import datetime as dt
+import json
 import numpy as np
-import pickle as pkl
 import sys
+import threading
 import time
 import os
 import readline
@@ -20,6 +21,10 @@ sys.path.append(
     os.path.join(this_dir, "..", "PMX", "src"))
 sys.path.append(
     os.path.join(this_dir, "..", "config"))
+sys.path.append(
+    os.path.join(this_dir, "..", "housekeeping"))
+sys.path.append(
+    os.path.join(this_dir, "..", "Encoder", "src"))
 
 import cyberswitch_open_command_close as cocc  # noqa: E402
 import log_control as lg  # noqa: E402
@@ -27,6 +32,15 @@ import pid_controller as pc
 import pmx_open_command_close as pocc
 import gripper_open_command_close as gocc
 import pb2b_config as cg
+import chwp_state as cs
+import hk_store as hs
+import supervisor as sv
+import emergency_ipc as ipc
+import chwp_snapshot as sn
+import encoder_receiver as er
+import encoder_angle as ea
+import encoder_archive as eA
+import encoder_quality as eq
 
 
 class CHWP_Control:
@@ -37,6 +51,9 @@ class CHWP_Control:
         self._read_pos()
         self._log = lg.Logging()
 
+        # Operating state, read by the publishers to pace their polling
+        self._state = cs.State()
+
         old_stdout = sys.stdout
         
         with open(os.devnull, 'w') as devnull:
@@ -46,22 +63,45 @@ class CHWP_Control:
         
         self._pid_direction = 'forward'
 
-        self.bbs = {'encoder1': None,
-                    'encoder2': None}
+        # Beaglebone packet collectors and slowdaq publishers, kept
+        # running by the supervisor
+        self.procs = sv.Supervisor(
+            self._log, store=hs.Store(), period=cg.supervisor_period,
+            backoff=cg.supervisor_backoff,
+            backoff_max=cg.supervisor_backoff_max,
+            stable=cg.supervisor_stable)
+
+        self.bbs = ['encoder1', 'encoder2']
+        self.procs.add('encoder1', [os.path.join(this_dir, 'bb_packet_collect'),
+                                    cg.bb1_username, cg.bb1_ip, cg.bb1_pass])
+        self.procs.add('encoder2', [os.path.join(this_dir, 'bb_packet_collect'),
+                                    cg.bb2_username, cg.bb2_ip, cg.bb2_pass])
+        # Encoder packet receiver, HWP angle and archive, while collecting
+        self.encoder = None
+        self.tracker = None
+        self.archive = None
+        self.quality = None
+        self._freq_source = None
 
         self.monitor = None
 
-        self.pubs = {'aux2_ups': None,
-                     'cyberswitch': None,
-                     'gripper': None,
-                     'pid': None,
-                     'pmx': None}
+        self.pubs = ['aux2_ups', 'cyberswitch', 'gripper', 'pid', 'pmx']
+        pub_scripts = {'aux2_ups': ('APC_UPS', 'aux2_ups_pub.py'),
+                       'cyberswitch': ('Cyberswitch', 'cyberswitch_pub.py'),
+                       'gripper': ('Gripper', 'gripper_pub.py'),
+                       'pid': ('Omega_PID', 'pid_pub.py'),
+                       'pmx': ('PMX', 'pmx_pub.py')}
+        for key in self.pubs:
+            self.procs.add(key, ['python3', os.path.join(
+                this_dir, '..', *pub_scripts[key])])
         return
 
     def __exit__(self):
         self._write_pos()
         self.slowdaq_publishers_stop()
         self.bb_packet_collect_stop()
+        self.procs.close()
+        gocc.close()
         return
 
     # ***** Public Methods *****
@@ -118,7 +158,8 @@ class CHWP_Control:
 
     def gripper_home(self):
         """ Home the grippers """
-        gocc.open_command_close('HOME')
+        with self._state.during('gripping', 'CHWP_Control.gripper_home()'):
+            gocc.open_command_close('HOME')
         self._log.out("CHWP_Control.griper_home(): Gripper homed")
         return gocc.open_command_close('OFF')
 
@@ -165,21 +206,30 @@ class CHWP_Control:
             self._log.out('Invalid argument value')
             return False
 
-        try:
-            pocc.open_command_close(power,ip=cg.kbias_ips[0],
-                                   port=cg.kbias_ports[0],
-                                   lock='.bias1_port_busy')
-            pocc.open_command_close(power,ip=cg.kbias_ips[1],
-                                   port=cg.kbias_ports[1],
-                                   lock='.bias2_port_busy')
+        # The two supplies are on their own ports, so switch them together.
+        # Past the deadline a supply is no longer switched, so a late
+        # thread cannot change it after this call has returned
+        results = {}
+        deadline = time.monotonic() + cg.bias_timeout
+        threads = [threading.Thread(target=self._bias_set, args=(i, power.lower(), results, deadline),
+                                    daemon=True) for i in range(len(cg.kbias_ips))]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join(max(0., deadline - time.monotonic()))
+
+        ok = True
+        for i in range(len(cg.kbias_ips)):
+            if i not in results:
+                self._log.err(f'CHWP_Control.rotation_bias(): Bias{i + 1} not switched within {cg.bias_timeout:.0f} sec')
+                ok = False
+            elif not results[i]:
+                ok = False
+        if ok:
             self._log.out(f"CHWP_Control.rotation_bias(): Bias power supply status changed to: {power}")
-            return True
-        except BlockingIOError:
-            self._log.out('Blocking Error, trying again')
-            time.sleep(0.5)
-            self.rotation_bias(power = power)
-        
-        return False
+        else:
+            self._log.err(f"CHWP_Control.rotation_bias(): Bias power supplies not all {power}")
+        return ok
 
     def rotation_direction(self, direction = 'forward'):
         if type(direction) is not str:
@@ -202,25 +252,44 @@ class CHWP_Control:
             return True
 
     def rotation_status(self):
-        cur_vc = pocc.open_command_close('VC?')
-        cur_out = pocc.open_command_close('O?')
-        cur_freq = self.pid.get_freq()
-        cur_out_bias1 = pocc.open_command_close('O?',ip=cg.kbias_ips[0],
-                                                port=cg.kbias_ports[0],
-                                                lock='.bias1_port_busy')
-        cur_out_bias2 = pocc.open_command_close('O?',ip=cg.kbias_ips[1],
-                                                port=cg.kbias_ports[1],
-                                                lock='.bias2_port_busy')
-        self._log.out(f'PMX Voltage: {cur_vc[0]} V')
-        self._log.out(f'PMX Current: {cur_vc[1]} A')
-        self._log.out(f'PMX Drive Output: {cur_out[0]}')
-        self._log.out(f'PMX Bias1 Output: {cur_out_bias1[0]}')
-        self._log.out(f'PMX Bias2 Output: {cur_out_bias2[0]}')
-        self._log.out(f'Rotation Frequency: {cur_freq} Hz')
+        """ Read every device at once, print the state and return the record """
+        status = sn.Snapshot(self.pid, self.tracker).take()
+        status['direction'] = self._pid_direction
+        self._log.log(json.dumps(status, default=str),
+                      command='rotation_status', duration=status['duration'])
+
+        def entry(name, fmt, key):
+            if status[name]['error'] is not None:
+                return f"unavailable ({status[name]['error']})"
+            return fmt % (status[name][key])
+
+        onoff = {0: 'OFF', 1: 'ON'}
+        self._log.out('PMX Voltage: %s' % (entry('drive', '%s V', 'Measured voltage')))
+        self._log.out('PMX Current: %s' % (entry('drive', '%s A', 'Measured current')))
+        for name, label in [('drive', 'Drive'), ('bias1', 'Bias1'), ('bias2', 'Bias2')]:
+            out = entry(name, '%s', 'Output status')
+            self._log.out(f'PMX {label} Output: {onoff.get(status[name].get("Output status"), out)}')
+        self._log.out('Rotation Frequency: %s' % (entry('pid', '%s Hz', 'freq')))
+        if 'encoder' in status:
+            self._log.out('Encoder Frequency: %s' % (entry('encoder', '%.4f Hz', 'freq')))
         self._log.out(f'Rotation Direction: {self._pid_direction}')
-        return True
+        if status['gripper']['error'] is None:
+            self._log.out('Gripper: alarm %d, emergency stop %d, servo ready %d'
+                          % (status['gripper']['ALARM'], status['gripper']['ESTOP'],
+                             status['gripper']['SVRE']))
+        else:
+            self._log.out(f"Gripper: unavailable ({status['gripper']['error']})")
+        if status['cyberswitch']['error'] is None:
+            self._log.out('Cyberswitch Ports: %s' % (' '.join(
+                str(status['cyberswitch'][f'Port {i} status']) for i in range(1, 6))))
+        else:
+            self._log.out(f"Cyberswitch: unavailable ({status['cyberswitch']['error']})")
+        self._log.out('CHWP_Control.rotation_status(): Snapshot took %.2f sec'
+                      % (status['duration']))
+        return status
 
     def rotation_stop(self):
+        self._state.set('stopping', 'CHWP_Control.rotation_stop()')
         try:
             self._rotation_mode('PID')
             
@@ -233,14 +302,16 @@ class CHWP_Control:
             pocc.open_command_close('ON')
             time.sleep(1)
             
-            cur_freq = self.pid.get_freq()
+            cur_freq = self._get_freq(fast=True)
             start_freq = cur_freq
             start_dir = self._pid_direction
-            self._log.out(f'Starting Frequency: {cur_freq} Hz')
+            self._log.out(f'Starting Frequency: {cur_freq} Hz ({self._freq_source})')
             start_time = time.perf_counter()
             
             while cur_freq > 0.15:
-                cur_freq = self.pid.get_freq()
+                # Encoder reads return at once, unlike the PID query
+                time.sleep(0.05)
+                cur_freq = self._get_freq(fast=True)
                 print('Current Frequency =', cur_freq, 'Hz    ', end = '\r')
             
                 if abs(start_time - time.perf_counter()) > 20 and cur_freq >= start_freq \
@@ -249,10 +320,12 @@ class CHWP_Control:
                     self.rotation_stop()
                 elif cur_freq > 2.5:
                     pocc.open_command_close('OFF')
+                    self._state.set('spinning', 'CHWP_Control.rotation_stop()')
                     self._log.err('CHWP_Control.rotation_stop(): Stop error, spinning too fast')
                     return False
                 elif abs(start_time - time.perf_counter()) > 360:
                     pocc.open_command_close('OFF')
+                    self._state.set('spinning', 'CHWP_Control.rotation_stop()')
                     self._log.err("CHWP_Control.rotation_stop(): Stop took too long")
                     return False
             
@@ -264,10 +337,12 @@ class CHWP_Control:
                 self.rotation_direction(direction = 'forward')
             
             print(' '*30, end = '\r')
+            self._state.set('idle', 'CHWP_Control.rotation_stop()')
             self._log.out("CHWP_Control.rotation_stop(): CHWP stopped")
             return True
         except KeyboardInterrupt:
             pocc.open_command_close('OFF')
+            self._state.set('spinning', 'CHWP_Control.rotation_stop()')
             self._log.err("CHWP_Control.rotation_stop(): User interrupt")
             return False
 
@@ -279,6 +354,7 @@ class CHWP_Control:
         if float(frequency) <= 3.5:
             try:
                 self._log.out('Starting time is {}'.format(time.time()))
+                self._state.set('spinning', 'CHWP_Control.rotation_spin()')
                 self._rotation_mode('PID')
                 if set_dir:
                     self.rotation_direction(direction = self._pid_direction)
@@ -286,10 +362,12 @@ class CHWP_Control:
                 self.pid.tune_freq()
                 pocc.open_command_close('ON')
                 time.sleep(1)
-                cur_freq = self.pid.get_freq()
+                cur_freq = self._get_freq()
+                self._log.out(f'Frequency feedback from the {self._freq_source}')
                 
                 while abs(cur_freq - frequency) > 0.005:
-                    cur_freq = self.pid.get_freq()
+                    time.sleep(0.05)
+                    cur_freq = self._get_freq()
                     print('Current Frequency =', cur_freq, 'Hz    ', end = '\r')
                 
                 print(' '*30, end = '\r')
@@ -309,6 +387,8 @@ class CHWP_Control:
             return False
         
         if float(voltage) <= 32.0 and float(voltage) >= 0.0:
+            if float(voltage) > 0.0:
+                self._state.set('spinning', 'CHWP_Control.rotation_voltage()')
             self._rotation_mode('VOLT')
             if set_dir:
                 self.rotation_direction(direction = self._pid_direction)
@@ -358,32 +438,52 @@ class CHWP_Control:
             self._log.out('Invalid argument value')
             return False
 
-        if index in [0, 1]:
-            if self.bbs['encoder1'] is not None:
-                self._log.out('Beaglebone1 packet collect already running')
-            else:
-                self.bbs['encoder1'] = subprocess.Popen([os.path.join(this_dir, 'bb_packet_collect'), 
-                                                        cg.bb1_username, cg.bb1_ip, cg.bb1_pass],
-                                                        stderr = subprocess.DEVNULL)
-                self._log.out('Beaglebone1 packet collect started')
+        for i, key in enumerate(self.bbs):
+            if index not in [0, i + 1]:
+                continue
+            if self.procs.alive(key):
+                self._log.out(f'Beaglebone{i + 1} packet collect already running')
+            elif self.procs.start(key):
+                self._log.out(f'Beaglebone{i + 1} packet collect started')
         
-        if index in [0, 2]:
-            if self.bbs['encoder2'] is not None:
-                self._log.out('Beaglebone2 packet collect already running')
+        if self.encoder is None:
+            try:
+                self.encoder = er.Receiver()
+            except OSError as e:
+                self._log.err(f'Encoder receiver not started: {e}')
             else:
-                self.bbs['encoder2'] = subprocess.Popen([os.path.join(this_dir, 'bb_packet_collect'), 
-                                                        cg.bb2_username, cg.bb2_ip, cg.bb2_pass],
-                                                        stderr = subprocess.DEVNULL)
-                self._log.out('Beaglebone2 packet collect started')
-        
+                self.tracker = ea.Tracker(self.encoder.names)
+                self.archive = eA.Archive()
+                self.tracker.subscribe(self.archive.write)
+                # Data quality, restarting or rebooting boards that degrade
+                self.quality = eq.Quality(self.encoder, self.tracker,
+                                          restart=self._bb_collect_restart,
+                                          reboot=self.bb_reboot,
+                                          wanted=lambda index: self.procs.status(
+                                              self.bbs[index - 1])['wanted'])
+                self.tracker.subscribe(self.quality.consume)
+                self.encoder.subscribe(self.tracker.process)
+                self.encoder.start()
+                self.quality.start()
+                self._log.out(f'Encoder receiver started, archiving to {self.archive.archive_dir}')
+
         self._log.out("CHWP_Control.bb_packet_collect_start(): Beaglebone PRUs Enabled")
         return True
 
     def bb_packet_collect_stop(self):
-        for key in self.bbs.keys():
-            if self.bbs[key] is not None:
-                self.bbs[key].kill()
+        for key in self.bbs:
+            if self.procs.stop(key):
                 self._log.out(f'{key}: Beaglebone process killed')
+
+        if self.encoder is not None:
+            self.quality.stop()
+            self.encoder.stop()
+            self.archive.close()
+            self.encoder = None
+            self.tracker = None
+            self.archive = None
+            self.quality = None
+            self._log.out('Encoder receiver stopped')
         
         self._log.out('CHWP_Control.bb_packet_collect_stop(): Beaglebone processes ended')
         return True
@@ -397,100 +497,112 @@ class CHWP_Control:
             self._log.out('Invalid argument value')
             return False
 
-        with open(os.path.join(this_dir, cg.aux2_status_file), 'rb') as status_file:
-            status = pkl.load(status_file)
-            if status['stopping'] == False:
-                self._log.out('CHWP_Control.emergency_monitor_start(): Monitor already running')
-                return False
+        if ipc.request('status') is not None:
+            self._log.out('CHWP_Control.emergency_monitor_start(): Monitor already running')
+            return False
         
         self.monitor = subprocess.Popen(['python3', os.path.join(this_dir, 'chwp_emergency_stop.py'), '-v', str(verb)])
         self._log.out('CHWP_Control.emergency_monitor_start(): Monitor started')
         return True
 
     def emergency_monitor_stop(self):
-        with open(os.path.join(this_dir, cg.aux2_status_file), 'rb') as status_file:
-            status = pkl.load(status_file)
-            
-            if status['off']:
-                self._log.out('CHWP_Control.emergency_monitor_stop(): Monitor already stopped')
-                return False
-            elif not status['off'] and status['stopping']:
-                self._log.out('CHWP_Control.emergency_monitor_stop(): Emergency shutdown in progress')
-                return False
-            
-        with open(os.path.join(this_dir, cg.aux2_status_file), 'wb') as status_file_w:
-            status['stopping'] = True
-            pkl.dump(status, status_file_w)
-
-        while not status['off']:
-            time.sleep(1)
-            with open(os.path.join(this_dir, cg.aux2_status_file), 'rb') as status_file:
-                status = pkl.load(status_file)
+        start = time.perf_counter()
+        reply = ipc.request('stop')
+        if reply is None:
+            self._log.out('CHWP_Control.emergency_monitor_stop(): Monitor already stopped')
+            return False
+        elif not reply['ok']:
+            self._log.out('CHWP_Control.emergency_monitor_stop(): Emergency shutdown in progress')
+            return False
+        self._log.out('CHWP_Control.emergency_monitor_stop(): Stop acknowledged in %.1f ms'
+                      % (1e3 * (time.perf_counter() - start)))
 
+        # The monitor exits once its UPS query returns
         if self.monitor is not None:
-            self.monitor.kill()
-            self._log.out('Emergency monitor killed')
+            try:
+                self.monitor.wait(timeout = 30)
+            except subprocess.TimeoutExpired:
+                self.monitor.kill()
+                self._log.out('Emergency monitor killed')
+            self.monitor = None
 
         self._log.out('CHWP_Control.emergency_monitor_stop(): Stopping monitor')
         return True
 
+    def emergency_monitor_status(self):
+        status = ipc.request('status')
+        if status is None:
+            self._log.out('CHWP_Control.emergency_monitor_status(): Monitor not running')
+            return False
+        self._log.out(f"Emergency monitor: {status['phase']}, pid {status['pid']}")
+        if status['started'] is not None:
+            self._log.out('Running since %s' % (dt.datetime.fromtimestamp(
+                status['started']).strftime('%Y-%m-%d %H:%M:%S')))
+        if status['checked'] is not None:
+            self._log.out('UPS battery %s %% (%.0f sec ago)' % (
+                status['battery'], time.time() - status['checked']))
+        return True
+
     def slowdaq_publishers_start(self):
-        # AUX2 UPS publisher
-        if self.pubs['aux2_ups'] is not None:
-            self._log.out('aux2_ups publisher already running')
-        else:
-            self.pubs['aux2_ups'] = subprocess.Popen(['python3', os.path.join(this_dir, '..', 'APC_UPS', 
-                                                                              'aux2_ups_pub.py')], 
-                                                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            self._log.out('aux2 publisher started')
-        
-        # Cyberswitch publisher
-        if self.pubs['cyberswitch'] is not None:
-            self._log.out('cyberswitch publisher already running')
-        else:
-            self.pubs['cyberswitch'] = subprocess.Popen(['python3', os.path.join(this_dir, '..', 'Cyberswitch', 
-                                                                                 'cyberswitch_pub.py')], 
-                                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            self._log.out('cyberswitch publisher started')
-        
-        # Gripper publisher
-        if self.pubs['gripper'] is not None:
-            self._log.out('gripper publisher already running')
-        else:
-            self.pubs['gripper'] = subprocess.Popen(['python3', os.path.join(this_dir, '..', 'Gripper', 
-                                                                             'gripper_pub.py')], 
-                                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            self._log.out('gripper publisher started')
-        
-        # PID publisher
-        if self.pubs['pid'] is not None:
-            self._log.out('pid publisher already running')
-        else:
-            self.pubs['pid'] = subprocess.Popen(['python3', os.path.join(this_dir, '..', 'Omega_PID', 
-                                                                         'pid_pub.py')], 
-                                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            self._log.out('pid publisher started')
-        
-        # PMX publisher
-        if self.pubs['pmx'] is not None:
-            self._log.out('pmx publisher already running')
-        else:
-            self.pubs['pmx'] = subprocess.Popen(['python3', os.path.join(this_dir, '..', 'PMX', 'pmx_pub.py')], 
-                                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            self._log.out('pmx publisher started')
+        for key in self.pubs:
+            if self.procs.alive(key):
+                self._log.out(f'{key} publisher already running')
+            elif self.procs.start(key):
+                self._log.out(f'{key} publisher started')
         
         self._log.out('CHWP_Control.slowdaq_publishers_start(): Publishers started')
         return True
 
     def slowdaq_publishers_stop(self):
-        for key in self.pubs.keys():
-            if self.pubs[key] is not None:
-                self.pubs[key].kill()
+        for key in self.pubs:
+            if self.procs.stop(key):
                 self._log.out(f'{key}: Publisher killed')
         
         self._log.out('CHWP_Control.slowdaq_publishers_stop(): Publishers stopped')
         return True
 
+    def process_start(self, name):
+        """ Start one supervised process """
+        if name not in self.procs.names:
+            self._log.out('Invalid argument value')
+            return False
+        if not self.procs.start(name):
+            self._log.out(f'CHWP_Control.process_start(): {name} not started')
+            return False
+        self._log.out(f'CHWP_Control.process_start(): {name} started')
+        return True
+
+    def process_stop(self, name):
+        """ Stop one supervised process """
+        if name not in self.procs.names:
+            self._log.out('Invalid argument value')
+            return False
+        if not self.procs.stop(name):
+            self._log.out(f'CHWP_Control.process_stop(): {name} not running')
+            return False
+        self._log.out(f'CHWP_Control.process_stop(): {name} stopped')
+        return True
+
+    def process_status(self):
+        """ Print the state of every supervised process """
+        status = self.procs.status()
+        for name, st in status.items():
+            if st['running']:
+                line = ('running, pid %d, up %.0f sec, %s CPU, %s RSS'
+                        % (st['pid'], st['uptime'],
+                           '-' if st['cpu'] is None else '%.1f%%' % (st['cpu']),
+                           '-' if st['rss'] is None else '%.1f MB' % (st['rss'])))
+            elif st['next_start'] is not None:
+                line = 'dead, restarting in %.0f sec' % (st['next_start'])
+            else:
+                line = 'stopped'
+            if st['exit_code'] is not None:
+                line += ', last exit code %d at %s' % (
+                    st['exit_code'], dt.datetime.fromtimestamp(
+                        st['exit_time']).strftime('%Y-%m-%d %H:%M:%S'))
+            self._log.out('%-12s %s, %d restarts' % (name, line, st['restarts']))
+        return status
+
     # ***** Private Methods *****
     def _rotation_mode(self, mode = 'PID'):
         if mode == 'PID':
@@ -505,6 +617,63 @@ class CHWP_Control:
             self._log.out("ERROR: Invalid mode entered")
             return False
 
+    def _bb_collect_restart(self, index):
+        """ Restart packet collection on one Beaglebone """
+        key = self.bbs[index - 1]
+        self.procs.stop(key)
+        self._log.out(f'CHWP_Control._bb_collect_restart(): Restarting {key} packet collect')
+        return self.bb_packet_collect_start(index = index)
+
+    def _bias_set(self, index, power, results, deadline):
+        """ Switch one bias supply and check its output, with retries until deadline """
+        ip, port = cg.kbias_ips[index], cg.kbias_ports[index]
+        lock = f'.bias{index + 1}_port_busy'
+        want = 1 if power == 'on' else 0
+        delay = cg.bias_retry_delay
+        for attempt in range(1, cg.bias_attempts + 1):
+            try:
+                # The port lock wait counts against the deadline, and the
+                # switch is not sent once it has passed
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                pocc.open_command_close(power, ip=ip, port=port, lock=lock, timeout=remaining)
+                out = pocc.open_command_close('O?', ip=ip, port=port, lock=lock,
+                                              timeout=max(0., deadline - time.monotonic()))
+                if out[1] == want:
+                    results[index] = True
+                    return True
+                why = f'output reads {out[1]}'
+            except BlockingIOError:
+                why = 'port busy'
+            except Exception as e:
+                why = str(e) if str(e) else type(e).__name__
+            self._log.err(f'Bias{index + 1} {power} attempt {attempt} failed: {why}')
+            if attempt < cg.bias_attempts:
+                time.sleep(max(0., min(delay, deadline - time.monotonic())))
+                delay *= 2
+        results[index] = False
+        return False
+
+    def _get_freq(self, fast=False):
+        """
+        Rotor frequency from the encoder while it is fresh, else the PID.
+        The per-rotation frequency averages out the slot spacing errors,
+        which the fast one over an eighth of a rotation does not
+
+        Args:
+        fast (bool): use the fast encoder frequency, to catch a stop
+                     quickly (default False)
+        """
+        key = 'freq_fast' if fast else 'freq'
+        if self.tracker is not None:
+            latest = self.tracker.latest(max_age=cg.encoder_stale)
+            if latest is not None and not np.isnan(latest[key]):
+                self._freq_source = 'encoder'
+                return abs(latest[key])
+        self._freq_source = 'PID'
+        return self.pid.get_freq()
+
     def _sleep(self, duration=3600.):
         """ Sleep in specified increments """
         granular_time = 60.
@@ -517,45 +686,34 @@ class CHWP_Control:
         self._log.out('Squeezing')
         old_stdout = sys.stdout
         
-        with open(os.devnull, 'w') as devnull:
+        with open(os.devnull, 'w') as devnull, self._state.during(
+                'gripping', 'CHWP_Control._squeeze()'):
             sys.stdout = devnull
-            alarm = [False for i in range(3)]
-            finished = [False for i in range(3)]
-        
-            # Iterate through all motors at least once
-            while not all(finished):
-                for i in range(3):
-                    try:
-                        if not finished[i] or first_pass:
-                            alarm[i] = self._push(incr, i + 1)
-                            if not alarm[i]:
-                                continue
-                            elif alarm[i]:
-                                gocc.open_command_close('RESET')
-                                finished[i] = True
-                        else:
-                            continue
-                    except KeyboardInterrupt:
-                        sys.stdout = old_stdout
-                        self._log.err(
-                            "CHWP_Control._squeeze(): User interrupt")
-                        return True
-        
-                first_pass = False
-        
+            try:
+                report = gocc.open_squeeze_close(incr)
+            except KeyboardInterrupt:
+                sys.stdout = old_stdout
+                self._log.err(
+                    "CHWP_Control._squeeze(): User interrupt")
+                return True
             sys.stdout = old_stdout
-            self._log.out("CHWP_Control._squeeze(): Finished squeezing")
-            return True
-    
-    def _push(self, incr, axis):
-        """ Push a given axis forward a given amount """
-        gocc.open_command_close(f'MOVE PUSH {axis} {incr}')
-        result = gocc.open_command_close('ALARM')
-        return result
 
+        for i in range(1, 4):
+            self._log.out(
+                "CHWP_Control._squeeze(): Axis %d pushed %.1f mm in %d "
+                "increments (%.1f sec)%s"
+                % (i, report[i]['travel'], report[i]['steps'],
+                   report[i]['time'],
+                   '' if report[i]['alarm'] else ' without alarm'))
+        self._log.out(
+            "CHWP_Control._squeeze(): Finished squeezing in %.1f sec"
+            % (report['total_time']))
+        return True
+    
     def _release(self, incr=0.1):
         """ Home the motors """
-        return gocc.open_command_close('HOME')
+        with self._state.during('gripping', 'CHWP_Control._release()'):
+            return gocc.open_command_close('HOME')
 
     def _pos_from_user(self, mode=None):
         """ Obtain manually-inputted motor positions """
@@ -2,9 +2,8 @@
 import os
 import sys
 import argparse
-import fcntl
-import pickle as pkl
-from time import sleep
+import threading
+import time
 
 this_dir = os.path.dirname(__file__)
 sys.path.append(this_dir)
@@ -12,86 +11,110 @@ sys.path.append(
     os.path.join(this_dir, '..', 'config'))
 sys.path.append(
     os.path.join(this_dir, '..', 'APC_UPS', 'src'))
+sys.path.append(
+    os.path.join(this_dir, '..', 'housekeeping'))
 
 import chwp_control as cc
 import pb2b_config as cg
 import log_control as lg
 import aux2_ups_controller as uc
+import chwp_state as cs
+import chwp_shutdown as sd
+import emergency_ipc as ipc
 
 class SHUTDOWN:
-    def __init__(self, ups_ip, status_pkl):
+    def __init__(self, ups_ip):
         self.ups = uc.UPS(ups_ip)
-        self.status_pkl = status_pkl
         self._log = lg.Logging()
         self.cc = cc.CHWP_Control()
+        self.state = cs.State()
 
-        try:
-            self._load_status()
-        except:
-            self._log.out('Warning: Status file does not exist, creating new file')
-            self.status = {'stopping': True, 'off': True}
-            self._set_status()
+        # Set by a stop request; a shutdown never starts once it is set
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.phase = 'off'
+        self._started = None
+        self._checked = None
+        self._server = None
 
     def __exit__(self):
-        self.status = {'stopping': True, 'off': True}
-        self._set_status()
+        if self._server is not None:
+            self._server.close()
 
     def monitor(self, verb = False):
-        self.status = {'stopping': False, 'off': False}
-        self._set_status()
+        # Raises if another monitor is running
+        self._server = ipc.Server({'status': self._status,
+                                   'stop': self._stop_request})
+        self.phase = 'monitoring'
+        self._started = time.time()
         if verb:
             print()
-        while not self.status['stopping']:
-            self.ups.update()
-            if float(self.ups.batt_capacity) > 80:
-                if verb:
-                    print(f'Battery capacity: {self.ups.batt_capacity} %                     ', end = '\r')
-                sleep(10)
-                self._load_status()
-            else:
-                self._log.out('CHWP_Emergency_Shutdown: UPS Battery below threshold, activating emergency stop')
-                self.status['stopping'] = True
-                self._set_status()
+        try:
+            while not self._stop.is_set():
+                self.ups.update()
+                self._checked = time.time()
+                if float(self.ups.batt_capacity) > 80:
+                    if verb:
+                        print(f'Battery capacity: {self.ups.batt_capacity} %                     ', end = '\r')
+                    self._stop.wait(10)
+                    continue
 
-                if not self.cc.gripper_home():
-                    self._log.out('ERROR: Cannot control grippers')
-                    self.cc.gripper_reboot()
-                    sleep(2)
-                    if not self.cc.gripper_home():
-                        self._log.out('ERROR: Still cannot control grippers')
+                with self._lock:
+                    if self._stop.is_set():
+                        break
+                    self.phase = 'shutdown'
+                self._log.out('CHWP_Emergency_Shutdown: UPS Battery below threshold, activating emergency stop')
+                self.state.set('emergency', 'CHWP_Emergency_Shutdown')
 
-                if not self.cc.rotation_stop():
-                    self.cc.rotation_off()
-                    sleep(1500)
-                
-                self._log.out('CHWP_Emergency_Shutdown: Waiting 90sec for CHWP to completely stop')
-                sleep(90)
-                self.cc.cold_grip()
-                self.cc.rotation_bias()
+                # Grippers home while the rotor brakes; the grip waits
+                # for the measured speed to reach zero
+                sd.emergency_plan(self.cc, self._log).run()
+                self.state.set('idle', 'CHWP_Emergency_Shutdown', force=True)
                 self._log.out('CHWP_Emergency_Shutdown: Shutdown complete')
-       
-        self.status = {'stopping': True, 'off': True}
-        self._set_status()
+                break
+        finally:
+            self.phase = 'off'
+            self._server.close()
+            self._server = None
+
         print()
         self._log.out('CHWP_Emergency_Shutdown: Monitor Stopped')
         return True
 
-    def _load_status(self):
-        with open(os.path.join(this_dir, self.status_pkl), 'rb') as status_file:
-            self.status = pkl.load(status_file)
-        return True
+    # ***** Helper Methods *****
+    def _status(self):
+        """ IPC status request """
+        return {'ok': True, 'phase': self.phase, 'pid': os.getpid(),
+                'started': self._started, 'checked': self._checked,
+                'battery': getattr(self.ups, 'batt_capacity', None)}
 
-    def _set_status(self):
-        with open(os.path.join(this_dir, self.status_pkl), 'wb') as status_file:
-            pkl.dump(self.status, status_file)
-        return True
+    def _stop_request(self):
+        """ IPC stop request, refused during a shutdown """
+        with self._lock:
+            if self.phase == 'shutdown':
+                return {'ok': False, 'phase': self.phase,
+                        'error': 'Emergency shutdown in progress'}
+            self._stop.set()
+            self.phase = 'stopping'
+        return {'ok': True, 'phase': self.phase}
 
 ps = argparse.ArgumentParser(
     description='Emergency stop program for the PB2b CHWP')
 ps.add_argument('-v', action = 'store', dest = 'verb', type = int, default = 0)
+ps.add_argument('--dry-run', action = 'store_true', dest = 'dry_run',
+                help = 'run the shutdown sequence once on simulated devices and log its timeline')
+ps.add_argument('--scale', action = 'store', dest = 'scale', type = float, default = 60.,
+                help = 'dry run speed-up (default 60)')
+ps.add_argument('--fail', action = 'store', dest = 'fail', type = str, default = '',
+                help = "dry run failures: comma list of 'home', 'home_raise', 'home_retry', 'brake'")
 args = ps.parse_args()
 
-chwp_shutdown = SHUTDOWN(cg.aux2_ups_ip, cg.aux2_status_file)
+if args.dry_run:
+    sd.dry_run(lg.Logging(), scale = args.scale,
+               fail = [f for f in args.fail.split(',') if f != ''])
+    sys.exit(0)
+
+chwp_shutdown = SHUTDOWN(cg.aux2_ups_ip)
 if len(sys.argv) > 1:
     chwp_shutdown.monitor(verb = args.verb)
 else:
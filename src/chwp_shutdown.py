@@ -0,0 +1,347 @@
+# Built-in python modules
+import threading
+import time as tm
+import sys
+import os
+
+this_dir = os.path.dirname(__file__)
+sys.path.append(
+    os.path.join(this_dir, '..', 'config'))
+
+import pb2b_config as cg  # noqa: E402
+
+
+class Clock:
+    """
+    The Clock object is the time source of a shutdown plan: the wall
+    clock, or a faster one so a dry run of the whole sequence takes
+    seconds. Times are in plan seconds from the clock's creation
+
+    Args:
+    scale (float): plan seconds per wall second (default 1)
+    """
+    def __init__(self, scale=1.):
+        self.scale = float(scale)
+        self._t0 = tm.monotonic()
+
+    def time(self):
+        return (tm.monotonic() - self._t0) * self.scale
+
+    def sleep(self, duration):
+        tm.sleep(max(0., duration) / self.scale)
+        return
+
+
+class Step:
+    """
+    One action of a shutdown plan. An action returns True when it
+    succeeded; exceptions count as failures. A step starts once every
+    step in after has finished, whether or not they succeeded
+
+    Args:
+    name (str): step name, for the timeline
+    action (callable): action()
+    after (list): names of the steps that must finish first
+    """
+    def __init__(self, name, action, after=()):
+        self.name = name
+        self.action = action
+        self.after = list(after)
+
+
+class Plan:
+    """
+    The Plan object runs a set of steps, each in its own thread as
+    soon as the steps it depends on have finished, so independent
+    actions overlap. run() returns the timeline of the steps and logs
+    it with the total time to safe
+
+    Args:
+    steps (list): Step objects
+    log (Logging): logger with out() and err()
+    clock (Clock): time source (default the wall clock)
+    name (str): plan name, for the log (default 'Shutdown')
+    """
+    def __init__(self, steps, log, clock=None, name='Shutdown'):
+        self.steps = {s.name: s for s in steps}
+        for s in steps:
+            for dep in s.after:
+                if dep not in self.steps:
+                    raise Exception(
+                        "Plan Exception: step '%s' waits on unknown step '%s'"
+                        % (s.name, dep))
+        self._log = log
+        self.clock = clock if clock is not None else Clock()
+        self.name = name
+        self.timeline = {}
+        self._cond = threading.Condition()
+
+    # ***** Public Methods *****
+    def run(self):
+        """ Run the plan to the end and return the timeline """
+        self.timeline = {}
+        self._t0 = self.clock.time()
+        started = set()
+        with self._cond:
+            while True:
+                for name, step in self.steps.items():
+                    if name in started:
+                        continue
+                    if all('end' in self.timeline.get(dep, {})
+                           for dep in step.after):
+                        started.add(name)
+                        self.timeline[name] = {'start': self._now()}
+                        threading.Thread(target=self._do, args=(step,),
+                                         daemon=True).start()
+                running = [n for n in started
+                           if 'end' not in self.timeline[n]]
+                if len(running) == 0:
+                    if len(started) < len(self.steps):
+                        raise Exception(
+                            "Plan Exception: steps %s wait on each other"
+                            % (sorted(set(self.steps) - started)))
+                    break
+                self._cond.wait(1.)
+        self._report()
+        return self.timeline
+
+    def time_to_safe(self):
+        """ Plan seconds from the start to the end of the last step """
+        return max(t['end'] for t in self.timeline.values())
+
+    # ***** Helper Methods *****
+    def _now(self):
+        return self.clock.time() - self._t0
+
+    def _do(self, step):
+        ok, error = False, None
+        try:
+            ok = bool(step.action())
+        except Exception as e:
+            error = str(e)
+        with self._cond:
+            self.timeline[step.name].update(
+                {'end': self._now(), 'ok': ok, 'error': error})
+            self._cond.notify()
+        return
+
+    def _report(self):
+        """ Log the timeline, in start order, and the time to safe """
+        order = sorted(self.timeline.items(), key=lambda kv: kv[1]['start'])
+        for name, t in order:
+            msg = ("%s: %-12s %7.1f - %7.1f sec  %s"
+                   % (self.name, name, t['start'], t['end'],
+                      'ok' if t['ok'] else 'FAILED'))
+            if t['error'] is not None:
+                msg += " (%s)" % (t['error'])
+            log = self._log.out if t['ok'] else self._log.err
+            log(msg, command=name, duration=t['end'] - t['start'])
+        self._log.out("%s: Time to safe %.1f sec" % (self.name,
+                                                    self.time_to_safe()),
+                      command='time_to_safe', duration=self.time_to_safe())
+        return
+
+
+def wait_stopped(get_freq, clock, timeout, log,
+                 freq=cg.shutdown_stopped_freq, hold=cg.shutdown_stopped_hold,
+                 poll=1.):
+    """
+    Wait until the measured rotor frequency stays below freq for hold
+    seconds. Returns True once it does, False after timeout. Readings
+    that fail do not count as stopped
+
+    Args:
+    get_freq (callable): rotor frequency [Hz]
+    clock (Clock): time source
+    timeout (float): longest wait [sec]
+    log (Logging): logger with out() and err()
+    freq (float): stopped threshold [Hz] (default cg.shutdown_stopped_freq)
+    hold (float): time to stay below freq [sec] (default cg.shutdown_stopped_hold)
+    poll (float): time between readings [sec] (default 1)
+    """
+    start = clock.time()
+    below = None
+    while clock.time() - start < timeout:
+        try:
+            cur = abs(get_freq())
+        except Exception as e:
+            log.err("wait_stopped(): Cannot read rotor frequency: %s"
+                    % (str(e)))
+            cur = None
+        now = clock.time()
+        if cur is not None and cur < freq:
+            if below is None:
+                below = now
+            if now - below >= hold:
+                return True
+        else:
+            below = None
+        clock.sleep(poll)
+    log.err("wait_stopped(): Rotor not seen stopped after %.0f sec"
+            % (timeout))
+    return False
+
+
+def emergency_plan(chwp, log, clock=None, name='CHWP_Emergency_Shutdown'):
+    """
+    Build the emergency shutdown plan:
+
+    home        home the grippers, rebooting the controller and
+                retrying once if that fails
+    brake       stop the rotor with the PID, or turn the drive off
+                and let it coast if that fails
+    spin_down   wait for the measured rotor speed to reach zero, at
+                most the time the fixed waits used to allow
+    cold_grip   grip the rotor, once it is homed and stopped
+    bias_off    turn the bias supplies off, after the grip
+
+    Homing and braking use different controllers and run together.
+
+    Args:
+    chwp (CHWP_Control): CHWP control, or a SimCHWP for dry runs
+    log (Logging): logger with out() and err()
+    clock (Clock): time source (default the wall clock)
+    name (str): plan name, for the log
+    """
+    clock = clock if clock is not None else Clock()
+    braked = {}
+
+    def home():
+        # A first attempt that raises still gets the reboot and retry
+        try:
+            if chwp.gripper_home():
+                return True
+            log.out('ERROR: Cannot control grippers')
+        except Exception as e:
+            log.out('ERROR: Cannot control grippers: %s' % (str(e)))
+        chwp.gripper_reboot()
+        clock.sleep(2)
+        if chwp.gripper_home():
+            return True
+        log.out('ERROR: Still cannot control grippers')
+        return False
+
+    def brake():
+        braked['ok'] = chwp.rotation_stop()
+        if not braked['ok']:
+            chwp.rotation_off()
+            log.err('%s: Brake failed, drive off, rotor coasting' % (name))
+        return braked['ok']
+
+    def spin_down():
+        timeout = (cg.shutdown_brake_timeout if braked.get('ok')
+                   else cg.shutdown_coast_timeout)
+        return wait_stopped(lambda: chwp._get_freq(fast=True), clock,
+                            timeout, log)
+
+    steps = [Step('home', home),
+             Step('brake', brake),
+             Step('spin_down', spin_down, after=['brake']),
+             Step('cold_grip', chwp.cold_grip, after=['home', 'spin_down']),
+             Step('bias_off', lambda: chwp.rotation_bias('off'),
+                  after=['cold_grip'])]
+    return Plan(steps, log, clock, name)
+
+
+class SimCHWP:
+    """
+    The SimCHWP object stands in for CHWP_Control in dry runs of the
+    shutdown plan. Device actions take their usual time on the plan
+    clock, and the rotor decelerates at a constant rate while braked
+    or coasting
+
+    Args:
+    clock (Clock): plan clock
+    freq (float): rotor frequency when the plan starts [Hz] (default 2)
+    fail (list): actions that fail: 'home', 'home_raise' (first homing
+                 raises), 'home_retry', 'brake'
+    durations (dict): action -> duration [sec], updating the defaults
+    brake_rate (float): deceleration under PID braking [Hz/sec]
+    coast_rate (float): deceleration with the drive off [Hz/sec]
+    """
+    def __init__(self, clock, freq=2., fail=(), durations=None,
+                 brake_rate=0.02, coast_rate=0.002):
+        self.clock = clock
+        self.fail = set(fail)
+        self.durations = {'home': 20., 'reboot': 5., 'brake_setup': 2.,
+                          'cold_grip': 60., 'bias': 1.}
+        if durations is not None:
+            self.durations.update(durations)
+        self.brake_rate = brake_rate
+        self.coast_rate = coast_rate
+        self._homes = 0
+        self._lock = threading.Lock()
+        # Rotor frequency f0 at time t0, decelerating at rate
+        self._rotor = (clock.time(), freq, 0.)
+
+    # ***** Public Methods *****
+    def gripper_home(self):
+        self.clock.sleep(self.durations['home'])
+        self._homes += 1
+        if self._homes == 1 and 'home_raise' in self.fail:
+            raise Exception('SimCHWP Exception: gripper controller not '
+                            'responding')
+        return not ('home' in self.fail if self._homes == 1
+                    else 'home_retry' in self.fail)
+
+    def gripper_reboot(self):
+        self.clock.sleep(self.durations['reboot'])
+        return True
+
+    def rotation_stop(self):
+        self.clock.sleep(self.durations['brake_setup'])
+        if 'brake' in self.fail:
+            return False
+        self._decelerate(self.brake_rate)
+        # The drive goes off at 0.15 Hz, as in CHWP_Control
+        self.clock.sleep(max(0., self._get_freq() - 0.15) / self.brake_rate)
+        self._decelerate(self.coast_rate)
+        return True
+
+    def rotation_off(self):
+        self._decelerate(self.coast_rate)
+        return True
+
+    def cold_grip(self):
+        if self._get_freq() > cg.shutdown_stopped_freq:
+            raise Exception('SimCHWP Exception: gripped a spinning rotor '
+                            '(%.3f Hz)' % (self._get_freq()))
+        self.clock.sleep(self.durations['cold_grip'])
+        return True
+
+    def rotation_bias(self, power='off'):
+        self.clock.sleep(self.durations['bias'])
+        return True
+
+    def _get_freq(self, fast=False):
+        """ Rotor frequency, as CHWP_Control._get_freq() """
+        with self._lock:
+            t0, f0, rate = self._rotor
+            return max(0., f0 - rate * (self.clock.time() - t0))
+
+    # ***** Helper Methods *****
+    def _decelerate(self, rate):
+        with self._lock:
+            t0, f0, _ = self._rotor
+            now = self.clock.time()
+            self._rotor = (now, max(0., f0 - self._rotor[2] * (now - t0)),
+                           rate)
+        return
+
+
+def dry_run(log, scale=60., freq=2., fail=()):
+    """
+    Run the emergency plan on a SimCHWP and return the plan, with its
+    timeline logged
+
+    Args:
+    log (Logging): logger with out() and err()
+    scale (float): plan seconds per wall second (default 60)
+    freq (float): rotor frequency at the start [Hz] (default 2)
+    fail (list): SimCHWP actions that fail
+    """
+    clock = Clock(scale)
+    plan = emergency_plan(SimCHWP(clock, freq=freq, fail=fail), log, clock,
+                          name='CHWP_Emergency_Shutdown (dry run)')
+    plan.run()
+    return plan
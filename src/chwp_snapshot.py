@@ -0,0 +1,165 @@
+# Built-in python modules
+import threading
+import time as tm
+import sys
+import os
+
+this_dir = os.path.dirname(__file__)
+sys.path.append(
+    os.path.join(this_dir, "..", "Gripper", "src"))
+sys.path.append(
+    os.path.join(this_dir, "..", "Cyberswitch", "src"))
+sys.path.append(
+    os.path.join(this_dir, "..", "PMX", "src"))
+sys.path.append(
+    os.path.join(this_dir, "..", "config"))
+sys.path.append(
+    os.path.join(this_dir, "..", "housekeeping"))
+
+import cyberswitch_open_command_close as cocc  # noqa: E402
+import pmx_open_command_close as pocc  # noqa: E402
+import gripper_open_command_close as gocc  # noqa: E402
+import pb2b_config as cg  # noqa: E402
+import acq_clock as ac  # noqa: E402
+
+
+class Snapshot:
+    """
+    The Snapshot object reads the state of the CHWP devices at once:
+    each device is queried in its own thread over its own port, so a
+    snapshot takes as long as the slowest device rather than the sum.
+    take() returns one record:
+
+    time         UTC start of the snapshot
+    duration     wall time of the snapshot [sec]
+    drive        drive supply: 'Measured voltage', 'Measured current',
+                 'Output status'
+    bias1/bias2  bias supplies, as the drive
+    pid          PID controller: 'freq' [Hz]
+    gripper      gripper controller status bits
+    cyberswitch  'Port N status' of the five outlets
+    encoder      'freq' [Hz], 'angle' [rad], 'synced', 'time' from the
+                 encoder tracker, when packets are being collected
+
+    Each device entry also has the 'time' (request/response midpoint)
+    and 'latency' of its query, stamped by the device layer without the
+    port lock wait and connection setup (for the supplies, of the VC?
+    query), and 'error', which is None unless the query failed or did
+    not finish within timeout.
+
+    Args:
+    pid (pid_controller.PID): PID controller
+    tracker (encoder_angle.Tracker): encoder tracker (default None)
+    timeout (float): longest wait for a device [sec]
+                     (default cg.snapshot_timeout)
+    """
+    def __init__(self, pid, tracker=None, timeout=cg.snapshot_timeout):
+        self.pid = pid
+        self.tracker = tracker
+        self.timeout = timeout
+        self._clock = ac.Clock()
+        self.queries = {
+            'drive': lambda: self._pmx(
+                cg.kdrive_ip, cg.kdrive_port, '.drive_port_busy'),
+            'bias1': lambda: self._pmx(
+                cg.kbias_ips[0], cg.kbias_ports[0], '.bias1_port_busy'),
+            'bias2': lambda: self._pmx(
+                cg.kbias_ips[1], cg.kbias_ports[1], '.bias2_port_busy'),
+            'pid': self._pid,
+            'gripper': self._gripper,
+            'cyberswitch': self._cyberswitch}
+
+    # ***** Public Methods *****
+    def take(self):
+        """ Query every device and return the snapshot record """
+        start = self._clock.now()
+        t0 = tm.monotonic()
+        results = {}
+        threads = []
+        for name, query in self.queries.items():
+            th = threading.Thread(target=self._run, args=(name, query, results),
+                                  daemon=True)
+            th.start()
+            threads.append(th)
+        for th in threads:
+            th.join(max(0., t0 + self.timeout - tm.monotonic()))
+
+        record = {'time': start, 'duration': tm.monotonic() - t0}
+        for name in self.queries.keys():
+            # A query still running is left to finish on its own
+            record[name] = dict(results.get(name, {
+                'time': None, 'latency': None,
+                'error': 'no reply within %.0f sec' % (self.timeout)}))
+        if self.tracker is not None:
+            record['encoder'] = self._encoder()
+        return record
+
+    # ***** Helper Methods *****
+    def _run(self, name, query, results):
+        """ Run one device query, which returns (value, time, latency) """
+        t0 = self._clock.now()
+        try:
+            value, t, latency = query()
+            out = dict(value, time=t, latency=latency, error=None)
+        except Exception as e:
+            out = {'time': None, 'latency': self._clock.now() - t0,
+                   'error': str(e) if str(e) else type(e).__name__}
+        results[name] = out
+        return
+
+    def _pmx(self, ip, port, lock):
+        (voltage, current), t, latency = pocc.open_command_close(
+            'VC?', ip=ip, port=port, lock=lock, clock=self._clock)
+        output = pocc.open_command_close('O?', ip=ip, port=port, lock=lock)
+        return {'Measured voltage': voltage,
+                'Measured current': current,
+                'Output status': output[1]}, t, latency
+
+    def _pid(self):
+        # The query runs in a helper script, which is stamped as a whole
+        freq, t, latency = self._clock.call(self.pid.get_freq)
+        return {'freq': freq}, t, latency
+
+    def _gripper(self):
+        # As the cyberswitch, retry while the publisher holds the port.
+        # Commands share one gripper session, which runs them one at a
+        # time, so a query left running past the timeout only delays
+        # the next gripper command
+        for i in range(3):
+            try:
+                status, t, latency = gocc.status(timeout=0., clock=self._clock)
+                break
+            except BlockingIOError:
+                tm.sleep(0.5)
+        else:
+            raise Exception('Snapshot Exception: gripper port busy')
+        if type(status) is not dict:
+            raise Exception(
+                'Snapshot Exception: bad gripper status %s' % (str(status)))
+        return status, t, latency
+
+    def _cyberswitch(self):
+        # The port lock is not waited on, so retry while the
+        # publisher holds it
+        for i in range(3):
+            try:
+                status, t, latency = cocc.open_command_close(
+                    'status', clock=self._clock)
+                break
+            except BlockingIOError:
+                tm.sleep(0.5)
+        else:
+            raise Exception('Snapshot Exception: cyberswitch port busy')
+        if type(status) is not list or len(status) != 5:
+            raise Exception(
+                'Snapshot Exception: bad cyberswitch status %s' % (str(status)))
+        return ({'Port %d status' % (i + 1): status[i] for i in range(5)},
+                t, latency)
+
+    def _encoder(self):
+        latest = self.tracker.latest(max_age=cg.encoder_stale)
+        if latest is None:
+            return {'time': None, 'error': 'no recent encoder data'}
+        return {'freq': latest['freq'], 'angle': latest['angle'],
+                'synced': latest['synced'], 'time': latest['time'],
+                'error': None}
@@ -0,0 +1,129 @@
+# Built-in python modules
+import json
+import socket as sk
+import threading
+import sys
+import os
+
+this_dir = os.path.dirname(__file__)
+sys.path.append(
+    os.path.join(this_dir, '..', 'config'))
+
+import pb2b_config as cg  # noqa: E402
+
+# Control socket of the emergency monitor
+socket_path = os.path.join(this_dir, cg.emergency_socket)
+
+
+class Server:
+    """
+    The Server object is the control channel of the emergency monitor,
+    a Unix socket answering one command per connection. A client
+    sends the command name on one line and gets one JSON line back,
+    the handler's reply. Unknown commands get {'ok': False}.
+
+    Only one server can hold the socket: a socket file left by a
+    monitor that died is removed, but one that still answers raises.
+
+    Args:
+    handlers (dict): command -> handler() returning a dict
+    path (str): socket path (default socket_path)
+    """
+    def __init__(self, handlers, path=socket_path):
+        self.handlers = handlers
+        self.path = path
+        if os.path.exists(self.path):
+            if request('status', self.path) is not None:
+                raise Exception(
+                    'IPC Exception: a monitor is already serving %s'
+                    % (self.path))
+            os.unlink(self.path)
+        self._sock = sk.socket(sk.AF_UNIX, sk.SOCK_STREAM)
+        self._sock.bind(self.path)
+        self._sock.listen(8)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # ***** Public Methods *****
+    def close(self):
+        """ Stop serving and remove the socket """
+        if not self._running:
+            return
+        self._running = False
+        # Wake the accept
+        try:
+            self._sock.shutdown(sk.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+        self._thread.join()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+        return
+
+    # ***** Helper Methods *****
+    def _run(self):
+        while self._running:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                break
+            with conn:
+                try:
+                    self._serve(conn)
+                except OSError:
+                    pass
+        return
+
+    def _serve(self, conn):
+        conn.settimeout(1.)
+        cmd = _readline(conn)
+        handler = self.handlers.get(cmd)
+        if handler is None:
+            reply = {'ok': False, 'error': 'unknown command %s' % (cmd)}
+        else:
+            try:
+                reply = handler()
+            except Exception as e:
+                reply = {'ok': False, 'error': str(e)}
+        conn.sendall((json.dumps(reply) + '\n').encode())
+        return
+
+
+def request(cmd, path=socket_path, timeout=5.):
+    """
+    Send a command to the emergency monitor and return its reply, or
+    None if no monitor is listening
+
+    Args:
+    cmd (str): command name
+    path (str): socket path (default socket_path)
+    timeout (float): longest wait for the reply [sec] (default 5)
+    """
+    sock = sk.socket(sk.AF_UNIX, sk.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+    with sock:
+        sock.sendall((cmd + '\n').encode())
+        line = _readline(sock)
+    if line == '':
+        return None
+    return json.loads(line)
+
+
+def _readline(sock):
+    """ Read one line from a socket """
+    data = b''
+    while not data.endswith(b'\n'):
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    return data.decode().strip()
@@ -1,49 +1,15 @@
 # Built-in python modules
-import time as tm
-import datetime as dt
+import sys as sy
 import os
 
+# Shared logging backend
+sy.path.append(os.path.join(os.path.dirname(__file__), '..', "housekeeping"))
+import log_backend as lb  # noqa: E402
 
-class Logging:
-    """ The Logging object saves logging messages """
-    def __init__(self):
-        now = dt.datetime.now()
-        date = "%04d_%02d_%02d" % (now.year, now.month, now.day)
-        fname = "command_log_%s.txt" % (date)
-        log_dir = os.path.join(os.path.dirname(__file__), "..", "LOG")
-        f = os.path.join(log_dir, fname)
-        if os.path.exists(f):
-            self._log_file = open(f, 'a')
-        else:
-            self._log_file = open(f, 'w')
-        self.log("Logging to file '%s'" % (f))
-
-    def __del__(self):
-        self._log_file.close()
-
-    # ***** Public Methods *****
-    def log(self, msg):
-        wrmsg = self._wrmsg(msg)
-        self._log_file.write(wrmsg + '\n')
-        return
 
-    def err(self, msg):
-        wrmsg = self._wrmsg(msg)
-        self._log_file.write(wrmsg + '\n')
-        print(wrmsg)
-        return
-
-    def out(self, msg):
-        wrmsg = self._wrmsg(msg)
-        self._log_file.write(wrmsg + '\n')
-        print(wrmsg)
-        return
-
-    # ***** Helper Methods *****
-    def _wrmsg(self, msg):
-        now = dt.datetime.now()
-        wrmsg = (
-            "[%04d-%02d-%02d %02d:%02d:%02d] %s"
-            % (now.year, now.month, now.day, now.hour,
-               now.minute, now.second, msg))
-        return wrmsg
+class Logging(lb.Logging):
+    """ The Logging object saves CHWP control logging messages """
+    def __init__(self):
+        super().__init__("command")
+        self.log("Logging to file '%s'" % (os.path.join(
+            self._backend.log_dir, "%s_log_*.txt" % (self.subsystem))))